@@ -0,0 +1,275 @@
+import numpy as np
+import pandas as pd
+from store import N_JUDGES, child_rows
+from element_codes import has_jump_type
+
+# Server-side version of the aggregates ScoreAnalytics.jsx used to compute in
+# the browser from the full protocol dump. Everything is a vectorized pass over
+# the competition's element/component rows; main.py caches the result per
+# (competition, category, program) on the store, i.e. per data version.
+
+JUMP_TYPES = {'Toe Loop': 'T', 'Salchow': 'S', 'Loop': 'Lo', 'Flip': 'F', 'Lutz': 'Lz', 'Axel': 'A'}
+ELEMENT_KINDS = ['jump', 'spin', 'step', 'choreo']
+RADAR_METRICS = ['Composition', 'Presentation', 'Skating Skills', 'Best Spin', 'Best Step Seq.', 'Best Choreo Seq.', 'Avg Jump GOE']
+TOP_N = 10
+DECIMALS = 2
+
+
+def clean_jump_name(names):
+    """Strip edge/rotation marks so e.g. 3Lz! and 3Lze group together"""
+    return names.str.replace(r'[<!eq]', '', regex=True).str.replace(r'(?<!\d)F', '', regex=True).str.strip()
+
+def judges_marks(table, idx):
+    """Per-judge marks of the given rows from the store's parsed matrix, as
+    float64 with NaN where a judge has no mark"""
+    if "judges" not in table.matrices or not len(idx):
+        return np.full((len(idx), N_JUDGES), np.nan)
+    marks = table.matrices["judges"][idx].astype(np.float64)
+    marks[table.matrices["judges_missing"][idx]] = np.nan
+    return marks
+
+def _round(values):
+    """float array -> JSON-safe list (NaN -> None)"""
+    return [None if np.isnan(v) else round(float(v), DECIMALS) for v in np.asarray(values, dtype=np.float64)]
+
+def _per_perf(series, perf_ids, fill=0.0):
+    return series.reindex(perf_ids).fillna(fill).to_numpy(dtype=np.float64)
+
+
+def competition_analytics(store, competition_id, category=None, program=None):
+    perfs = store.performances.to_frame(store.performance_rows(competition_id, category))
+    for col in ['skater_name', 'nation', 'program_type', 'category']:
+        if col in perfs:
+            perfs[col] = perfs[col].astype(str)
+    if program:
+        perfs = perfs[perfs['program_type'] == program]
+    perfs = perfs.reset_index(drop=True)
+    perf_ids = perfs['id'].tolist() if len(perfs) else []
+
+    _, elem_idx = child_rows(store.element_slices, perf_ids)
+    _, comp_idx = child_rows(store.component_slices, perf_ids)
+    elems = store.elements.to_frame(elem_idx) if len(elem_idx) else pd.DataFrame(columns=list(store.elements.columns))
+    comps = store.components.to_frame(comp_idx) if len(comp_idx) else pd.DataFrame(columns=list(store.components.columns))
+    elems['element_name'] = elems['element_name'].astype(str)
+    comps['component_name'] = comps['component_name'].astype(str)
+    for col in ['base_value', 'goe', 'panel_score']:
+        elems[col] = elems[col].astype(np.float64)
+    for col in ['factor', 'panel_score']:
+        comps[col] = comps[col].astype(np.float64)
+
+    names = perfs.set_index('id')[['skater_name', 'nation']] if len(perfs) else pd.DataFrame(columns=['skater_name', 'nation'])
+    elems['kind'] = elems['element_kind'].astype(str)  # classified at ingest, see element_codes.py
+    elems = elems.join(names, on='performance_id')
+    by_perf = elems.groupby('performance_id')
+    jumps = elems[elems['kind'] == 'jump']
+
+    # --- per-skater numbers, in protocol (rank) order ---
+    perfs['bv'] = _per_perf(by_perf['base_value'].sum(), perf_ids)
+    perfs['avg_jump_goe'] = _per_perf(jumps.groupby('performance_id')['goe'].mean(), perf_ids)
+    skaters = [
+        {
+            "id": int(p.id), "skater_name": p.skater_name, "nation": p.nation, "rank": int(p.rank),
+            "total_score": round(float(p.total_score), DECIMALS), "tes_score": round(float(p.tes_score), DECIMALS),
+            "pcs_score": round(float(p.pcs_score), DECIMALS), "deductions": round(float(p.deductions), DECIMALS),
+            "bv": round(float(p.bv), DECIMALS), "avg_jump_goe": round(float(p.avg_jump_goe), DECIMALS),
+        }
+        for p in perfs.itertuples()
+    ]
+
+    def ranking(col):
+        return perfs.sort_values(col, ascending=False, kind='stable')['id'].head(TOP_N).tolist()
+
+    rankings = {col: ranking(col) for col in ['tes_score', 'pcs_score', 'bv', 'avg_jump_goe']}
+
+    # --- best elements of each kind by panel score ---
+    top_elements = {}
+    for kind in ELEMENT_KINDS:
+        best = elems[elems['kind'] == kind].sort_values('panel_score', ascending=False, kind='stable').head(TOP_N)
+        top_elements[kind] = [
+            {"skater": e.skater_name, "nation": e.nation, "element_name": e.element_name, "panel_score": round(e.panel_score, DECIMALS)}
+            for e in best.itertuples()
+        ]
+
+    # --- radar: raw values per skater plus the min/max used to normalize them ---
+    def component(label):
+        rows = comps[comps['component_name'].str.contains(label, regex=False)]
+        return _per_perf(rows.groupby('performance_id')['panel_score'].first(), perf_ids)
+
+    def best(kind):
+        return _per_perf(elems[elems['kind'] == kind].groupby('performance_id')['panel_score'].max(), perf_ids)
+
+    has_choreo = bool((elems['kind'] == 'choreo').any())
+    radar_columns = [component('Composition'), component('Presentation'), component('Skating Skills'),
+                     best('spin'), best('step'), best('choreo'), perfs['avg_jump_goe'].to_numpy(dtype=np.float64)]
+    metrics = [m for m in RADAR_METRICS if has_choreo or m != 'Best Choreo Seq.']
+    radar_columns = [c for m, c in zip(RADAR_METRICS, radar_columns) if m in metrics]
+    radar_matrix = np.column_stack(radar_columns) if perf_ids else np.empty((0, len(metrics)))
+    radar = {
+        "metrics": metrics,
+        "values": {pid: _round(row) for pid, row in zip(perf_ids, radar_matrix)},
+        "ranges": {m: _round([radar_matrix[:, i].min(), radar_matrix[:, i].max()]) if perf_ids else [None, None]
+                   for i, m in enumerate(metrics)},
+    }
+
+    # --- jump heatmaps, skaters ordered by total score ascending ---
+    heat_order = perfs.sort_values('total_score', kind='stable')['id'].tolist()
+    jump_types = {}
+    for label, code in JUMP_TYPES.items():
+        typed = elems[has_jump_type(elems['jump_types'], code)]
+        grouped = typed.groupby('performance_id')
+        jump_types[label] = {
+            "goe": _round(grouped['goe'].mean().reindex(heat_order)),
+            "executed": grouped['element_name'].agg(', '.join).reindex(heat_order).fillna('N/A').tolist(),
+        }
+
+    clean = clean_jump_name(jumps['element_name'])
+    detailed = jumps.assign(clean=clean).groupby(['clean', 'performance_id'])['goe'].mean().unstack('clean')
+    detailed = detailed.reindex(index=heat_order)
+    jump_elements = sorted(clean.unique().tolist())
+    jump_detail = {name: _round(detailed[name]) for name in jump_elements}
+
+    # --- estimated total per judge: components at face value, GOE marks scaled by the panel ---
+    judge_totals = np.zeros((len(perf_ids), N_JUDGES))
+    pos = {pid: i for i, pid in enumerate(perf_ids)}
+    if len(comps):
+        marks = judges_marks(store.components, comp_idx)
+        contrib = np.nan_to_num(marks * comps['factor'].to_numpy()[:, None])
+        np.add.at(judge_totals, comps['performance_id'].map(pos).to_numpy(), contrib)
+    if len(elems):
+        marks = judges_marks(store.elements, elem_idx)
+        base = elems['base_value'].to_numpy()
+        counts = (~np.isnan(marks)).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg = np.where(counts > 0, np.nansum(marks, axis=1) / counts, np.nan)
+            unit = np.where(np.abs(avg) > 0.01, (elems['panel_score'].to_numpy() - base) / avg, base * 0.1)
+        contrib = np.where(np.isnan(marks), 0, base[:, None] + marks * unit[:, None])
+        np.add.at(judge_totals, elems['performance_id'].map(pos).to_numpy(), contrib)
+    judge_totals -= perfs['deductions'].to_numpy(dtype=np.float64)[:, None]
+
+    return {
+        "competition_id": competition_id, "category": category, "program": program, "version": store.version,
+        "skaters": skaters,
+        "rankings": rankings,
+        "top_elements": top_elements,
+        "radar": radar,
+        "heatmap": {"skaters": heat_order, "jump_types": jump_types, "jump_elements": jump_elements, "jump_detail": jump_detail},
+        "judge_totals": {pid: _round(row) for pid, row in zip(perf_ids, judge_totals)},
+    }
+
+
+def trimmed_deviation(marks, missing):
+    """Each judge's mark minus the trimmed panel mean of its row (highest and
+    lowest mark dropped, as in the panel score). Returns (deviations, present)."""
+    present = ~np.asarray(missing)
+    x = np.asarray(marks, dtype=np.float64)
+    n = present.sum(axis=1)
+    total = np.where(present, x, 0.0).sum(axis=1)
+    high = np.where(present, x, -np.inf).max(axis=1, initial=-np.inf)
+    low = np.where(present, x, np.inf).min(axis=1, initial=np.inf)
+    with np.errstate(invalid='ignore'):
+        trimmed = np.where(n > 2, (total - high - low) / np.maximum(n - 2, 1), total / np.maximum(n, 1))
+    return np.where(present, x - trimmed[:, None], 0.0), present
+
+def _judge_stats(deviation, present, groups, n_groups):
+    """Per (group, judge) mark count, mean and mean absolute deviation"""
+    count = np.zeros((n_groups, N_JUDGES))
+    total = np.zeros((n_groups, N_JUDGES))
+    spread = np.zeros((n_groups, N_JUDGES))
+    np.add.at(count, groups, present)
+    np.add.at(total, groups, deviation)
+    np.add.at(spread, groups, np.abs(deviation))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return count, total / count, spread / count
+
+def judge_deviations(store, competition_id, category=None, program=None):
+    """How far each judge slot's GOE and PCS marks sit from the trimmed panel
+    mean, per panel (category + program: the same judge sits in the same slot
+    for a whole segment), overall and per skater. One vectorized pass over the
+    store's parsed per-judge matrices."""
+    rows = store.performance_rows(competition_id, category)
+    if not len(rows):
+        return {"competition_id": competition_id, "category": category, "program": program, "version": store.version,
+                "judges": [f"J{j + 1}" for j in range(N_JUDGES)], "panels": []}
+    perf_ids = store.performances["id"][rows]
+    programs = np.asarray(store.performances.decode("program_type", rows), dtype=object)
+    categories = np.asarray(store.performances.decode("category", rows), dtype=object)
+    if program:
+        keep = programs == program
+        rows, perf_ids, programs, categories = rows[keep], perf_ids[keep], programs[keep], categories[keep]
+
+    panel_codes, panels = pd.factorize(pd.Series(list(zip(categories, programs)), dtype=object))
+    perf_pos = {int(pid): i for i, pid in enumerate(perf_ids)}
+    result = {
+        "competition_id": competition_id, "category": category, "program": program, "version": store.version,
+        "judges": [f"J{j + 1}" for j in range(N_JUDGES)],
+        "panels": [{"category": cat, "program": prog, "skaters": [], "goe": {}, "pcs": {}} for cat, prog in panels],
+    }
+    for pid, code in zip(perf_ids.tolist(), panel_codes):
+        result["panels"][code]["skaters"].append(pid)
+
+    for key, table, slices in [("goe", store.elements, store.element_slices), ("pcs", store.components, store.component_slices)]:
+        _, idx = child_rows(slices, perf_ids.tolist())
+        if "judges" in table.matrices and len(idx):
+            deviation, present = trimmed_deviation(table.matrices["judges"][idx], table.matrices["judges_missing"][idx])
+            owner = np.array([perf_pos[int(p)] for p in table["performance_id"][idx]], dtype=np.intp)
+        else:
+            deviation, present = np.zeros((0, N_JUDGES)), np.zeros((0, N_JUDGES), dtype=np.bool_)
+            owner = np.empty(0, np.intp)
+
+        count, mean, mean_abs = _judge_stats(deviation, present, panel_codes[owner], len(panels))
+        _, by_skater, _ = _judge_stats(deviation, present, owner, len(perf_ids))
+        for code, panel in enumerate(result["panels"]):
+            panel[key] = {
+                "marks": count[code].astype(int).tolist(),
+                "mean_deviation": _round(mean[code]),
+                "mean_abs_deviation": _round(mean_abs[code]),
+                "by_skater": {pid: _round(by_skater[perf_pos[pid]]) for pid in panel["skaters"]},
+            }
+    return result
+
+
+PODIUM_SIZE = 3
+
+def competition_summaries(store):
+    """Podium (top 3 by SP + FS total) for every competition, both per category
+    and across categories, as {(competition_id, category or None): [skater, ...]}.
+    Built in one pass over all performances; main.py materializes it per data version."""
+    if not len(store.performances):
+        return {}
+    perfs = pd.DataFrame({
+        col: store.performances.decode(col)
+        for col in ['competition_id', 'category', 'skater_name', 'nation', 'program_type', 'total_score', 'rank']
+    })
+    perfs['order'] = np.arange(len(perfs))
+    program = perfs['program_type'].astype(str)
+    perfs['segment'] = np.select([program.str.contains('Short', regex=False), program.str.contains('Free', regex=False)],
+                                 ['sp', 'fs'], default='')
+
+    table = {}
+    for scope in [['competition_id', 'category'], ['competition_id']]:
+        keys = scope + ['skater_name']
+        skaters = perfs.groupby(keys, sort=False).agg(nation=('nation', 'first'), order=('order', 'first'))
+        for segment in ['sp', 'fs']:
+            # Later rows win, like the per-skater dict this replaces
+            seg = perfs[perfs['segment'] == segment].groupby(keys, sort=False)[['total_score', 'rank']].last()
+            skaters = skaters.join(seg.add_prefix(f'{segment}_'))
+        skaters['total'] = skaters['sp_total_score'].fillna(0) + skaters['fs_total_score'].fillna(0)
+        skaters = skaters[skaters['total'] > 0].reset_index()
+        skaters = skaters.sort_values(scope + ['total', 'order'], ascending=[True] * len(scope) + [False, True], kind='stable')
+        podiums = skaters.groupby(scope, sort=False).head(PODIUM_SIZE)
+
+        for row in podiums.itertuples(index=False):
+            key = (int(row.competition_id), row.category if len(scope) == 2 else None)
+            table.setdefault(key, []).append({
+                "name": row.skater_name,
+                "nation": row.nation,
+                "sp": _segment(row.sp_total_score, row.sp_rank),
+                "fs": _segment(row.fs_total_score, row.fs_rank),
+                "total": float(row.total),
+            })
+    return table
+
+def _segment(score, rank):
+    if pd.isna(score):
+        return {"score": 0, "rank": "-"}
+    return {"score": float(score), "rank": int(rank)}
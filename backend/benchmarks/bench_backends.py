@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import write_dataset
+
+# CSV (in-memory store) vs SQLite storage backend, through the real API app.
+# Each backend runs in a fresh interpreter whose cwd holds a synthetic data/
+# directory: startup time, resident memory, and the latency of first (uncached)
+# requests for distinct competitions.
+# Run from backend/:  python -m benchmarks.bench_backends [--competitions 500]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(n_requests):
+    """Runs inside the child process (cwd = dataset dir, backend selected by env)"""
+    from fastapi.testclient import TestClient
+    import main
+    before = rss_mb()
+    start = time.perf_counter()
+    with TestClient(main.app) as client:
+        startup = time.perf_counter() - start
+        rss_loaded = rss_mb() - before
+        n_competitions = len(client.get("/competitions").json())
+        ids = [1 + (i * 7919) % n_competitions for i in range(n_requests)]
+        timings = {}
+        for name, path in [("performances", "/performances/{}?category=Men"),
+                           ("analytics", "/competition/{}/analytics?category=Women"),
+                           ("judges", "/competition/{}/judges")]:
+            start = time.perf_counter()
+            for cid in ids:
+                client.get(path.format(cid)).raise_for_status()
+            timings[name] = (time.perf_counter() - start) / len(ids) * 1000
+        start = time.perf_counter()
+        client.get("/summaries").raise_for_status()
+        timings["summaries"] = (time.perf_counter() - start) * 1000
+    print(json.dumps({"startup_s": startup, "rss_mb": rss_loaded, "rss_end_mb": rss_mb() - before, "ms": timings}))
+
+
+def run_child(backend, data_root, n_requests):
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, STORAGE_BACKEND=backend, DATA_RELOAD_SECONDS="0",
+               DATABASE_URL=f"sqlite:///{os.path.join(data_root, 'bench.db')}")
+    cmd = [sys.executable, "-m", "benchmarks.bench_backends", "--child", str(n_requests)]
+    out = subprocess.run(cmd, cwd=data_root, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main_bench(n_competitions, n_requests):
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(os.path.join(tmp, "data"), n_competitions)
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "database.py")], cwd=tmp, env=env,
+                       capture_output=True, check=True)
+        load_s = time.perf_counter() - start
+        results = {backend: run_child(backend, tmp, n_requests) for backend in ["csv", "sqlite"]}
+
+    print(f"{n_competitions} competitions, {n_requests} first-hit requests per endpoint (CSV -> SQLite load {load_s:.1f}s)")
+    print(f"  {'':<10}{'startup':>10}{'RSS':>10}{'RSS end':>10}{'/performances':>15}{'/analytics':>12}{'/judges':>10}{'/summaries':>12}")
+    for backend, r in results.items():
+        ms = r["ms"]
+        print(f"  {backend:<10}{r['startup_s']:9.2f}s{r['rss_mb']:8.1f}MB{r['rss_end_mb']:8.1f}MB"
+              f"{ms['performances']:13.1f}ms{ms['analytics']:10.1f}ms{ms['judges']:8.1f}ms{ms['summaries']:10.1f}ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        measure(int(sys.argv[2]))
+    else:
+        import argparse
+        parser = argparse.ArgumentParser(description="Compare the CSV and SQLite storage backends.")
+        parser.add_argument("--competitions", type=int, default=500)
+        parser.add_argument("--requests", type=int, default=50)
+        args = parser.parse_args()
+        main_bench(args.competitions, args.requests)
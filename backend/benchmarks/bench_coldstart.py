@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_workers import free_port
+from benchmarks.synthetic import write_dataset
+
+# Cold start of one API worker, as a scale-to-zero host sees it: from spawning
+# the process to the first /competitions answer, and to /ready. Eager (the
+# startup hook loads everything first) vs LAZY_STARTUP=1 (answers from the
+# startup manifest while the data loads in the background), on the shipped
+# data/ or a synthetic dataset, each with a compiled snapshot. Also times
+# `import main` on its own.
+# The lazy numbers are checked against a budget and the run exits 1 when one
+# is over, so it can gate changes like the parser benchmark does.
+# Run from backend/:  python -m benchmarks.bench_coldstart [--competitions 4000] [--budget-import 0.6 --budget-first 1.0]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_IMPORT_S = 0.6  # `import main` in a fresh interpreter
+BUDGET_FIRST_S = 1.0   # process spawn -> first /competitions response, lazy
+
+
+def import_seconds(data_root):
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=data_root, env=dict(os.environ, PYTHONPATH=BACKEND_DIR),
+                         capture_output=True, text=True, check=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def wait_for(client, path, start, server):
+    """Seconds from `start` until GET path answers 200"""
+    while True:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass  # not listening yet
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited while waiting for {path}")
+        time.sleep(0.005)
+
+
+def cold_start(data_root, lazy):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, DATA_RELOAD_SECONDS="0", LAZY_STARTUP="1" if lazy else "0")
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+                              cwd=data_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=600) as client:
+            first = wait_for(client, "/competitions", start, server)
+            ready = wait_for(client, "/ready", start, server)
+            steps = client.get("/ready").json()["steps"]
+        return {"first_s": first, "ready_s": ready, "steps": {s["name"]: s.get("seconds") for s in steps}}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def best_of(runs, measure):
+    results = [measure() for _ in range(runs)]
+    return min(results, key=lambda r: r["first_s"] if isinstance(r, dict) else r)
+
+
+def prepare(root, n_competitions=0):
+    """root/data with the CSVs (synthetic, or the shipped ones when 0) and their
+    compiled snapshot"""
+    data_dir = os.path.join(root, "data")
+    if n_competitions:
+        write_dataset(data_dir, n_competitions)
+    else:
+        os.makedirs(data_dir)
+        for name in ["competitions", "performances", "elements", "components"]:
+            shutil.copy(os.path.join(BACKEND_DIR, "data", f"{name}.csv"), data_dir)
+    subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "data_manager.py")], cwd=root,
+                   env=dict(os.environ, PYTHONPATH=BACKEND_DIR), capture_output=True, check=True)
+
+
+def main_bench(n_competitions, runs, budget_import, budget_first):
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare(tmp, n_competitions)
+        imported = best_of(runs, lambda: import_seconds(tmp))
+        eager = best_of(runs, lambda: cold_start(tmp, lazy=False))
+        lazy = best_of(runs, lambda: cold_start(tmp, lazy=True))
+
+    print(f"{n_competitions or 'shipped'} competitions, best of {runs}")
+    print(f"  import main                : {imported:6.2f}s   (budget {budget_import:.2f}s)")
+    print(f"  eager  first /competitions : {eager['first_s']:6.2f}s   ready {eager['ready_s']:6.2f}s")
+    print(f"  lazy   first /competitions : {lazy['first_s']:6.2f}s   ready {lazy['ready_s']:6.2f}s   (budget {budget_first:.2f}s)")
+    print(f"  lazy   load steps          : {json.dumps(lazy['steps'])}")
+    over = [name for name, value, budget in [("import", imported, budget_import), ("first /competitions", lazy["first_s"], budget_first)]
+            if value > budget]
+    if over:
+        print(f"❌ Over budget: {', '.join(over)}")
+        sys.exit(1)
+    print("✅ Within the cold-start budget")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="API worker cold start, eager vs lazy, with a budget check.")
+    parser.add_argument("--competitions", type=int, default=0, help="synthetic dataset size (default: the shipped data/)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-import", type=float, default=BUDGET_IMPORT_S)
+    parser.add_argument("--budget-first", type=float, default=BUDGET_FIRST_S)
+    args = parser.parse_args()
+    main_bench(args.competitions, args.runs, args.budget_import, args.budget_first)
@@ -0,0 +1,65 @@
+import gc
+import json
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import write_dataset
+
+# Resident memory a worker spends on the loaded data, old list-of-dicts cache
+# vs the columnar store. Each mode runs in a fresh interpreter so RSS is clean.
+# Run from backend/:  python -m benchmarks.bench_memory [--competitions 500]
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(mode, files):
+    """Runs inside the child process; prints the RSS growth caused by loading"""
+    import pandas as pd
+    from store import load_store, release_memory
+    pd.read_csv(files["competitions"]).fillna('').to_dict('records')  # warm up lazy imports in both modes
+    gc.collect()
+    before = rss_mb()
+    if mode == "records":
+        data = {name: pd.read_csv(path).fillna('').to_dict('records') for name, path in files.items()}
+        release_memory()  # same treatment as load_store, so only the layout differs
+    else:
+        data = load_store(files)
+    gc.collect()
+    print(json.dumps({"mode": mode, "rss_mb": rss_mb() - before}))
+    return data
+
+
+def run_child(mode, files):
+    cmd = [sys.executable, "-m", "benchmarks.bench_memory", "--child", mode, json.dumps(files)]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])["rss_mb"]
+
+
+def main_bench(n_competitions):
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_dataset(tmp, n_competitions)
+        rows = sum(1 for path in files.values() for _ in open(path)) - len(files)
+        records = run_child("records", files)
+        columnar = run_child("columnar", files)
+    print(f"{n_competitions} competitions, {rows} rows")
+    print(f"  list of dicts : {records:8.1f} MB")
+    print(f"  columnar      : {columnar:8.1f} MB")
+    print(f"  reduction     : {records / max(columnar, 0.1):8.1f}x")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        measure(sys.argv[2], json.loads(sys.argv[3]))
+    else:
+        import argparse
+        parser = argparse.ArgumentParser(description="Compare per-worker memory of the data cache layouts.")
+        parser.add_argument("--competitions", type=int, default=500)
+        args = parser.parse_args()
+        main_bench(args.competitions)
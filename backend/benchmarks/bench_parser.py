@@ -0,0 +1,146 @@
+import contextlib
+import io
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import protocol_lines, render_protocol
+from scraper import (SKATER_LINE_REGEX, ELEMENT_REGEX, COMPONENT_REGEX, clean_element_name, parse_judges_scores,
+                     parse_protocol)
+from element_codes import classify_element
+from names import normalize_skater_name
+
+# Parser throughput (lines/sec) on recorded protocol text, so parser changes
+# can be checked for regressions without PDFs. Text comes from files recorded
+# with --record (the lines pdfplumber extracts from a real protocol) or, by
+# default, from the repo's dataset rendered back into protocol layout plus a
+# synthetic event. The line-classifying parse_protocol is timed against the
+# previous loop (every full regex on every line, kept below as the reference)
+# and both must return the same skaters.
+# Run from backend/:  python -m benchmarks.bench_parser [--text FILE ...] [--min-lines 200000]
+#   record a PDF:     python -m benchmarks.bench_parser --record protocol.pdf protocol.txt
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def reference_parse(lines, program_type, category):
+    """parse_protocol before line classification"""
+    skaters = []
+    current = None
+    state = "FIND_SKATER"
+    comp_index_counter = 1
+    for line in lines:
+        line = line.strip()
+        if not line: continue
+        skater_match = SKATER_LINE_REGEX.search(line)
+        if skater_match and "Rank Name" not in line:
+            name = normalize_skater_name(skater_match.group(2))
+            print(f"   Found Skater: {name}")
+            current = {
+                "performance": dict(
+                    rank=int(skater_match.group(1)), skater_name=name, nation=skater_match.group(3),
+                    program_type=program_type, category=category, total_score=float(skater_match.group(5)),
+                    tes_score=float(skater_match.group(6)), pcs_score=float(skater_match.group(7)),
+                    deductions=float(skater_match.group(8))),
+                "elements": [],
+                "components": [],
+            }
+            skaters.append(current)
+            state = "READ_ELEMENTS"
+            comp_index_counter = 1
+            continue
+        if state == "READ_ELEMENTS" and current:
+            if "Program Components" in line:
+                state = "READ_COMPONENTS"
+                continue
+            elem_match = ELEMENT_REGEX.search(line)
+            if elem_match:
+                element_name = clean_element_name(elem_match.group(2).strip())
+                current["elements"].append(dict(
+                    element_index=int(elem_match.group(1)), element_name=element_name,
+                    base_value=float(re.sub(r'[xX\s]', '', elem_match.group(3))), goe=float(elem_match.group(4)),
+                    judges_scores=parse_judges_scores(elem_match.group(5)), panel_score=float(elem_match.group(6)),
+                    is_bonus='x' in elem_match.group(3).lower(), **classify_element(element_name)))
+        if state == "READ_COMPONENTS" and current:
+            if "Judges Total Program Component" in line or "Deductions" in line:
+                state = "FIND_SKATER"
+                continue
+            comp_match = COMPONENT_REGEX.search(line)
+            if comp_match:
+                current["components"].append(dict(
+                    component_index=comp_index_counter, component_name=comp_match.group(1),
+                    factor=float(comp_match.group(2)), judges_scores=parse_judges_scores(comp_match.group(3)),
+                    panel_score=float(comp_match.group(4))))
+                comp_index_counter += 1
+    return skaters
+
+
+def dataset_lines():
+    """The repo's dataset turned back into protocol text, one block per segment"""
+    tables = {name: pd.read_csv(os.path.join(DATA_DIR, f"{name}.csv")) for name in ["performances", "elements", "components"]}
+    perfs = tables["performances"].sort_values(["competition_id", "category", "program_type", "rank"], kind="stable")
+    return render_protocol(perfs, tables["elements"], tables["components"])
+
+
+def load_corpus(paths):
+    if paths:
+        lines = []
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                lines.extend(f.read().split("\n"))
+        return lines
+    return dataset_lines() + protocol_lines(24, "Men", "Free", seed=1)
+
+
+def record(pdf_path, out_path):
+    from scraper import iter_lines
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(iter_lines(pdf_path)))
+    print(f"📝 Recorded {pdf_path} -> {out_path}")
+
+
+def best_rate(parse, lines, rounds):
+    best, result = float("inf"), None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # both print every skater
+            result = parse(lines)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best, result
+
+
+def main_bench(paths, min_lines, rounds):
+    corpus = load_corpus(paths)
+    lines = corpus * max(1, -(-min_lines // max(len(corpus), 1)))
+    rate_ref, ref = best_rate(lambda l: reference_parse(l, "Free", "Men"), lines, rounds)
+    rate_new, new = best_rate(lambda l: parse_protocol(l, "Free", "Men"), lines, rounds)
+    unparsed = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        parse_protocol(corpus, "Free", "Men", unparsed)
+
+    print(f"{len(corpus)} recorded lines x{len(lines) // max(len(corpus), 1)} = {len(lines)} lines, best of {rounds}")
+    print(f"  reference (regex per line) : {rate_ref:12,.0f} lines/s")
+    print(f"  classified                 : {rate_new:12,.0f} lines/s  ({rate_new / rate_ref:.1f}x)")
+    print(f"  same skaters               : {new == ref}  ({sum(1 for _ in new)} skaters)")
+    print(f"  unparsed data-like lines   : {len(unparsed)}")
+    for number, line in unparsed[:5]:
+        print(f"    line {number}: {line}")
+    if new != ref:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Protocol parser throughput on recorded text.")
+    parser.add_argument("--text", nargs="*", default=[], help="recorded protocol text files (default: the repo's dataset)")
+    parser.add_argument("--min-lines", type=int, default=200_000, help="repeat the corpus up to at least this many lines")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--record", nargs=2, metavar=("PDF", "OUT"), help="save a PDF's extracted lines as recorded text")
+    args = parser.parse_args()
+    if args.record:
+        record(*args.record)
+    else:
+        main_bench(args.text, args.min_lines, args.rounds)
@@ -0,0 +1,79 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import protocol_lines, write_protocol_pdf
+
+# Wall time and peak memory of reading + parsing one large multi-page protocol:
+# the old whole-document string (full_text += page per page, then split) vs the
+# streaming page-by-page generator, sequential and with parallel page extraction.
+# Each mode runs in a fresh interpreter so peak RSS is clean.
+# Run from backend/:  python -m benchmarks.bench_scrape [--skaters 200] [--workers 4]
+
+
+def concat_lines(pdf_path):
+    """What scrape_pdf used to do before parsing could start"""
+    import pdfplumber
+    with pdfplumber.open(pdf_path) as pdf:
+        full_text = ""
+        for page in pdf.pages:
+            full_text += page.extract_text(layout=True) + "\n"
+    return full_text.split('\n')
+
+
+def peak_mb(who=resource.RUSAGE_SELF):
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def measure(mode, pdf_path, workers):
+    """Runs inside the child process; prints wall time, skaters found and peak RSS"""
+    import contextlib
+    import io
+    from scraper import iter_lines, parse_protocol
+    base = peak_mb()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # parse_protocol prints every skater
+        if mode == "concat":
+            skaters = parse_protocol(concat_lines(pdf_path), "Free", "Men")
+        else:
+            skaters = parse_protocol(iter_lines(pdf_path, workers if mode == "parallel" else 1), "Free", "Men")
+    seconds = time.perf_counter() - start
+    print(json.dumps({"mode": mode, "seconds": seconds, "skaters": len(skaters),
+                      "peak_mb": peak_mb() - base, "workers_peak_mb": peak_mb(resource.RUSAGE_CHILDREN)}))
+
+
+def run_child(mode, pdf_path, workers):
+    cmd = [sys.executable, "-m", "benchmarks.bench_scrape", "--child", mode, pdf_path, str(workers)]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main_bench(n_skaters, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = write_protocol_pdf(os.path.join(tmp, "protocol.pdf"), protocol_lines(n_skaters))
+        import pdfplumber
+        with pdfplumber.open(pdf_path) as pdf:
+            n_pages = len(pdf.pages)
+        results = [run_child(mode, pdf_path, workers) for mode in ["concat", "stream", "parallel"]]
+
+    print(f"{n_skaters} skaters, {n_pages} pages")
+    for r in results:
+        label = f"{r['mode']} ({workers} workers)" if r["mode"] == "parallel" else r["mode"]
+        extra = f", largest worker {r['workers_peak_mb']:.1f} MB" if r["mode"] == "parallel" else ""
+        print(f"  {label:<22}: {r['seconds']:7.2f} s  peak +{r['peak_mb']:6.1f} MB  ({r['skaters']} skaters{extra})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        measure(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        import argparse
+        parser = argparse.ArgumentParser(description="Compare protocol extraction strategies on a large synthetic PDF.")
+        parser.add_argument("--skaters", type=int, default=200)
+        parser.add_argument("--workers", type=int, default=4)
+        args = parser.parse_args()
+        main_bench(args.skaters, args.workers)
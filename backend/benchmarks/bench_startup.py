@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import write_dataset
+from store import load_store
+from snapshot import write_snapshot
+
+# Worker startup: parse the CSVs vs memory-map the compiled snapshot.
+# Each path runs in a fresh interpreter (after imports) and also times the
+# first /performances request, since mapped pages are only read when touched.
+# Run from backend/:  python -m benchmarks.bench_startup [--competitions 500]
+
+
+def measure(mode, files, snapshot_dir):
+    """Runs inside the child process"""
+    from store import load_store
+    from snapshot import load_snapshot
+    start = time.perf_counter()
+    store = load_snapshot(snapshot_dir, files) if mode == "snapshot" else load_store(files)
+    loaded = time.perf_counter()
+    store.get_protocols(1, "Men")
+    first = time.perf_counter()
+    print(json.dumps({"load_ms": (loaded - start) * 1000, "first_request_ms": (first - loaded) * 1000}))
+
+
+def run_child(mode, files, snapshot_dir):
+    cmd = [sys.executable, "-m", "benchmarks.bench_startup", "--child", mode, json.dumps(files), snapshot_dir]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main_bench(n_competitions, repeats=3):
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_dataset(os.path.join(tmp, "csv"), n_competitions)
+        snapshot_dir = os.path.join(tmp, "snapshot")
+        write_snapshot(load_store(files), snapshot_dir)
+
+        print(f"{n_competitions} competitions (best of {repeats})")
+        for mode in ["csv", "snapshot"]:
+            runs = [run_child(mode, files, snapshot_dir) for _ in range(repeats)]
+            load_ms = min(r["load_ms"] for r in runs)
+            first_ms = min(r["first_request_ms"] for r in runs)
+            print(f"  {mode:<9} load {load_ms:9.1f} ms   first request {first_ms:7.2f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        measure(sys.argv[2], json.loads(sys.argv[3]), sys.argv[4])
+    else:
+        import argparse
+        parser = argparse.ArgumentParser(description="Compare CSV and snapshot startup time.")
+        parser.add_argument("--competitions", type=int, default=500)
+        args = parser.parse_args()
+        main_bench(args.competitions)
@@ -0,0 +1,62 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import main
+from store import load_store
+from benchmarks.synthetic import write_dataset
+
+# Per-request latency of the /performances and /summary handlers as the number
+# of competitions grows. With the indexed store the numbers should stay flat.
+# Run from backend/:  python -m benchmarks.bench_store
+
+SIZES = [5, 50, 500]
+REQUESTS = 200
+
+
+def scan_performances(records, competition_id, category):
+    """The pre-index implementation over lists of row dicts, kept here for comparison"""
+    performances, elements, components = records
+    perfs = [p for p in performances if p['competition_id'] == competition_id and p['category'] == category]
+    perf_ids = [p['id'] for p in perfs]
+    relevant_elements = [e for e in elements if e['performance_id'] in perf_ids]
+    relevant_components = [c for c in components if c['performance_id'] in perf_ids]
+    data = []
+    for p in perfs:
+        p_dict = p.copy()
+        p_dict["elements"] = sorted([e for e in relevant_elements if e['performance_id'] == p['id']], key=lambda x: x['element_index'])
+        p_dict["components"] = sorted([c for c in relevant_components if c['performance_id'] == p['id']], key=lambda x: x['component_index'])
+        data.append(p_dict)
+    return data
+
+
+def median_ms(fn, n_competitions, repeats):
+    rng = random.Random(1)
+    timings = []
+    for _ in range(repeats):
+        comp_id = rng.randint(1, n_competitions)
+        category = rng.choice(["Men", "Women"])
+        start = time.perf_counter()
+        fn(comp_id, category)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main_bench():
+    print(f"{'competitions':>12} {'performances':>14} {'summary':>10} {'scan (old)':>12}   (median ms/request)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in SIZES:
+            files = write_dataset(os.path.join(tmp, str(n)), n)
+            store = load_store(files)
+            records = (store.performances.rows(), store.elements.rows(), store.components.rows())
+            perf_ms = median_ms(store.get_protocols, n, REQUESTS)
+            summary_ms = median_ms(lambda c, cat: main.get_competition_summary(c, cat, store), n, REQUESTS)
+            # The old path is O(P*E); a handful of calls is enough to see the trend
+            scan_ms = median_ms(lambda c, cat: scan_performances(records, c, cat), n, 5)
+            print(f"{n:>12} {perf_ms:>14.3f} {summary_ms:>10.3f} {scan_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_workers import free_port
+from benchmarks.synthetic import write_dataset
+
+# /performances for one ever bigger competition: the cached JSON array vs the
+# streamed NDJSON mode, each with all fields and with a projection (no child
+# tables). Reports time to first byte, total time, body size and how far the
+# server's peak RSS rose while answering (VmHWM, reset just before the request).
+# Every (size, mode) gets a fresh uvicorn worker on a compiled snapshot, so the
+# request is a cold one and nothing else moves the peak.
+# Run from backend/:  python -m benchmarks.bench_stream [--skaters 25 250 2500]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECTION = {"fields": "id,skater_name,nation,rank,program_type,category,total_score", "include": ""}
+MODES = {
+    "json": {},
+    "json fields": PROJECTION,
+    "ndjson": {"format": "ndjson"},
+    "ndjson fields": dict(PROJECTION, format="ndjson"),
+}
+
+
+def memory_mb(pid, field):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def reset_peak(pid):
+    with open(f"/proc/{pid}/clear_refs", "w") as f:
+        f.write("5")  # resets VmHWM to the current RSS
+
+
+def request_once(data_root, params):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, DATA_RELOAD_SECONDS="0")
+    log_path = os.path.join(data_root, "uvicorn.log")
+    with open(log_path, "w") as log:
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+                                  cwd=data_root, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        while "Application startup complete" not in open(log_path).read():
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn did not start:\n{open(log_path).read()[-2000:]}")
+            time.sleep(0.05)
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=600, headers={"Accept-Encoding": "identity"}) as client:
+            client.get("/version").raise_for_status()
+            before = memory_mb(server.pid, "VmRSS")
+            reset_peak(server.pid)
+            start = time.perf_counter()
+            first, size = None, 0
+            with client.stream("GET", "/performances/1", params=params) as response:
+                response.raise_for_status()
+                for chunk in response.iter_raw():
+                    if first is None:
+                        first = time.perf_counter() - start
+                    size += len(chunk)
+            total = time.perf_counter() - start
+        return {"ttfb_s": first, "total_s": total, "mb": size / 2**20, "peak_mb": memory_mb(server.pid, "VmHWM") - before}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main_bench(skater_counts):
+    print(f"  {'skaters/event':>13}  {'mode':<14}{'TTFB':>10}{'total':>10}{'body':>10}{'peak RSS +':>12}")
+    for skaters in skater_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_dataset(os.path.join(tmp, "data"), 1, skaters_per_event=skaters)
+            subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "data_manager.py")], cwd=tmp,
+                           env=dict(os.environ, PYTHONPATH=BACKEND_DIR), capture_output=True, check=True)
+            for mode, params in MODES.items():
+                r = request_once(tmp, params)
+                print(f"  {skaters:>13}  {mode:<14}{r['ttfb_s'] * 1000:8.1f}ms{r['total_s'] * 1000:8.1f}ms"
+                      f"{r['mb']:8.2f}MB{r['peak_mb']:10.1f}MB")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="/performances as one JSON array vs streamed NDJSON, by competition size.")
+    parser.add_argument("--skaters", type=int, nargs="+", default=[25, 250, 2500], help="skaters per event (4 events)")
+    args = parser.parse_args()
+    main_bench(args.skaters)
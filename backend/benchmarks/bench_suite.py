@@ -0,0 +1,241 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import pandas as pd
+
+from benchmarks.synthetic import write_dataset
+from benchmarks.bench_parser import best_rate, load_corpus
+from scraper import parse_protocol
+
+# The whole picture in one run, saved as JSON so runs can be compared: for
+# synthetic datasets at multiples of the shipped data/ (10x, 100x, 1000x by
+# default) it measures startup (CSV parse and snapshot map), resident memory of
+# one API worker, and per-endpoint latency and throughput through FastAPI's
+# test client; plus the protocol parser's throughput on canned text (the part
+# of scrape_pdf after pdfplumber). Each scale runs in fresh interpreters whose
+# cwd holds the synthetic data/ directory, like a deployed worker.
+# Run from backend/:  python -m benchmarks.bench_suite [--scales 10 100 1000] [--out results.json]
+#   compare runs:     python -m benchmarks.bench_suite --compare old.json new.json
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
+SCALES = [10, 100, 1000]
+# name -> path; {cid}, {skater} and {season} are filled with a different value per request
+ENDPOINTS = {
+    "competitions": "/competitions",
+    "summaries": "/summaries",
+    "performances": "/performances/{cid}",
+    "performances_category": "/performances/{cid}?category=Women",
+    "summary": "/competition/{cid}/summary",
+    "analytics": "/competition/{cid}/analytics?category=Men",
+    "judges": "/competition/{cid}/judges",
+    "skaters": "/skaters",
+    "skater": "/skaters/{skater}",
+    "element_leaderboard": "/leaderboards/elements?kind=jump&season={season}",
+    "score_leaderboard": "/leaderboards/scores?metric=tes&season={season}",
+    "search": "/search?q={skater}",
+}
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def shipped_size():
+    """Row counts of the repo's dataset, the 1x the scales multiply"""
+    return {name: len(pd.read_csv(os.path.join(DATA_DIR, f"{name}.csv")))
+            for name in ["competitions", "performances", "elements", "components"]}
+
+
+def latencies(client, paths):
+    """Per-request milliseconds for GETs of `paths`, in order"""
+    timings = []
+    for path in paths:
+        start = time.perf_counter()
+        client.get(path).raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    return {"requests": len(timings), "mean_ms": statistics.fmean(timings), "p50_ms": ordered[len(ordered) // 2],
+            "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], "max_ms": ordered[-1],
+            "rps": len(timings) / (sum(timings) / 1000)}
+
+
+def measure(n_requests, endpoints):
+    """Runs inside the child process (cwd = dataset dir). Startup is the app's
+    startup hook (data load), separate from importing the code."""
+    rss_start = rss_mb()
+    start = time.perf_counter()
+    from fastapi.testclient import TestClient
+    import main
+    imported = time.perf_counter()
+    rss_imported = rss_mb()
+    result = {"import_s": imported - start}
+    with TestClient(main.app) as client:
+        result["startup_s"] = time.perf_counter() - imported
+        result["rss_mb"] = rss_mb()
+        result["rss_data_mb"] = result["rss_mb"] - rss_imported
+        if endpoints:
+            comps = client.get("/competitions").json()
+            values = {
+                "cid": [c["id"] for c in comps],
+                "season": sorted({c["year"] for c in comps}),
+                "skater": [quote(s["name"], safe="") for s in client.get("/skaters").json()],
+            }
+            result["endpoints"] = {}
+            for name, template in ENDPOINTS.items():
+                fields = [field for field in values if "{" + field + "}" in template]
+                # Spread over the whole dataset (a stride coprime to its size) so
+                # first hits are real misses; the second pass is served warm.
+                # /competitions and /skaters were already hit above for the values.
+                paths = [template.format(**{field: values[field][(i * 7919) % len(values[field])] for field in fields})
+                         for i in range(n_requests if fields else max(1, n_requests // 10))]
+                cold = latencies(client, paths)
+                warm = latencies(client, paths)
+                result["endpoints"][name] = {"cold": summarize(cold), "warm": summarize(warm)}
+        result["rss_end_mb"] = rss_mb()
+    result["rss_base_mb"] = rss_start
+    print(json.dumps(result))
+
+
+def run_child(data_root, n_requests, endpoints):
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, STORAGE_BACKEND="csv", DATA_RELOAD_SECONDS="0")
+    cmd = [sys.executable, "-m", "benchmarks.bench_suite", "--child", str(n_requests), "1" if endpoints else "0"]
+    out = subprocess.run(cmd, cwd=data_root, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def bench_scale(scale, base, n_requests):
+    n_competitions = scale * base["competitions"]
+    skaters_per_event = max(1, round(base["performances"] / base["competitions"] / 4))  # 2 categories x 2 segments
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        files = write_dataset(os.path.join(tmp, "data"), n_competitions, skaters_per_event=skaters_per_event)
+        generate_s = time.perf_counter() - start
+        rows = {name: sum(1 for _ in open(path)) - 1 for name, path in files.items()}
+        csv_mb = sum(os.path.getsize(path) for path in files.values()) / 2**20
+        print(f"  {scale}x: {rows['performances']:,} performances, {rows['elements']:,} elements ({csv_mb:.0f} MB CSV, generated in {generate_s:.1f}s)")
+
+        csv_run = run_child(tmp, n_requests, endpoints=False)
+        start = time.perf_counter()
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+        subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "data_manager.py")], cwd=tmp, env=env,
+                       capture_output=True, check=True)
+        compile_s = time.perf_counter() - start
+        snapshot_run = run_child(tmp, n_requests, endpoints=True)
+
+    return {
+        "scale": scale, "competitions": n_competitions, "rows": rows, "csv_mb": csv_mb, "generate_s": generate_s,
+        "startup": {"csv_s": csv_run["startup_s"], "snapshot_s": snapshot_run["startup_s"], "compile_snapshot_s": compile_s,
+                    "import_s": snapshot_run["import_s"]},
+        "memory": {"csv_rss_mb": csv_run["rss_mb"], "csv_data_mb": csv_run["rss_data_mb"],
+                   "snapshot_rss_mb": snapshot_run["rss_mb"], "snapshot_data_mb": snapshot_run["rss_data_mb"],
+                   "snapshot_rss_end_mb": snapshot_run["rss_end_mb"]},
+        "endpoints": snapshot_run["endpoints"],
+    }
+
+
+def bench_parse(text_paths, min_lines, rounds):
+    corpus = load_corpus(text_paths)
+    lines = corpus * max(1, -(-min_lines // max(len(corpus), 1)))
+    rate, skaters = best_rate(lambda l: parse_protocol(l, "Free", "Men"), lines, rounds)
+    return {"corpus_lines": len(corpus), "lines": len(lines), "lines_per_s": rate,
+            "skaters_per_s": rate * len(skaters) / len(lines)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_scale(r):
+    s, m = r["startup"], r["memory"]
+    print(f"  {r['scale']}x  startup csv {s['csv_s']:.2f}s / snapshot {s['snapshot_s']:.2f}s"
+          f"   RSS per worker csv {m['csv_rss_mb']:.0f} MB / snapshot {m['snapshot_rss_mb']:.0f} MB (end {m['snapshot_rss_end_mb']:.0f} MB)")
+    print(f"    {'endpoint':<24}{'cold p50':>10}{'cold p95':>10}{'warm p50':>10}{'warm p95':>10}{'warm req/s':>12}")
+    for name, e in r["endpoints"].items():
+        cold, warm = e["cold"], e["warm"]
+        print(f"    {name:<24}{cold['p50_ms']:8.2f}ms{cold['p95_ms']:8.2f}ms{warm['p50_ms']:8.2f}ms{warm['p95_ms']:8.2f}ms{warm['rps']:12,.0f}")
+
+
+def main_bench(scales, n_requests, text_paths, min_lines, rounds, out_path):
+    base = shipped_size()
+    print(f"Shipped dataset: {base['competitions']} competitions, {base['performances']} performances, {base['elements']} elements")
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"), "commit": git_commit(),
+        "python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+        "base": base, "requests_per_endpoint": n_requests, "scales": [],
+    }
+    results["parser"] = bench_parse(text_paths, min_lines, rounds)
+    print(f"  parser: {results['parser']['lines_per_s']:,.0f} lines/s, {results['parser']['skaters_per_s']:,.0f} skaters/s")
+    for scale in scales:
+        results["scales"].append(bench_scale(scale, base, n_requests))
+        print_scale(results["scales"][-1])
+        with open(out_path, "w") as f:  # rewritten after every scale so a long run keeps partial results
+            json.dump(results, f, indent=2)
+    print(f"💾 Results saved to {out_path}")
+
+
+def compare(old_path, new_path):
+    """Side-by-side of the headline numbers of two result files (new / old)"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old_path} ({old.get('commit')}) -> {new_path} ({new.get('commit')}), ratio new/old")
+
+    def line(label, a, b):
+        print(f"  {label:<40}{a:12.2f}{b:12.2f}{b / a if a else float('nan'):8.2f}x")
+
+    line("parser lines/s (k)", old["parser"]["lines_per_s"] / 1000, new["parser"]["lines_per_s"] / 1000)
+    old_scales = {r["scale"]: r for r in old["scales"]}
+    for r in new["scales"]:
+        o = old_scales.get(r["scale"])
+        if o is None:
+            continue
+        print(f"  {r['scale']}x")
+        line("startup csv (s)", o["startup"]["csv_s"], r["startup"]["csv_s"])
+        line("startup snapshot (s)", o["startup"]["snapshot_s"], r["startup"]["snapshot_s"])
+        line("RSS per worker (MB)", o["memory"]["snapshot_rss_mb"], r["memory"]["snapshot_rss_mb"])
+        for name, e in r["endpoints"].items():
+            if name in o["endpoints"]:
+                line(f"{name} cold p50 (ms)", o["endpoints"][name]["cold"]["p50_ms"], e["cold"]["p50_ms"])
+                line(f"{name} warm req/s", o["endpoints"][name]["warm"]["rps"], e["warm"]["rps"])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        measure(int(sys.argv[2]), sys.argv[3] == "1")
+    else:
+        import argparse
+        parser = argparse.ArgumentParser(description="API, memory and parser benchmarks at multiples of the shipped dataset.")
+        parser.add_argument("--scales", type=int, nargs="+", default=SCALES, help="multiples of data/ to generate")
+        parser.add_argument("--requests", type=int, default=100, help="requests per endpoint and pass")
+        parser.add_argument("--text", nargs="*", default=[], help="recorded protocol text for the parser (default: the repo's dataset)")
+        parser.add_argument("--min-lines", type=int, default=200_000)
+        parser.add_argument("--rounds", type=int, default=3)
+        parser.add_argument("--out", default=f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+        parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two saved result files")
+        args = parser.parse_args()
+        if args.compare:
+            compare(*args.compare)
+        else:
+            main_bench(args.scales, args.requests, args.text, args.min_lines, args.rounds, args.out)
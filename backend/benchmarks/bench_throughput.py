@@ -0,0 +1,119 @@
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from benchmarks.synthetic import write_dataset
+
+# Requests/sec for /performances under concurrent load: the generic FastAPI
+# encoder path (re-serialized on every hit) vs the pre-encoded byte cache,
+# plus ETag revalidation (304s). The API runs in a real uvicorn process.
+# Run from backend/:  python -m benchmarks.bench_throughput [--competitions 50 --clients 16 --seconds 5]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def serve(port):
+    """Runs in the server process: the real app plus the old, uncached path for comparison"""
+    import uvicorn
+    import main
+
+    @main.app.get("/bench/uncached/performances/{competition_id}")
+    def uncached_performances(competition_id: int, category: str = None):
+        return main.DataCache.store.get_protocols(competition_id, category)
+
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(base_url + "/").status_code == 200:
+                return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def load(base_url, path_fn, headers_fn, clients, seconds):
+    counts = [0] * clients
+    stop = time.time() + seconds
+
+    def worker(i):
+        rng = random.Random(i)
+        with httpx.Client(base_url=base_url) as client:
+            while time.time() < stop:
+                path, params = path_fn(rng)
+                r = client.get(path, params=params, headers=headers_fn(path, params))
+                assert r.status_code in (200, 304), r.status_code
+                counts[i] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return sum(counts) / seconds
+
+
+def main_bench(n_competitions, clients, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(os.path.join(tmp, "data"), n_competitions)
+        port = free_port()
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR, DATA_RELOAD_SECONDS="0")
+        server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_throughput", "--serve", str(port)],
+                                  cwd=tmp, env=env, stdout=subprocess.DEVNULL)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            wait_until_up(base_url)
+
+            def target(prefix):
+                return lambda rng: (f"{prefix}/performances/{rng.randint(1, n_competitions)}", {"category": rng.choice(["Men", "Women"])})
+
+            # What a returning visitor already holds for every (competition, category)
+            with httpx.Client(base_url=base_url) as client:
+                etags = {
+                    (f"/performances/{c}", cat): client.get(f"/performances/{c}", params={"category": cat},
+                                                            headers={"Accept-Encoding": "gzip"}).headers["etag"]
+                    for c in range(1, n_competitions + 1) for cat in ["Men", "Women"]
+                }
+
+            def revalidate(path, params):
+                return {"Accept-Encoding": "gzip", "If-None-Match": etags[(path, params["category"])]}
+
+            gzip_only = lambda path, params: {"Accept-Encoding": "gzip"}
+            print(f"{n_competitions} competitions, {clients} concurrent clients, {seconds}s each")
+            for label, path_fn, headers_fn in [
+                ("uncached (generic encoder)", target("/bench/uncached"), gzip_only),
+                ("cached bytes (gzip)", target(""), gzip_only),
+                ("cached, ETag revalidation", target(""), revalidate),
+            ]:
+                load(base_url, path_fn, headers_fn, clients, 1)  # warm the caches
+                print(f"  {label:<28} {load(base_url, path_fn, headers_fn, clients, seconds):8.1f} req/s")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--serve":
+        serve(int(sys.argv[2]))
+    else:
+        import argparse
+        parser = argparse.ArgumentParser(description="Throughput of /performances, uncached vs cached.")
+        parser.add_argument("--competitions", type=int, default=50)
+        parser.add_argument("--clients", type=int, default=16)
+        parser.add_argument("--seconds", type=float, default=5)
+        args = parser.parse_args()
+        main_bench(args.competitions, args.clients, args.seconds)
@@ -0,0 +1,59 @@
+import tempfile
+import time
+
+import verify
+from benchmarks.synthetic import write_dataset
+
+# verify.py over the whole dataset, at sizes we don't have yet: time to read the
+# CSVs and to recompute every score, and the discrepancies found (the synthetic
+# data follows the scoring rules, so any is a false alarm). Then the same
+# tables with misparses planted in some performances - an element dropped, two
+# judges' marks run together, an 'x' bonus mark missed - and how many of those
+# performances the check flags.
+# Run from backend/:  python -m benchmarks.bench_verify [--competitions 10 100 1000]
+
+PLANTED = 200  # performances per kind of misparse
+
+
+def plant(perfs, elems, kind, n):
+    """Copy of the elements table with one `kind` misparse in each of n performances"""
+    elems = elems.copy()
+    rows = elems[elems["performance_id"].isin(perfs["id"].sample(n, random_state=0))]
+    if kind == "bonus":
+        rows = rows[rows["is_bonus"]]
+    picked = rows.groupby("performance_id").sample(1, random_state=0).index
+    if kind == "dropped element":
+        return elems.drop(picked), len(picked)
+    if kind == "marks run together":
+        elems.loc[picked, "judges_scores"] = elems.loc[picked, "judges_scores"].str.replace(",", "", n=1)
+    else:
+        elems.loc[picked, "is_bonus"] = False
+    return elems, len(picked)
+
+
+def main_bench(sizes):
+    print(f"  {'competitions':>12}{'performances':>14}{'elements':>11}{'read':>9}{'check':>9}{'found':>7}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            files = write_dataset(tmp, n)
+            start = time.perf_counter()
+            perfs, elems, comps = verify.read_csvs(files)
+            read = time.perf_counter() - start
+        start = time.perf_counter()
+        found = verify.check(perfs, elems, comps)
+        checked = time.perf_counter() - start
+        print(f"  {n:>12}{len(perfs):>14,}{len(elems):>11,}{read:8.2f}s{checked:8.2f}s{len(found):>7}")
+
+    print(f"\n  planted in {PLANTED} performances of the {sizes[-1]}-competition tables:")
+    for kind in ["dropped element", "marks run together", "bonus"]:
+        planted, count = plant(perfs, elems, kind, PLANTED)
+        flagged = verify.check(perfs, planted, comps)["performance_id"].nunique()
+        print(f"  {kind + (' mark missed' if kind == 'bonus' else ''):<22}: {flagged}/{count} flagged")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Score verification over ever bigger datasets, and what it catches.")
+    parser.add_argument("--competitions", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    main_bench(args.competitions)
@@ -0,0 +1,137 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from benchmarks.synthetic import write_dataset
+
+# Total memory of N uvicorn workers serving the same data: each worker loading
+# its own copy from the CSVs vs SHARED_SNAPSHOT=1, where one worker compiles
+# the snapshot and all of them map it. Both start from CSVs only.
+# Memory is PSS (proportional set size): a page mapped by k workers counts 1/k
+# to each, so the sum over workers is what the machine really spends. Summed
+# RSS would count every shared page once per worker. "data" subtracts what the
+# same number of workers use with (almost) no data, i.e. the interpreters.
+# Run from backend/:  python -m benchmarks.bench_workers [--competitions 2000] [--workers 1 2 4 8]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {"private": "0", "shared": "1"}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def smaps(pid):
+    """(rss, pss, uss) MB of one process"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return values["Rss"], values["Pss"], values["Private_Clean"] + values["Private_Dirty"]
+
+
+def workers_of(pid):
+    """uvicorn's worker processes (spawned children of the master; with one
+    worker uvicorn serves from the master itself)"""
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        children = [int(c) for c in f.read().split()]
+    workers = []
+    for child in children:
+        with open(f"/proc/{child}/cmdline", "rb") as f:
+            if b"multiprocessing" in f.read():
+                workers.append(child)
+    return workers or [pid]
+
+
+def touch(port, competition_ids, clients=8, per_client=25):
+    """Concurrent requests across the dataset so every worker reads the data
+    (uncompressed: compression costs CPU here, not data memory)"""
+    def run(offset):
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120, headers={"Accept-Encoding": "identity"}) as client:
+            for i in range(per_client):
+                cid = competition_ids[(offset * per_client + i) * 7919 % len(competition_ids)]
+                client.get(f"/performances/{cid}").raise_for_status()
+                client.get(f"/competition/{cid}/analytics", params={"category": "Men"}).raise_for_status()
+            client.get("/leaderboards/scores").raise_for_status()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def run_server(data_root, mode, n_workers):
+    """Start uvicorn with n workers on a copy of the data, wait until every
+    worker has loaded, exercise it and measure. Returns the numbers."""
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, SHARED_SNAPSHOT=MODES[mode], DATA_RELOAD_SECONDS="0")
+    log_path = os.path.join(data_root, "uvicorn.log")
+    with open(log_path, "w") as log:
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(n_workers)],
+                                  cwd=data_root, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        start = time.perf_counter()
+        while True:
+            with open(log_path) as f:
+                ready = f.read().count("Application startup complete")
+            if ready >= n_workers:
+                break
+            if server.poll() is not None or time.perf_counter() - start > 600:
+                raise RuntimeError(f"uvicorn did not start:\n{open(log_path).read()[-2000:]}")
+            time.sleep(0.1)
+        startup = time.perf_counter() - start
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            ids = [c["id"] for c in client.get("/competitions").json()]
+            versions = {client.get("/version").json()["version"] for _ in range(4 * n_workers)}
+        touch(port, ids)
+        totals = [0.0, 0.0, 0.0]
+        for pid in workers_of(server.pid):
+            totals = [a + b for a, b in zip(totals, smaps(pid))]
+        return {"startup_s": startup, "rss_mb": totals[0], "pss_mb": totals[1], "uss_mb": totals[2], "versions": len(versions)}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def measure(template_root, mode, n_workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copytree(os.path.join(template_root, "data"), os.path.join(tmp, "data"))
+        return run_server(tmp, mode, n_workers)
+
+
+def main_bench(n_competitions, worker_counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        big, small = os.path.join(tmp, "big"), os.path.join(tmp, "small")
+        write_dataset(os.path.join(big, "data"), n_competitions)
+        write_dataset(os.path.join(small, "data"), 1)
+        csv_mb = sum(os.path.getsize(os.path.join(big, "data", f)) for f in os.listdir(os.path.join(big, "data"))) / 2**20
+
+        print(f"{n_competitions} competitions ({csv_mb:.0f} MB of CSV), memory summed over workers after {8 * 25 * 2} requests")
+        print(f"  {'mode':<9}{'workers':>8}{'startup':>10}{'RSS':>10}{'PSS':>10}{'data PSS':>10}{'per worker':>12}{'versions':>10}")
+        for mode in MODES:
+            for n in worker_counts:
+                base = measure(small, mode, n)
+                r = measure(big, mode, n)
+                data = r["pss_mb"] - base["pss_mb"]
+                print(f"  {mode:<9}{n:>8}{r['startup_s']:9.1f}s{r['rss_mb']:8.0f}MB{r['pss_mb']:8.0f}MB{data:8.0f}MB"
+                      f"{data / n:10.0f}MB{r['versions']:>10}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Memory of N API workers, private copies vs one shared snapshot.")
+    parser.add_argument("--competitions", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    main_bench(args.competitions, args.workers)
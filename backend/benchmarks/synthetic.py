@@ -0,0 +1,169 @@
+import os
+import random
+import pandas as pd
+from element_codes import add_element_codes
+
+# Generates realistic-looking competitions / performances / elements / components
+# CSVs so the API and ingest code can be measured at sizes we don't have yet.
+# Run from backend/:  python -m benchmarks.synthetic --competitions 100 --out /tmp/synth
+
+NATIONS = ["JPN", "USA", "ITA", "FRA", "KOR", "CAN", "GEO", "EST", "CHN", "SUI", "BEL", "GER"]
+GIVEN = ["Shun", "Kao", "Yuma", "Adam", "Daniel", "Kevin", "Mao", "Amber", "Loena", "Isabeau", "Nina", "Ami"]
+FAMILY = ["SATO", "MIURA", "KAGIYAMA", "SIAO HIM FA", "GRASSL", "AYMOZ", "SHIMADA", "GLENN", "HENDRICKX", "LEVITO", "PINZARRONE", "NAKAI"]
+
+JUMPS = ["4Lz", "4F", "4S", "4T", "3A", "3Lz", "3F", "3Lo", "3S", "3T", "2A", "3Lz+3T", "4T+3T", "3F+3T", "3A+1Eu+3S", "3A+2A+SEQ", "3Lo<", "3Lzq", "3F!"]
+SPINS = ["CCoSp4", "FCSp4", "FSSp4", "LSp4", "CSSp4", "FCCoSp3", "CCSp3"]
+BASE = {"4Lz": 11.5, "4F": 11.0, "4S": 9.7, "4T": 9.5, "3A": 8.0, "3Lz": 5.9, "3F": 5.3, "3Lo": 4.9, "3S": 4.3,
+        "3T": 4.2, "2A": 3.3, "3Lz+3T": 10.1, "4T+3T": 13.7, "3F+3T": 9.5, "3A+1Eu+3S": 12.8,
+        "3A+2A+SEQ": 11.3, "3Lo<": 3.92, "3Lzq": 5.9, "3F!": 5.3}
+COMPONENTS = ["Composition", "Presentation", "Skating Skills"]
+FACTORS = {("Men", "Short"): 1.67, ("Men", "Free"): 3.33, ("Women", "Short"): 1.33, ("Women", "Free"): 2.67}
+
+
+def _element(rng, name, is_jump):
+    base = BASE.get(name, 3.2) if is_jump else (3.9 if name.startswith("StSq") else 3.0 if name.startswith("ChSq") else 3.5)
+    marks = [rng.randint(-2, 4) for _ in range(9)]
+    trimmed = sorted(marks)[1:-1]
+    step = 0.5 if name.startswith("ChSq") else base * 0.1  # a ChSq's GOE is a fixed 0.5 per grade
+    goe = round(step * sum(trimmed) / len(trimmed), 2)
+    return base, goe, ",".join(str(m) for m in marks)
+
+
+def generate(n_competitions, skaters_per_event=12, seed=0):
+    """Return (competitions, performances, elements, components) DataFrames"""
+    rng = random.Random(seed)
+    comps, perfs, elems, pcs = [], [], [], []
+    perf_id = elem_id = comp_row_id = 1
+
+    for comp_id in range(1, n_competitions + 1):
+        comps.append({"id": comp_id, "name": f"Synthetic Event {comp_id}", "year": f"{2000 + comp_id % 30}-{2001 + comp_id % 30}",
+                      "location": "Somewhere, XYZ", "date": "Nov 21-22"})
+        for category in ["Men", "Women"]:
+            skaters = [(f"{rng.choice(GIVEN)} {rng.choice(FAMILY)}", rng.choice(NATIONS)) for _ in range(skaters_per_event)]
+            for program in ["Short", "Free"]:
+                n_jumps = 3 if program == "Short" else 7
+                for rank, (name, nation) in enumerate(skaters, start=1):
+                    layout = [(rng.choice(JUMPS), True) for _ in range(n_jumps)]
+                    layout += [(rng.choice(SPINS), False) for _ in range(3)]
+                    layout += [("StSq" + str(rng.randint(2, 4)), False)]
+                    if program == "Free":
+                        layout += [("ChSq1", False)]
+
+                    tes = 0.0
+                    for idx, (el_name, is_jump) in enumerate(layout, start=1):
+                        base, goe, marks = _element(rng, el_name, is_jump)
+                        is_bonus = is_jump and idx > len(layout) // 2
+                        if is_bonus:
+                            base = round(base * 1.1, 2)
+                        score = round(base + goe, 2)
+                        tes += score
+                        elems.append({"id": elem_id, "performance_id": perf_id, "element_index": idx, "element_name": el_name,
+                                      "base_value": base, "goe": goe, "panel_score": score, "judges_scores": marks, "is_bonus": is_bonus})
+                        elem_id += 1
+
+                    factor = FACTORS[(category, program)]
+                    pcs_total = 0.0
+                    for idx, c_name in enumerate(COMPONENTS, start=1):
+                        marks = [round(rng.uniform(6, 9.75) * 4) / 4 for _ in range(9)]
+                        score = round(sum(sorted(marks)[1:-1]) / 7, 2)
+                        pcs_total += score * factor
+                        pcs.append({"id": comp_row_id, "performance_id": perf_id, "component_index": idx, "component_name": c_name,
+                                    "factor": factor, "panel_score": score, "judges_scores": ",".join(f"{m:.2f}" for m in marks)})
+                        comp_row_id += 1
+
+                    tes, pcs_total = round(tes, 2), round(pcs_total, 2)
+                    perfs.append({"id": perf_id, "competition_id": comp_id, "skater_name": name, "nation": nation, "rank": rank,
+                                  "program_type": program, "category": category, "total_score": round(tes + pcs_total, 2),
+                                  "tes_score": tes, "pcs_score": pcs_total, "deductions": 0.0})
+                    perf_id += 1
+
+    return pd.DataFrame(comps), pd.DataFrame(perfs), add_element_codes(pd.DataFrame(elems)), pd.DataFrame(pcs)
+
+
+def write_dataset(out_dir, n_competitions, **kwargs):
+    """Write a synthetic dataset as CSVs and return a FILES-style path dict"""
+    os.makedirs(out_dir, exist_ok=True)
+    files = {name: os.path.join(out_dir, f"{name}.csv") for name in ["competitions", "performances", "elements", "components"]}
+    for name, df in zip(files, generate(n_competitions, **kwargs)):
+        df.to_csv(files[name], index=False)
+    return files
+
+
+def protocol_lines(skaters=24, category="Men", program="Free", seed=0):
+    """Judges-details text for one synthetic event, laid out like the ISU
+    protocols scraper.py reads (one block per skater)"""
+    _, perfs, elems, pcs = generate(1, skaters_per_event=skaters, seed=seed)
+    perfs = perfs[(perfs["category"] == category) & (perfs["program_type"] == program)]
+    return render_protocol(perfs, elems, pcs)
+
+
+def render_protocol(perfs, elems, pcs):
+    """Judges-details text for the given performance rows (and their element
+    and component rows), e.g. to turn the real dataset back into protocol text"""
+    def mark(value, fmt):
+        try:
+            return format(float(value), fmt)
+        except ValueError:
+            return f"{value:>2}"  # '-' for a judge without a mark
+
+    lines = []
+    for p in perfs.itertuples():
+        lines.append("Rank Name                       Nation  Starting  Total    Total     Total      Total")
+        lines.append("                                        Number    Segment  Element   Program    Deductions")
+        lines.append(f"{p.rank:>4} {p.skater_name:<26} {p.nation}  {p.rank + 2:>8}  {p.total_score:7.2f}  {p.tes_score:7.2f}  "
+                     f"{p.pcs_score:8.2f}  {p.deductions:9.2f}")
+        lines.append("  #  Executed Elements    Info  Base Value  GOE    J1 J2 J3 J4 J5 J6 J7 J8 J9  Ref  Scores of Panel")
+        for e in elems[elems["performance_id"] == p.id].itertuples():
+            bonus = " x" if e.is_bonus else "  "
+            marks = " ".join(mark(m, ">2.0f") for m in str(e.judges_scores).split(","))
+            lines.append(f"{e.element_index:>3}  {e.element_name:<20} {e.base_value:10.2f}{bonus} {e.goe:6.2f}  {marks}  {e.panel_score:8.2f}")
+        lines.append(f"{'':>36}{sum(e for e in elems[elems['performance_id'] == p.id]['base_value']):8.2f}{p.tes_score:44.2f}")
+        lines.append("     Program Components                  Factor")
+        for c in pcs[pcs["performance_id"] == p.id].itertuples():
+            marks = " ".join(mark(m, ".2f") for m in str(c.judges_scores).split(","))
+            lines.append(f"     {c.component_name:<30} {c.factor:6.2f}  {marks}  {c.panel_score:6.2f}")
+        lines.append(f"     Judges Total Program Component Score (factored){p.pcs_score:40.2f}")
+        lines.append(f"     Deductions:{-p.deductions:70.2f}")
+        lines.append("")
+    return lines
+
+
+def write_protocol_pdf(path, lines, lines_per_page=60):
+    """Minimal text-only PDF (Courier, one line per row) that pdfplumber can read back"""
+    def escape(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    n_pages = len(pages)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>",
+               b"<< /Type /Pages /Kids [" + b" ".join(f"{4 + 2 * i} 0 R".encode() for i in range(n_pages))
+               + f"] /Count {n_pages} >>".encode(),
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>"]
+    for i, page in enumerate(pages):
+        text = "BT /F1 7 Tf 9 TL 20 800 Td " + " ".join(f"({escape(line)}) Tj T*" for line in page) + " ET"
+        stream = text.encode("latin-1", "replace")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+                       f"/Contents {5 + 2 * i} 0 R >>".encode())
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{off:010d} 00000 n \n".encode() for off in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate a synthetic skating scores dataset.")
+    parser.add_argument("--competitions", type=int, default=100)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    write_dataset(args.out, args.competitions)
+    print(f"✅ Wrote {args.competitions} synthetic competitions to {args.out}")
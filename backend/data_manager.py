@@ -1,15 +1,24 @@
 import pandas as pd
+import csv
+import fcntl
+import io
+import json
 import os
+import time
+from contextlib import contextmanager
 from models import Competition, SkaterPerformance, Element, Component
+from element_codes import add_element_codes
+from store import load_store
+from snapshot import write_snapshot
+# Paths and the storage backend live in datafiles.py (importable without pandas)
+from datafiles import (DATA_DIR, STORAGE_BACKEND, SNAPSHOT_DIR, LOCK_FILE, JOURNAL_FILE, INGEST_METRICS_FILE, FILES,
+                       load_ingest_metrics)
 
-DATA_DIR = "data"
-os.makedirs(DATA_DIR, exist_ok=True)
-
-FILES = {
-    "competitions": f"{DATA_DIR}/competitions.csv",
-    "performances": f"{DATA_DIR}/performances.csv",
-    "elements": f"{DATA_DIR}/elements.csv",
-    "components": f"{DATA_DIR}/components.csv"
+MODELS = {
+    "competitions": Competition,
+    "performances": SkaterPerformance,
+    "elements": Element,
+    "components": Component
 }
 
 def get_model_fields(model_class):
@@ -20,28 +29,121 @@ def get_model_fields(model_class):
 
 def init_csvs():
     """Create empty CSVs with headers if they don't exist"""
+    _create_csvs()
+    upgrade_csvs()
+
+def _create_csvs():
     for name, path in FILES.items():
         if not os.path.exists(path):
-            if name == "competitions":
-                cols = get_model_fields(Competition)
-            elif name == "performances":
-                cols = get_model_fields(SkaterPerformance)
-            elif name == "elements":
-                cols = get_model_fields(Element)
-            elif name == "components":
-                cols = get_model_fields(Component)
-            
+            cols = get_model_fields(MODELS[name])
             df = pd.DataFrame(columns=cols)
             df.to_csv(path, index=False)
 
+def _missing_columns(name, path):
+    """Model columns the CSV's header lacks (none for an empty file)"""
+    with open(path, newline='') as f:
+        header = next(csv.reader([f.readline()]), [])
+    return [col for col in get_model_fields(MODELS[name]) if header and col not in header]
+
+def upgrade_csvs():
+    """Add the columns a model gained after its CSV was written (the derived
+    element columns, see element_codes.py), rewriting that file once so rows
+    appended from now on line up with the header"""
+    for name, path in FILES.items():
+        if not _missing_columns(name, path):
+            continue
+        with file_lock():
+            recover()
+            _upgrade_csv(name, path)
+
+def _upgrade_csv(name, path):
+    """upgrade_csvs for one file, with file_lock already held"""
+    missing = _missing_columns(name, path)
+    if not missing:
+        return  # another process upgraded it while we waited for the lock
+    cols = get_model_fields(MODELS[name])
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)  # existing values are copied as written
+    if name == "elements":
+        df = add_element_codes(df)
+    df = df.reindex(columns=cols + [col for col in df.columns if col not in cols], fill_value="")
+    tmp = path + ".tmp"
+    with open(tmp, 'w', newline='') as out:
+        df.to_csv(out, index=False)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, path)
+    print(f"🛠️ Added {missing} to {path}")
+
 def get_next_id(file_key):
-    """Robust auto-increment logic"""
+    """Next free id. Rows are only ever appended with increasing ids, so the
+    last line of the CSV holds the max: read just the tail instead of the file."""
     path = FILES[file_key]
     
     # If file doesn't exist, start at 1
     if not os.path.exists(path): 
         return 1
-    
+
+    last = read_last_line(path)
+    if not last:
+        return 1
+    try:
+        first_field = next(csv.reader([last]))[0]
+    except (csv.Error, StopIteration):
+        return scan_next_id(file_key)
+    if first_field == 'id':
+        return 1  # header only
+    try:
+        return int(float(first_field)) + 1
+    except ValueError:
+        return scan_next_id(file_key)
+
+def read_last_line(path, block=4096):
+    """Last non-empty line of a file, read backwards from the end"""
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        end = f.tell()
+        data = b''
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+            stripped = data.rstrip(b'\r\n')
+            if b'\n' in stripped or end == 0:
+                return stripped.rsplit(b'\n', 1)[-1].decode('utf-8')
+    return ''
+
+def read_rows_after(file_key, after_id, block=65536):
+    """Rows with an id above `after_id`. Rows are only ever appended with
+    increasing ids (a rewrite keeps their order), so they are the file's tail:
+    read backwards from the end until a row at or below `after_id` shows up."""
+    path = FILES[file_key]
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(0, 2)
+        end = f.tell()
+        data = b''
+        while end > len(header):
+            start = max(len(header), end - block)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+            lines = data.split(b'\n', 1) if end > len(header) else [b'', data]
+            first = lines[1].split(b',', 1)[0] if len(lines) > 1 else b''
+            if first.strip().isdigit() and int(first) <= after_id:
+                data = lines[1]
+                break
+    if not data.strip():
+        return pd.DataFrame()
+    df = pd.read_csv(io.BytesIO(header + data))
+    return df[df["id"] > after_id]
+
+def scan_next_id(file_key):
+    """Full-read fallback for get_next_id"""
+    path = FILES[file_key]
+
     # Read CSV, ensuring 'id' column is treated as numeric
     try:
         df = pd.read_csv(path)
@@ -65,12 +167,7 @@ def get_next_id(file_key):
         # In a script, we might want to crash here, but for now we fallback
         return 1
 
-def save_records(file_key, records: list):
-    """Append a list of objects to the CSV"""
-    if not records: return
-    
-    path = FILES[file_key]
-    
+def _records_frame(records):
     # Convert Pydantic models to dicts (Handle V1 and V2)
     data = []
     for r in records:
@@ -78,13 +175,166 @@ def save_records(file_key, records: list):
             data.append(r.model_dump()) # V2
         else:
             data.append(r.dict()) # V1
+    return pd.DataFrame(data)
 
-    new_df = pd.DataFrame(data)
-    
-    # Check if file exists and has content (header)
-    file_exists = os.path.exists(path) and os.path.getsize(path) > 0
-    
-    new_df.to_csv(path, mode='a', header=not file_exists, index=False)
+# --- transactional writes ---
+# Importers write the four CSVs under an exclusive lock file, all or nothing.
+#
+# Appends (the normal import): before the first byte is written the current
+# file sizes go to a journal, which is removed once every table is written and
+# synced. A journal left behind by a crash is rolled back (files truncated to
+# the journaled sizes) by the next writer.
+#
+# Rewrites (a re-import replacing rows): every touched table is written in full
+# to <file>.tmp first. Writing the journal listing the renames is the commit
+# point; a crash after it is rolled forward by finishing the renames, a crash
+# before it just leaves .tmp files that are discarded.
+#
+# Either way the tables never end up with performances whose elements are missing.
+
+@contextmanager
+def file_lock():
+    with open(LOCK_FILE, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def recover():
+    """Finish or undo a write left half-done by a crashed importer"""
+    journal = {}
+    if os.path.exists(JOURNAL_FILE):
+        try:
+            with open(JOURNAL_FILE) as f:
+                journal = json.load(f)
+        except json.JSONDecodeError:
+            pass  # crashed while writing the journal itself: nothing was written yet
+    for path, size in journal.get("truncate", {}).items():
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            os.truncate(path, size)
+            print(f"↩️ Rolled back incomplete append to {path}")
+    for tmp, path in journal.get("rename", {}).items():
+        if os.path.exists(tmp):
+            os.replace(tmp, path)
+            print(f"↪️ Finished interrupted rewrite of {path}")
+    for path in FILES.values():
+        if os.path.exists(path + ".tmp"):
+            os.remove(path + ".tmp")
+    if os.path.exists(JOURNAL_FILE):
+        os.remove(JOURNAL_FILE)
+
+def _fsync_write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _csv_lines(records):
+    """Records rendered exactly as to_csv appends them, keyed by id"""
+    text = _records_frame(records).to_csv(header=False, index=False)
+    return {str(r.id): line for r, line in zip(records, text.splitlines(keepends=True))}
+
+def _rewrite(path, tmp, replaced, deleted, appended):
+    """Copy `path` to `tmp` line by line, swapping in replaced rows (same id,
+    same position), dropping deleted ones and appending the new rows"""
+    replacements = _csv_lines(replaced) if replaced else {}
+    with open(path, newline='') as src, open(tmp, 'w', newline='') as out:
+        header = src.readline()
+        out.write(header)
+        columns = next(csv.reader([header]))
+        drop = [(columns.index(col), {str(v) for v in values}) for col, values in deleted.items()]
+        width = max([i for i, _ in drop] + [0]) + 1
+        for line in src:
+            fields = line.split(',', width)  # ids are the leading, never-quoted columns
+            if any(fields[i] in values for i, values in drop):
+                continue
+            out.write(replacements.pop(fields[0], line))
+        out.writelines(replacements.values())
+        if appended:
+            _records_frame(appended).to_csv(out, header=False, index=False)
+        out.flush()
+        os.fsync(out.fileno())
+
+class Transaction:
+    """Changes per table, collected inside `with transaction() as tx`"""
+
+    def __init__(self):
+        self.pending = {name: [] for name in FILES}
+        self.replaced = {name: [] for name in FILES}   # records overwriting the row with the same id
+        self.deleted = {name: {} for name in FILES}    # column -> values whose rows are dropped
+        self.on_commit = []                            # callbacks run after a successful commit, still under the lock
+
+    def add(self, file_key, records):
+        self.pending[file_key].extend(records)
+
+    def replace(self, file_key, records):
+        self.replaced[file_key].extend(records)
+
+    def delete(self, file_key, column, values):
+        self.deleted[file_key].setdefault(column, set()).update(values)
+
+    def commit(self):
+        if any(self.replaced.values()) or any(self.deleted.values()):
+            self._commit_rewrite()
+        else:
+            self._commit_append()
+        for callback in self.on_commit:
+            callback()
+
+    def _commit_append(self):
+        frames = {name: _records_frame(records) for name, records in self.pending.items() if records}
+        if not frames:
+            return
+        sizes = {FILES[name]: os.path.getsize(FILES[name]) if os.path.exists(FILES[name]) else 0 for name in frames}
+        _fsync_write(JOURNAL_FILE, json.dumps({"truncate": sizes}))
+        try:
+            for name, df in frames.items():
+                path = FILES[name]
+                # Check if file exists and has content (header)
+                file_exists = sizes[path] > 0
+                with open(path, 'a', newline='') as f:
+                    df.to_csv(f, header=not file_exists, index=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+        except BaseException:
+            recover()
+            raise
+        os.remove(JOURNAL_FILE)
+
+    def _commit_rewrite(self):
+        _create_csvs()
+        for name, path in FILES.items():
+            _upgrade_csv(name, path)  # transaction() holds the lock: file_lock() here would wait on ourselves
+        touched = [name for name in FILES if self.pending[name] or self.replaced[name] or self.deleted[name]]
+        renames = {FILES[name] + ".tmp": FILES[name] for name in touched}
+        try:
+            for name in touched:
+                _rewrite(FILES[name], FILES[name] + ".tmp", self.replaced[name], self.deleted[name], self.pending[name])
+        except BaseException:
+            recover()  # no journal yet: just drops the .tmp files
+            raise
+        _fsync_write(JOURNAL_FILE, json.dumps({"rename": renames}))
+        for tmp, path in renames.items():
+            os.replace(tmp, path)
+        os.remove(JOURNAL_FILE)
+
+@contextmanager
+def transaction():
+    """Exclusive, all-or-nothing write to the CSVs. IDs read with get_next_id
+    inside the block stay valid until it commits on exit; an exception inside
+    the block writes nothing."""
+    with file_lock():
+        recover()
+        tx = Transaction()
+        yield tx
+        tx.commit()
+
+def save_records(file_key, records: list):
+    """Append a list of objects to the CSV"""
+    if not records: return
+    with transaction() as tx:
+        tx.add(file_key, records)
 
 def load_data(file_key):
     """Load data from CSV into a list of dictionaries"""
@@ -95,4 +345,39 @@ def load_data(file_key):
         return pd.read_csv(path).fillna('').to_dict('records')
     except Exception as e:
         print(f"⚠️ Error loading {file_key}: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def read_columns(file_key, columns):
+    """Just the given columns of a table, as a DataFrame"""
+    path = FILES[file_key]
+    try:
+        return pd.read_csv(path, usecols=columns)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame(columns=columns)
+
+def compile_snapshot():
+    """Compile the CSVs into the binary snapshot the API memory-maps on startup.
+    Run after every ingest; the API falls back to the CSVs while it is stale.
+    Holds the data lock, like API workers publishing one in shared mode."""
+    with file_lock():
+        path = write_snapshot(load_store(FILES), SNAPSHOT_DIR)
+    print(f"📦 Snapshot compiled: {path}")
+    return path
+
+def record_ingest(timer, parsed=0, cached=0):
+    """Add one importer run's phase timings (metrics.PhaseTimer) to the running
+    totals the API exposes at /metrics"""
+    with file_lock():
+        totals = load_ingest_metrics() or {"seconds": {}, "pdfs": {}}
+        for name, seconds in timer.seconds.items():
+            totals["seconds"][name] = totals["seconds"].get(name, 0.0) + seconds
+        for result, count in [("parsed", parsed), ("cached", cached)]:
+            totals["pdfs"][result] = totals["pdfs"].get(result, 0) + count
+        totals["last_run"] = time.time()
+        tmp = INGEST_METRICS_FILE + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(totals, f)
+        os.replace(tmp, INGEST_METRICS_FILE)
+
+if __name__ == "__main__":
+    compile_snapshot()
@@ -1,13 +1,38 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, Boolean
+import os
+import pandas as pd
+from sqlalchemy import create_engine, event, select, insert, update, delete, bindparam, func, Index
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from import_cache import already_imported, record_import
+from data_manager import file_lock
+from element_codes import add_element_codes, classify_element
 
-DATABASE_URL = "sqlite:///./skating_scores.db"
+# SQLite storage backend (STORAGE_BACKEND=sqlite, see data_manager.py).
+# WAL lets API readers and an importer work at the same time; every connection
+# comes from the engine's pool and the API opens one session per request.
+# PRAGMA user_version doubles as the data version: each write bumps it.
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./skating_scores.db")
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+@event.listens_for(engine, "connect")
+def _configure_connection(dbapi_conn, _):
+    # Let SQLAlchemy emit BEGIN itself (see _begin) instead of pysqlite's lazy one
+    dbapi_conn.isolation_level = None
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+@event.listens_for(engine, "begin")
+def _begin(conn):
+    # Writers ask for BEGIN IMMEDIATE so two importers can't both read the same max(id)
+    conn.exec_driver_sql("BEGIN IMMEDIATE" if conn.get_execution_options().get("immediate") else "BEGIN")
+
 class Competition(Base):
     __tablename__ = "competitions"
     id = Column(Integer, primary_key=True, index=True)
@@ -18,6 +43,7 @@ class Competition(Base):
 
 class SkaterPerformance(Base):
     __tablename__ = "performances"
+    __table_args__ = (Index("ix_performances_competition_category_program", "competition_id", "category", "program_type"),)
     id = Column(Integer, primary_key=True, index=True)
     competition_id = Column(Integer, ForeignKey("competitions.id"))
     skater_name = Column(String)
@@ -35,6 +61,7 @@ class SkaterPerformance(Base):
 
 class Element(Base):
     __tablename__ = "elements"
+    __table_args__ = (Index("ix_elements_performance_index", "performance_id", "element_index"),)
     id = Column(Integer, primary_key=True, index=True)
     performance_id = Column(Integer, ForeignKey("performances.id"))
     element_index = Column(Integer) 
@@ -44,11 +71,20 @@ class Element(Base):
     panel_score = Column(Float)
     judges_scores = Column(String)
     is_bonus = Column(Boolean, default=False)
+    # Derived from element_name at ingest, see element_codes.py
+    element_kind = Column(String)
+    jump_type = Column(String)
+    jump_types = Column(String)
+    rotations = Column(Integer)
+    combo_length = Column(Integer)
+    under_rotation = Column(String)
+    edge_call = Column(String)
     
     performance = relationship("SkaterPerformance", back_populates="elements")
 
 class Component(Base):
     __tablename__ = "components"
+    __table_args__ = (Index("ix_components_performance_index", "performance_id", "component_index"),)
     id = Column(Integer, primary_key=True, index=True)
     performance_id = Column(Integer, ForeignKey("performances.id"))
     component_index = Column(Integer)
@@ -59,5 +95,130 @@ class Component(Base):
 
     performance = relationship("SkaterPerformance", back_populates="components")
 
+TABLES = {
+    "competitions": Competition.__table__,
+    "performances": SkaterPerformance.__table__,
+    "elements": Element.__table__,
+    "components": Component.__table__,
+}
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    # create_all skips indexes of tables that already exist
+    for table in TABLES.values():
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    _add_new_columns()
+
+def _add_new_columns():
+    """create_all doesn't touch existing tables either: add the columns a model
+    gained since (the derived element columns) and fill them for existing rows"""
+    with engine.connect().execution_options(immediate=True) as conn, conn.begin():
+        for table in TABLES.values():
+            existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+            added = [col for col in table.columns if col.name not in existing]
+            for col in added:
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}")
+            if added and table is TABLES["elements"]:
+                names = [row[0] for row in conn.execute(select(table.c.element_name).distinct())]
+                conn.execute(update(table).where(table.c.element_name == bindparam("b_name")),
+                             [dict(classify_element(name), b_name=name) for name in names if name is not None])
+                conn.execute(update(table).where(table.c.element_name.is_(None)).values(**classify_element(None)))
+            if added:
+                _bump_version(conn)
+
+def get_db():
+    """FastAPI dependency: one pooled session per request"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def data_version(conn):
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+def _bump_version(conn):
+    conn.exec_driver_sql(f"PRAGMA user_version = {data_version(conn) + 1}")
+
+def _next_id(conn, table):
+    return conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar() + 1
+
+def save_protocol_sql(skaters, competition_name, comp_year, location=None, date=None, digest=None):
+    """SQLite version of scraper.save_protocol: same upsert on (competition,
+    category, program_type, skater), one IMMEDIATE transaction, and bulk
+    (executemany) inserts for the rows. Returns (added, updated)."""
+    perfs, elems, comps = TABLES["performances"], TABLES["elements"], TABLES["components"]
+
+    # The import ledger (import_cache) is only read and written under the data lock,
+    # as on the CSV path, so concurrent importers can't lose each other's entries
+    with file_lock():
+        init_db()
+        with engine.connect().execution_options(immediate=True) as conn, conn.begin():
+            comp_id = conn.execute(select(Competition.id).where(Competition.name == competition_name)).scalar()
+            if comp_id is None:
+                comp_id = _next_id(conn, TABLES["competitions"])
+                conn.execute(insert(TABLES["competitions"]), [dict(id=comp_id, name=competition_name, year=comp_year, location=location, date=date)])
+            existing = {
+                (row.category, row.program_type, row.skater_name): row.id
+                for row in conn.execute(select(perfs.c.id, perfs.c.category, perfs.c.program_type, perfs.c.skater_name)
+                                        .where(perfs.c.competition_id == comp_id))
+            }
+
+            segment = (skaters[0]["performance"]["category"], skaters[0]["performance"]["program_type"]) if skaters else None
+            if digest and segment and already_imported(competition_name, *segment, digest, existing.values()):
+                print(f"⏭️ Already imported into {competition_name}, skipping.")
+                return 0, 0
+
+            next_perf_id, next_elem_id, next_comp_id = _next_id(conn, perfs), _next_id(conn, elems), _next_id(conn, comps)
+            new_rows, updated_rows, elem_rows, comp_rows = [], [], [], []
+            for skater in skaters:
+                perf = skater["performance"]
+                perf_id = existing.get((perf["category"], perf["program_type"], perf["skater_name"]))
+                if perf_id is None:
+                    perf_id = next_perf_id
+                    next_perf_id += 1
+                    new_rows.append(dict(perf, id=perf_id, competition_id=comp_id))
+                else:
+                    updated_rows.append(dict(perf, b_id=perf_id))
+                for el in skater["elements"]:
+                    elem_rows.append(dict(el, id=next_elem_id, performance_id=perf_id))
+                    next_elem_id += 1
+                for c in skater["components"]:
+                    comp_rows.append(dict(c, id=next_comp_id, performance_id=perf_id))
+                    next_comp_id += 1
+
+            if updated_rows:
+                updated_ids = [row["b_id"] for row in updated_rows]
+                conn.execute(update(perfs).where(perfs.c.id == bindparam("b_id")), updated_rows)
+                conn.execute(delete(elems).where(elems.c.performance_id.in_(updated_ids)))
+                conn.execute(delete(comps).where(comps.c.performance_id.in_(updated_ids)))
+            for table, rows in [(perfs, new_rows), (elems, elem_rows), (comps, comp_rows)]:
+                if rows:
+                    conn.execute(insert(table), rows)
+            _bump_version(conn)
+
+        if digest and segment:
+            record_import(competition_name, *segment, digest, [r["id"] for r in new_rows] + [r["b_id"] for r in updated_rows])
+        return len(new_rows), len(updated_rows)
+
+def load_from_csv(files):
+    """Replace the database contents with the CSV tables (data_manager.FILES)"""
+    init_db()
+    with engine.connect().execution_options(immediate=True) as conn, conn.begin():
+        for name in reversed(list(TABLES)):
+            conn.execute(delete(TABLES[name]))
+        for name, table in TABLES.items():
+            if not os.path.exists(files[name]) or os.path.getsize(files[name]) == 0:
+                continue
+            for chunk in pd.read_csv(files[name], chunksize=50_000):
+                if name == "elements":
+                    chunk = add_element_codes(chunk)
+                chunk = chunk.astype(object).where(chunk.notna(), None)
+                conn.execute(insert(table), chunk.to_dict('records'))
+        _bump_version(conn)
+
+if __name__ == "__main__":
+    from data_manager import FILES
+    load_from_csv(FILES)
+    print(f"🗄️ Loaded the CSVs into {DATABASE_URL}")
\ No newline at end of file
@@ -0,0 +1,61 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+
+# Where the data lives. Standard library only, so the API can find its files
+# (and answer from the startup manifest) before numpy and pandas are imported.
+
+DATA_DIR = "data"
+# "csv" (files below + in-memory store) or "sqlite" (database.py)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "csv")
+SNAPSHOT_DIR = f"{DATA_DIR}/snapshot"
+LOCK_FILE = f"{DATA_DIR}/.ingest.lock"
+JOURNAL_FILE = f"{DATA_DIR}/.ingest.journal"
+INGEST_METRICS_FILE = f"{DATA_DIR}/.ingest_metrics.json"  # importer phase totals, read by the API's /metrics
+os.makedirs(DATA_DIR, exist_ok=True)
+
+FILES = {
+    "competitions": f"{DATA_DIR}/competitions.csv",
+    "performances": f"{DATA_DIR}/performances.csv",
+    "elements": f"{DATA_DIR}/elements.csv",
+    "components": f"{DATA_DIR}/components.csv"
+}
+
+# Inside SNAPSHOT_DIR (see snapshot.py)
+CURRENT = "CURRENT"                   # name of the live version directory
+STARTUP_MANIFEST = "startup.json"     # per version: what a cold worker serves before the tables are mapped
+
+
+@contextmanager
+def read_lock():
+    """Shared hold on the importers' data lock (data_manager.file_lock takes it
+    exclusively): while it is held no importer is between writing one CSV and
+    the next, so the files on disk are in step with each other"""
+    with open(LOCK_FILE, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def source_stats(files):
+    stats = {}
+    for name, path in files.items():
+        st = os.stat(path) if os.path.exists(path) else None
+        stats[name] = [st.st_size, st.st_mtime_ns] if st else None
+    return stats
+
+def current_version(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def load_ingest_metrics():
+    try:
+        with open(INGEST_METRICS_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
@@ -0,0 +1,75 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Derived columns for an element, computed from its protocol name once at
+# ingest (scraper.parse_protocol) and stored next to it, so the API groups by
+# ready-made categorical columns instead of re-parsing names on every request.
+#
+#   element_kind    jump / spin / step / choreo (same rules the frontend used)
+#   jump_type       lead jump: T, S, Lo, F, Lz, A (Eu for an Euler); "" if not a jump
+#   jump_types      every jump in the element, "+"-joined ("Lz+T"); "" if not a jump
+#   rotations       rotations of the lead jump, 0 if not a jump
+#   combo_length    number of jumps in the element (a solo jump is 1)
+#   under_rotation  worst rotation call on any jump: "", "q", "<" or "<<"
+#   edge_call       "!" (unclear edge) or "e" (wrong edge) on any jump, else ""
+
+ELEMENT_CODES = {
+    "element_kind": "", "jump_type": "", "jump_types": "", "rotations": 0,
+    "combo_length": 0, "under_rotation": "", "edge_call": "",
+}
+JUMP = re.compile(r"^(\d)(Lz|Lo|Eu|T|S|F|A)(.*)$")
+ROTATION_CALLS = ["", "q", "<", "<<"]  # increasing severity
+
+
+def element_kind(name):
+    """Sp -> spin, StSq -> step, ChSq -> choreo, anything else is a jump"""
+    if "Sp" in name:
+        return "spin"
+    if "StSq" in name:
+        return "step"
+    if "ChSq" in name:
+        return "choreo"
+    return "jump"
+
+def classify_element(name):
+    """Derived columns for one element name, e.g. '3Lz!q+3T<' ->
+    jump Lz, 3 rotations, combo of 2, under_rotation '<', edge_call '!'"""
+    name = name if isinstance(name, str) else ""
+    codes = dict(ELEMENT_CODES, element_kind=element_kind(name))
+    if codes["element_kind"] != "jump":
+        return codes
+    jumps = [m for m in (JUMP.match(part) for part in name.split("+")) if m]
+    if not jumps:
+        return codes
+    calls = "".join(m.group(3) for m in jumps)
+    codes.update(
+        jump_type=jumps[0].group(2),
+        jump_types="+".join(m.group(2) for m in jumps),
+        rotations=int(jumps[0].group(1)),
+        combo_length=len(jumps),
+        under_rotation=max((call for call in ROTATION_CALLS if call and call in calls), key=ROTATION_CALLS.index, default=""),
+        edge_call="e" if "e" in calls else "!" if "!" in calls else "",
+    )
+    return codes
+
+def add_element_codes(df):
+    """Fill in the derived columns of an elements frame that lacks them (rows
+    written before they existed). Classifies each distinct name once."""
+    missing = [col for col in ELEMENT_CODES if col not in df]
+    if not missing or "element_name" not in df:
+        return df
+    names = df["element_name"].fillna("").astype(str)
+    labels = names.unique()
+    codes = pd.DataFrame([classify_element(label) for label in labels], index=labels)
+    df = df.copy()
+    for col in missing:
+        df[col] = codes[col].reindex(names).to_numpy()
+    return df
+
+def has_jump_type(jump_types, code):
+    """Bool mask of the rows whose element contains a `code` jump, decided once
+    per distinct jump_types value"""
+    values = pd.Categorical(pd.Series(jump_types, dtype=object).fillna("").astype(str))
+    hit = np.array([code in label.split("+") for label in values.categories], dtype=np.bool_)
+    return hit[values.codes] if len(hit) else np.zeros(len(values), dtype=np.bool_)
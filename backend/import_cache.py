@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+from data_manager import DATA_DIR
+
+# Cache of parsed protocols, keyed by the PDF's content hash.
+# Re-running scraper.py / run_batch.py on an unchanged PDF skips pdfplumber
+# entirely. A small ledger remembers which PDF was last imported into each
+# competition segment, so an import that already landed is skipped without
+# writing anything.
+#
+#   import_cache/<digest>.json = {"meta": {...}, "skaters": [...]}
+#   import_cache/imports.json  = {"<competition>|<category>|<program>": {"digest": ..., "perf_ids": [...]}}
+#
+# "meta" holds the parser version and the program/category the PDF was parsed
+# with; an entry whose meta doesn't match is ignored and overwritten.
+
+CACHE_DIR = f"{DATA_DIR}/import_cache"
+LEDGER = "imports.json"
+
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _entry_path(digest):
+    return os.path.join(CACHE_DIR, f"{digest}.json")
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _write(path, entry):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(entry, f)
+    os.replace(tmp, path)
+
+def load_parsed(digest, meta):
+    """Cached parse_protocol output for this PDF, or None"""
+    entry = _read(_entry_path(digest))
+    if entry is None or entry.get("meta") != meta:
+        return None
+    return entry["skaters"]
+
+def save_parsed(digest, meta, skaters):
+    _write(_entry_path(digest), {"meta": meta, "skaters": skaters})
+
+def _segment_key(competition_name, category, program_type):
+    return f"{competition_name}|{category}|{program_type}"
+
+def last_import(competition_name, category, program_type):
+    """{"digest", "perf_ids"} of the PDF last imported into this segment, or None.
+    Only read/written by the single writer, under data_manager's file lock."""
+    ledger = _read(os.path.join(CACHE_DIR, LEDGER)) or {}
+    return ledger.get(_segment_key(competition_name, category, program_type))
+
+def already_imported(competition_name, category, program_type, digest, existing_ids):
+    """True when this exact PDF was the last one imported into the segment and
+    the performances it wrote are still there"""
+    last = last_import(competition_name, category, program_type)
+    return bool(last) and last["digest"] == digest and set(last["perf_ids"]) <= set(existing_ids)
+
+def record_import(competition_name, category, program_type, digest, perf_ids):
+    path = os.path.join(CACHE_DIR, LEDGER)
+    ledger = _read(path) or {}
+    ledger[_segment_key(competition_name, category, program_type)] = {"digest": digest, "perf_ids": perf_ids}
+    _write(path, ledger)
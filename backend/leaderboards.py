@@ -0,0 +1,235 @@
+import itertools
+import numpy as np
+import pandas as pd
+from analytics import DECIMALS, clean_jump_name
+from store import pack_groups, unpack_groups
+
+# Season-wide leaderboards.
+# For every (season, kind, element) and (season, category, program) combination
+# - each part either fixed or "any" - we keep the row positions of its MAX_K
+# best entries, best first. They are built in one vectorized pass when a store
+# is loaded; when the reloader only appended rows, the kept entries are just
+# re-ranked against the new rows instead of scanning everything again. A query
+# is then a dict lookup plus decoding k rows.
+
+MAX_K = 100
+KEY = ("leaderboards",)
+# metric -> performance column; "goe" is the sum of the performance's element GOEs
+SCORE_METRICS = {"tes": "tes_score", "pcs": "pcs_score", "total": "total_score", "goe": "goe"}
+# Which of (season, kind, element) a board fixes: an element implies its kind
+ELEMENT_PATTERNS = [(season, kind, element) for season in (False, True) for kind, element in [(False, False), (True, False), (True, True)]]
+SCORE_PATTERNS = list(itertools.product([False, True], repeat=3))  # (season, category, program)
+
+
+class Leaderboards:
+    def __init__(self, elements, scores, element_kinds, total_goe, counts, pending):
+        self.elements = elements            # (season, kind, element) -> element rows
+        self.scores = scores                # metric -> {(season, category, program): performance rows}
+        self.element_kinds = element_kinds  # element -> kind, for queries that only name the element
+        self.total_goe = total_goe          # summed element GOE per performance row
+        self.counts = counts                # (element rows, performance rows) covered
+        self.pending = pending              # element rows seen before their performance, retried on extend
+
+    @classmethod
+    def build(cls, store):
+        return cls({}, {metric: {} for metric in SCORE_METRICS}, {}, np.zeros(0), (0, 0), np.empty(0, np.intp)).extend(store)
+
+    def extend(self, store):
+        """Leaderboards for `store`, which holds the rows these were built from at
+        the same positions plus rows appended after them"""
+        n_elems, n_perfs = self.counts
+        perf_ids = store.performances["id"] if len(store.performances) else np.empty(0, np.int32)
+        seasons = _seasons(store)
+        element_kinds = dict(self.element_kinds)
+
+        # --- elements: ranked by panel score ---
+        elements = self.elements
+        rows = np.concatenate([self.pending, np.arange(n_elems, len(store.elements))])
+        pending = np.empty(0, np.intp)
+        if len(rows):
+            perf_pos = _positions(perf_ids, store.elements["performance_id"][rows])
+            pending = rows[perf_pos < 0]
+            rows, perf_pos = rows[perf_pos >= 0], perf_pos[perf_pos >= 0]
+            kinds, names = _element_labels(store.elements, rows)
+            element_kinds.update(zip(names.tolist(), kinds.tolist()))
+            dims = [seasons[perf_pos], kinds, names]
+            elements = _merge(elements, store.elements["panel_score"], rows, dims, ELEMENT_PATTERNS)
+
+        # --- performances: one board per metric ---
+        scores = dict(self.scores)
+        total_goe = _total_goe(store)
+        perfs = store.performances
+        for metric, column in SCORE_METRICS.items():
+            rows = np.arange(n_perfs, len(perfs))
+            if column == "goe" and not np.array_equal(total_goe[:n_perfs], self.total_goe):
+                # elements arrived for performances already ranked: re-rank them all
+                scores[metric], rows = {}, np.arange(len(perfs))
+            if len(rows):
+                dims = [seasons[rows], perfs.categories["category"][perfs["category"][rows]],
+                        perfs.categories["program_type"][perfs["program_type"][rows]]]
+                values = total_goe if column == "goe" else perfs[column]
+                scores[metric] = _merge(scores[metric], values, rows, dims, SCORE_PATTERNS)
+
+        return Leaderboards(elements, scores, element_kinds, total_goe,
+                            (len(store.elements), len(store.performances)), pending)
+
+    def dump(self):
+        """(JSON metadata, arrays) for the snapshot, so workers map the boards
+        instead of each building them"""
+        meta = {"element_kinds": self.element_kinds, "counts": list(self.counts), "groups": {}}
+        arrays = {"total_goe": self.total_goe, "pending": self.pending}
+        for name, groups in [("elements", self.elements)] + [(f"scores.{m}", g) for m, g in self.scores.items()]:
+            meta["groups"][name], arrays[f"{name}.offsets"], arrays[f"{name}.rows"] = pack_groups(groups)
+        return meta, arrays
+
+    @classmethod
+    def restore(cls, meta, arrays):
+        groups = {name: unpack_groups(keys, arrays[f"{name}.offsets"], arrays[f"{name}.rows"])
+                  for name, keys in meta["groups"].items()}
+        return cls(groups["elements"], {metric: groups[f"scores.{metric}"] for metric in SCORE_METRICS},
+                   meta["element_kinds"], arrays["total_goe"], tuple(meta["counts"]), arrays["pending"])
+
+
+def leaderboards(store):
+    """(store the rows belong to, its Leaderboards), built once per data version"""
+    scope = store.for_leaderboards()
+    return scope, scope.memo(KEY, lambda: Leaderboards.build(scope))
+
+def carry_over(old, new):
+    """After an append-only reload, extend the old store's leaderboards to the
+    new one rather than rebuilding them. Skipped when old rows moved or changed
+    meaning (a competition row arriving after its performances)."""
+    boards = old.cache.get(KEY)
+    if boards is None or new.cache.get(KEY) is not None:
+        return
+    for name in ["elements", "performances", "competitions"]:
+        before, after = getattr(old, name), getattr(new, name)
+        if len(after) < len(before) or (len(before) and not np.array_equal(after["id"][:len(before)], before["id"])):
+            return
+    if len(new.competitions) > len(old.competitions) and len(old.performances):
+        added = new.competitions["id"][len(old.competitions):]
+        if np.isin(old.performances["competition_id"], added).any():
+            return
+    new.cache[KEY] = boards.extend(new)
+
+def _merge(groups, values, rows, dims, patterns):
+    """groups updated with the best MAX_K of `rows` (scored by values[row]) for
+    every pattern of fixed dimensions"""
+    groups = dict(groups)
+    coded = [pd.factorize(pd.Series(dim, dtype=object)) for dim in dims]
+    scores = values[rows].astype(np.float64)
+    for fixed in patterns:
+        used = [i for i, f in enumerate(fixed) if f]
+        if used:
+            codes = np.ravel_multi_index([coded[i][0] for i in used], [max(len(coded[i][1]), 1) for i in used])
+        else:
+            codes = np.zeros(len(rows), np.int64)
+        order = np.lexsort((rows, -scores, codes))
+        uniq, starts = np.unique(codes[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        labels = np.unravel_index(uniq, [max(len(coded[i][1]), 1) for i in used]) if used else []
+        for g, (start, end) in enumerate(zip(starts, ends)):
+            key = [None] * len(dims)
+            for i, dim_codes in zip(used, labels):
+                key[i] = coded[i][1][dim_codes[g]]
+            key = tuple(key)
+            best = rows[order[start:min(end, start + MAX_K)]]
+            if key in groups:
+                best = np.concatenate([groups[key], best])
+                best = best[np.lexsort((best, -values[best].astype(np.float64)))][:MAX_K]
+            groups[key] = best
+    return groups
+
+def _positions(ids, wanted):
+    """Row positions of `wanted` ids in the (not necessarily sorted) id column, -1 if absent"""
+    if not len(ids):
+        return np.full(len(wanted), -1, np.intp)
+    order = np.argsort(ids, kind="stable")
+    pos = order[np.minimum(np.searchsorted(ids, wanted, sorter=order), len(ids) - 1)]
+    return np.where(ids[pos] == wanted, pos, -1)
+
+def _seasons(store):
+    """Season label of every performance row ("" when its competition is missing)"""
+    perfs, comps = store.performances, store.competitions
+    if not len(perfs):
+        return np.empty(0, dtype=object)
+    if not len(comps):
+        return np.full(len(perfs), "", dtype=object)
+    years = np.append(np.asarray(comps.decode("year"), dtype=object), "")
+    return years[_positions(comps["id"], perfs["competition_id"])]
+
+def _element_labels(elements, rows):
+    """(kind, element) labels of the given element rows. The kind is the one
+    classified at ingest (element_kind column); jumps are grouped without their
+    edge/rotation marks, like the per-skater averages."""
+    kinds = np.asarray(elements.categories["element_kind"], dtype=object)[elements["element_kind"][rows]]
+    codes, inverse = np.unique(elements["element_name"][rows], return_inverse=True)
+    names = pd.Series(elements.categories["element_name"][codes], dtype=object).astype(str)
+    cleaned = np.asarray(clean_jump_name(names), dtype=object)[inverse.reshape(-1)]
+    return kinds, np.where(kinds == "jump", cleaned, names.to_numpy(dtype=object)[inverse.reshape(-1)])
+
+def _total_goe(store):
+    """Sum of element GOE points per performance row"""
+    if not len(store.performances):
+        return np.zeros(0)
+    perf_ids = store.performances["id"]
+    slices = store.element_slices
+    if not len(store.elements):
+        return np.zeros(len(perf_ids))
+    cumulative = np.concatenate([[0.0], np.cumsum(store.elements["goe"].astype(np.float64))])
+    totals = cumulative[slices.ends] - cumulative[slices.starts]
+    pos = _positions(slices.ids, perf_ids)
+    return np.where(pos >= 0, totals[pos], 0.0)
+
+
+def _competitions(store):
+    comps = store.competitions
+    if not len(comps):
+        return {}
+    return {cid: (name, year) for cid, name, year in zip(comps.decode("id"), comps.decode("name"), comps.decode("year"))}
+
+def _performance_entry(perfs, row, competitions):
+    competition_id = int(perfs["competition_id"][row])
+    name, season = competitions.get(competition_id, (None, None))
+    return {
+        "performance_id": int(perfs["id"][row]), "skater_name": perfs.decode("skater_name", [row])[0],
+        "nation": perfs.decode("nation", [row])[0], "category": perfs.decode("category", [row])[0],
+        "program_type": perfs.decode("program_type", [row])[0],
+        "competition_id": competition_id, "competition": name, "season": season,
+    }
+
+def element_leaderboard(store, kind=None, element=None, season=None, k=10):
+    """Best k elements by panel score, optionally of one kind / element / season"""
+    scope, boards = leaderboards(store)
+    if element:
+        element_kind_ = boards.element_kinds.get(element)
+        if kind and kind != element_kind_:
+            return []
+        kind = element_kind_
+    rows = boards.elements.get((season, kind, element), np.empty(0, np.intp))[:k]
+    elements, perfs = scope.elements, scope.performances
+    perf_pos = _positions(perfs["id"], elements["performance_id"][rows])
+    competitions = _competitions(scope)
+    kinds, names = _element_labels(elements, rows)
+    codes = elements["element_name"][rows]
+    return [
+        {"rank": i + 1, "element_name": elements.categories["element_name"][code], "element": name,
+         "kind": kind, "panel_score": round(float(elements["panel_score"][row]), DECIMALS),
+         "base_value": round(float(elements["base_value"][row]), DECIMALS), "goe": round(float(elements["goe"][row]), DECIMALS),
+         **_performance_entry(perfs, pos, competitions)}
+        for i, (row, pos, code, kind, name) in enumerate(zip(rows.tolist(), perf_pos.tolist(), codes.tolist(),
+                                                             kinds.tolist(), names.tolist()))
+    ]
+
+def score_leaderboard(store, metric, season=None, category=None, program=None, k=10):
+    """Best k performances by TES / PCS / total / summed GOE"""
+    scope, boards = leaderboards(store)
+    rows = boards.scores[metric].get((season, category, program), np.empty(0, np.intp))[:k]
+    perfs = scope.performances
+    competitions = _competitions(scope)
+    return [
+        {"rank": i + 1, **_performance_entry(perfs, row, competitions),
+         **{column: round(float(boards.total_goe[row] if column == "goe" else perfs[column][row]), DECIMALS)
+            for column in SCORE_METRICS.values()}}
+        for i, row in enumerate(rows.tolist())
+    ]
@@ -1,10 +1,24 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-from data_manager import load_data, FILES
+import importlib
 import os
+import time
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from datafiles import FILES, SNAPSHOT_DIR, STORAGE_BACKEND, load_ingest_metrics, read_lock
+from responses import TimedJSONResponse, cached_json, stream_ndjson, wants_ndjson
+from names import name_key
+from warmup import Warmup, load_startup_manifest
+import metrics
+
+# Importing this module stays cheap: numpy, pandas and everything built on them
+# (the store, analytics, leaderboards...) are imported with the data, in the
+# startup hook or - with LAZY_STARTUP=1 - in the background (see warmup.py).
+# Handlers import what they use from those modules when they run.
+HEAVY_MODULES = ["data_manager", "store", "reloader", "analytics", "leaderboards", "search", "skaters"]
+if STORAGE_BACKEND == "sqlite":
+    HEAVY_MODULES += ["database", "sql_store"]
 
-app = FastAPI()
+app = FastAPI(default_response_class=TimedJSONResponse)
 
 # --- CORS CONFIGURATION ---
 # This tells the backend to trust requests from your Vercel frontend
@@ -22,95 +36,228 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Cache data in memory on startup
+# Per-route latency / size histograms and cache counters, served at /metrics.
+# SERVER_TIMING=1 also adds a Server-Timing header to every response.
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+app.add_middleware(metrics.MetricsMiddleware, server_timing=SERVER_TIMING)
+
+# Cache data in memory on startup.
+# Handlers read DataCache.store once per request; the reloader replaces it
+# wholesale when new protocols are imported, so no restart is needed.
 class DataCache:
-    competitions = []
-    performances = []
-    elements = []
-    components = []
+    store = None
+    reloader = None
+    startup = None  # /competitions from the startup manifest (JSON bytes), while a lazy start loads
+
+def publish_store(store):
+    DataCache.store = store
+
+# Seconds between checks for new data; 0 disables hot reload
+RELOAD_SECONDS = float(os.environ.get("DATA_RELOAD_SECONDS", "5"))
+# SHARED_SNAPSHOT=1: with several workers, all of them map one compiled snapshot
+# and switch versions together (see reloader.py) instead of each loading its own copy
+SHARED_SNAPSHOT = os.environ.get("SHARED_SNAPSHOT", "0") == "1"
+# LAZY_STARTUP=1: start answering before the data is loaded (see warmup.py)
+LAZY_STARTUP = os.environ.get("LAZY_STARTUP", "0") == "1"
+# How long a request that needs the data waits for a lazy start before a 503
+WARMUP_WAIT_SECONDS = float(os.environ.get("WARMUP_WAIT_SECONDS", "60"))
+warmup = Warmup(["modules", "data"])
+
+def get_store():
+    """Dependency: the data a request reads from. The in-memory store for the
+    CSV backend; a pooled SQLite session wrapped as a store for the SQLite one."""
+    if not warmup.ready and not warmup.wait(WARMUP_WAIT_SECONDS):
+        raise HTTPException(status_code=503, detail="Data is still loading", headers={"Retry-After": "1"})
+    if STORAGE_BACKEND == "sqlite":
+        from database import SessionLocal
+        from sql_store import SqlStore
+        db = SessionLocal()
+        try:
+            yield SqlStore(db)
+        finally:
+            db.close()
+    else:
+        DataCache.reloader.sync()  # shared mode: pick up a version another worker published
+        yield DataCache.store
+
+def get_store_or_startup():
+    """get_store, or None while a lazy start is loading and the startup manifest can answer"""
+    if not warmup.ready and DataCache.startup is not None:
+        yield None
+    else:
+        yield from get_store()
+
+def load_data(progress):
+    start = time.perf_counter()
+    with progress.step("modules"):
+        for name in HEAVY_MODULES:
+            importlib.import_module(name)
+    with progress.step("data") as step:
+        if STORAGE_BACKEND == "sqlite":
+            from database import init_db
+            init_db()
+            step["source"] = "sqlite"
+            metrics.STARTUP_SECONDS.set(time.perf_counter() - start)
+            print("✅ Serving from SQLite")
+            return
+        from data_manager import file_lock
+        from reloader import DataReloader
+        DataCache.reloader = DataReloader(FILES, SNAPSHOT_DIR, publish_store, interval=RELOAD_SECONDS,
+                                          shared=SHARED_SNAPSHOT, lock=file_lock, read_lock=read_lock)
+        # Memory-map the compiled snapshot; parse the CSVs only if it is stale or missing
+        _, step["source"] = DataCache.reloader.load()
+    metrics.STARTUP_SECONDS.set(time.perf_counter() - start)
+    if step["source"] == "shared":
+        print(f"✅ Shared Snapshot Mapped into Memory ({time.perf_counter() - start:.2f}s)")
+    elif step["source"] == "snapshot":
+        print(f"✅ Snapshot Data Mapped into Memory ({time.perf_counter() - start:.2f}s)")
+    else:
+        print(f"✅ CSV Data Loaded into Memory ({time.perf_counter() - start:.2f}s)")
+    DataCache.reloader.start()
 
 @app.on_event("startup")
 def load_csv_data():
-    # Load CSVs when server starts
-    if os.path.exists(FILES["competitions"]):
-        DataCache.competitions = pd.read_csv(FILES["competitions"]).fillna('').to_dict('records')
-    if os.path.exists(FILES["performances"]):
-        DataCache.performances = pd.read_csv(FILES["performances"]).fillna('').to_dict('records')
-    if os.path.exists(FILES["elements"]):
-        DataCache.elements = pd.read_csv(FILES["elements"]).fillna('').to_dict('records')
-    if os.path.exists(FILES["components"]):
-        DataCache.components = pd.read_csv(FILES["components"]).fillna('').to_dict('records')
-    print("✅ CSV Data Loaded into Memory")
+    if LAZY_STARTUP:
+        manifest = load_startup_manifest(SNAPSHOT_DIR, FILES) if STORAGE_BACKEND != "sqlite" else None
+        DataCache.startup = orjson.dumps(manifest["competitions"]) if manifest else None
+        print(f"⏳ Serving while the data loads ({'with' if DataCache.startup else 'no'} startup manifest)")
+    warmup.run(load_data, background=LAZY_STARTUP)
+
+@app.on_event("shutdown")
+def stop_reloader():
+    if DataCache.reloader is not None:
+        DataCache.reloader.stop()
 
 # --- NEW: Homepage Route ---
 @app.get("/")
 def read_root():
     return {"status": "online", "message": "The Skating Scores API is running!"}
 
+@app.get("/ready")
+def get_ready():
+    # Progress of the data load; 503 until it is done, for load balancer health checks
+    status = warmup.status()
+    return TimedJSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+def get_metrics():
+    # Prometheus text format; this worker's counters plus the importers' phase totals
+    return Response(content=metrics.render(load_ingest_metrics()), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/version")
+def get_data_version(store=Depends(get_store)):
+    return {"version": store.version, "loaded_at": DataCache.reloader.loaded_at if DataCache.reloader else None}
+
 @app.get("/competitions")
-def get_competitions():
-    return DataCache.competitions
+def get_competitions(store=Depends(get_store_or_startup)):
+    if store is None:
+        return Response(content=DataCache.startup, media_type="application/json")
+    return store.get_competitions()
+
+def summary_table(store):
+    # Podiums for every competition/category, computed once per data version
+    from analytics import competition_summaries
+    return store.memo(("summaries",), lambda: competition_summaries(store))
+
+@app.get("/summaries")
+def get_summaries(store=Depends(get_store)):
+    """Every competition's podiums by category in one response, for the landing page"""
+    result = {}
+    for (competition_id, category), podium in summary_table(store).items():
+        if category is not None:
+            result.setdefault(competition_id, {})[category] = podium
+    return result
 
 @app.get("/competition/{competition_id}/summary")
-def get_competition_summary(competition_id: int, category: str = None):
-    perfs = [p for p in DataCache.performances if p['competition_id'] == competition_id]
-    
-    if category:
-        perfs = [p for p in perfs if p['category'] == category]
-    
-    skaters = {}
-    for p in perfs:
-        name = p['skater_name']
-        if name not in skaters:
-            skaters[name] = {
-                "name": name,
-                "nation": p['nation'],
-                "sp": {"score": 0, "rank": "-"},
-                "fs": {"score": 0, "rank": "-"},
-                "total": 0
-            }
-        
-        # Robust check for program type
-        p_type = str(p['program_type'])
-        if "Short" in p_type:
-            skaters[name]["sp"] = {"score": p['total_score'], "rank": p['rank']}
-        elif "Free" in p_type:
-            skaters[name]["fs"] = {"score": p['total_score'], "rank": p['rank']}
-
-    summary_list = []
-    for data in skaters.values():
-        total = 0
-        if data["sp"]["score"]: total += data["sp"]["score"]
-        if data["fs"]["score"]: total += data["fs"]["score"]
-        data["total"] = total
-        if total > 0:
-            summary_list.append(data)
-
-    summary_list.sort(key=lambda x: x["total"], reverse=True)
-    return summary_list[:3]
+def get_competition_summary(competition_id: int, category: str = None, store=Depends(get_store)):
+    return summary_table(store).get((competition_id, category or None), [])
+
+@app.get("/competition/{competition_id}/analytics")
+def get_competition_analytics(competition_id: int, category: str = None, program: str = None, store=Depends(get_store)):
+    from analytics import competition_analytics
+    return store.memo(
+        ("analytics", competition_id, category, program),
+        lambda: competition_analytics(store.for_competition(competition_id), competition_id, category, program),
+    )
+
+@app.get("/competition/{competition_id}/judges")
+def get_competition_judges(competition_id: int, category: str = None, program: str = None, store=Depends(get_store)):
+    from analytics import judge_deviations
+    # Per-judge deviation from the trimmed panel mean, computed on the parsed mark matrices
+    return store.memo(
+        ("judges", competition_id, category, program),
+        lambda: judge_deviations(store.for_competition(competition_id), competition_id, category, program),
+    )
+
+def comma_list(value, allowed, name):
+    """'a,b' -> ('a', 'b'), rejecting anything not in `allowed`"""
+    values = tuple(v.strip() for v in value.split(",") if v.strip())
+    unknown = [v for v in values if v not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown {name} {unknown}; allowed: {list(allowed)}")
+    return values
 
 @app.get("/performances/{competition_id}")
-def get_performances(competition_id: int, category: str = None):
-    perfs = [p for p in DataCache.performances if p['competition_id'] == competition_id]
-    if category:
-        perfs = [p for p in perfs if p['category'] == category]
-        
-    perf_ids = [p['id'] for p in perfs]
-
-    relevant_elements = [e for e in DataCache.elements if e['performance_id'] in perf_ids]
-    relevant_components = [c for c in DataCache.components if c['performance_id'] in perf_ids]
-
-    data = []
-    for p in perfs:
-        my_elements = [e for e in relevant_elements if e['performance_id'] == p['id']]
-        my_components = [c for c in relevant_components if c['performance_id'] == p['id']]
-        
-        my_elements.sort(key=lambda x: x['element_index'])
-        my_components.sort(key=lambda x: x['component_index'])
-
-        p_dict = p.copy()
-        p_dict["elements"] = my_elements
-        p_dict["components"] = my_components
-        data.append(p_dict)
-        
-    return data
\ No newline at end of file
+def get_performances(request: Request, competition_id: int, category: str = None, fields: str = None,
+                     include: str = None, format: str = None, store=Depends(get_store)):
+    # fields=: performance columns to return (default all); include=: child tables
+    # to attach (default elements,components; "" for none). format=ndjson (or Accept:
+    # application/x-ndjson) streams one performance per line instead of building the whole array.
+    from store import PROTOCOL_PARTS
+    fields = comma_list(fields, store.performance_fields(), "fields") if fields else None
+    include = comma_list(include, PROTOCOL_PARTS, "include") if include is not None else tuple(PROTOCOL_PARTS)
+    key = ("performances", competition_id, category, fields, include)
+    if wants_ndjson(request, format):
+        return stream_ndjson(request, store.version, key, store.iter_protocols(competition_id, category, fields, include))
+    # Full protocols are the heaviest response: serve pre-encoded, compressed bytes with an ETag
+    return cached_json(
+        request, store.version, key,
+        lambda: store.get_protocols(competition_id, category, fields, include),
+    )
+
+@app.get("/skaters")
+def get_skaters(store=Depends(get_store)):
+    from skaters import skater_list
+    return store.memo(("skaters",), lambda: skater_list(store))
+
+@app.get("/skaters/{name}")
+def get_skater(name: str, store=Depends(get_store)):
+    # Exact hit on the name index; careers are computed once per data version
+    from skaters import skater_index, skater_profile
+    key = name_key(name)
+    if key not in skater_index(store):
+        raise HTTPException(status_code=404, detail=f"No skater named {name!r}")
+    return store.memo(("skater", key), lambda: skater_profile(store, name))
+
+@app.get("/search")
+def get_search(q: str = "", type: str = None, limit: int = 10, store=Depends(get_store)):
+    # Type-ahead over skater names, nations and competition names (accent/case-insensitive, prefix per word)
+    from search import MAX_LIMIT, search
+    if type and type not in ("skater", "competition"):
+        raise HTTPException(status_code=400, detail="type must be 'skater' or 'competition'")
+    return search(store, q, min(max(limit, 1), MAX_LIMIT), type or None)
+
+# Season-wide leaderboards, served from the top-K boards built when the data is loaded
+@app.get("/leaderboards/elements")
+def get_element_leaderboard(kind: str = None, element: str = None, season: str = None, k: int = 10, store=Depends(get_store)):
+    from analytics import ELEMENT_KINDS
+    from leaderboards import MAX_K, element_leaderboard
+    if kind and kind not in ELEMENT_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {ELEMENT_KINDS}")
+    k = min(max(k, 1), MAX_K)
+    return store.memo(
+        ("leaderboard", "elements", kind, element, season, k),
+        lambda: element_leaderboard(store, kind or None, element or None, season or None, k),
+    )
+
+@app.get("/leaderboards/scores")
+def get_score_leaderboard(metric: str = "total", season: str = None, category: str = None, program: str = None,
+                          k: int = 10, store=Depends(get_store)):
+    from leaderboards import MAX_K, SCORE_METRICS, score_leaderboard
+    if metric not in SCORE_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {list(SCORE_METRICS)}")
+    k = min(max(k, 1), MAX_K)
+    return store.memo(
+        ("leaderboard", "scores", metric, season, category, program, k),
+        lambda: score_leaderboard(store, metric, season or None, category or None, program or None, k),
+    )
@@ -0,0 +1,247 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# In-process performance instrumentation, exposed by main.py at /metrics in the
+# Prometheus text format (no client library needed).
+#
+#   http_request_duration_seconds  per route template / method / status, until the last body byte
+#   http_response_size_bytes       bytes sent, after compression
+#   cache_requests_total           hit/miss of the per-version memo and the encoded-response cache
+#   data_load_seconds              startup load and every hot reload, by where the data came from
+#   ingest_*                       phase timings of the importers (scraper.py / run_batch.py), which
+#                                  run as separate processes and leave them in data/ (see PhaseTimer)
+#
+# Each API worker process keeps its own counts. With SERVER_TIMING on, every
+# response also carries a Server-Timing header: the phases timed while it was
+# built (compute = building a result on a cache miss, encode = JSON, compress =
+# gzip/brotli) and the total up to the first byte.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+LOAD_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+INGEST_PHASES = ["pdf_open", "extract", "parse", "verify", "write", "snapshot"]
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, tuple(labels), tuple(buckets)
+        self._values = {}  # label values -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+        samples = []
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key + (bound if bound == "+Inf" else _number(bound),), cumulative))
+            samples.append((f"{self.name}_sum", key, counts[-1]))
+            samples.append((f"{self.name}_count", key, cumulative))
+        return samples
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time from request to last response byte",
+                            ["method", "route", "status"])
+RESPONSE_BYTES = Histogram("http_response_size_bytes", "Response body bytes sent", ["method", "route"], SIZE_BUCKETS)
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache, entry kind and result", ["cache", "kind", "result"])
+DATA_LOAD_SECONDS = Histogram("data_load_seconds", "Time to load and publish a data version", ["source"], LOAD_BUCKETS)
+STARTUP_SECONDS = Gauge("data_startup_seconds", "Time the startup data load took")
+REGISTRY = [REQUEST_SECONDS, RESPONSE_BYTES, CACHE_REQUESTS, DATA_LOAD_SECONDS, STARTUP_SECONDS]
+
+
+def render(ingest=None):
+    """The registry (plus the importers' totals, if any) in Prometheus text format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        label_names = metric.labels + (("le",) if metric.kind == "histogram" else ())
+        for name, key, value in metric.samples():
+            names = label_names if name.endswith("_bucket") else metric.labels
+            lines.append(f"{name}{_labels(names, key)} {_number(value)}")
+    if ingest:
+        lines.append("# HELP ingest_phase_seconds_total Importer time per phase, summed over runs")
+        lines.append("# TYPE ingest_phase_seconds_total counter")
+        for phase, seconds in sorted(ingest.get("seconds", {}).items()):
+            lines.append(f'ingest_phase_seconds_total{{phase="{_escape(phase)}"}} {_number(seconds)}')
+        lines.append("# HELP ingest_pdfs_total PDFs imported, parsed or served from the import cache")
+        lines.append("# TYPE ingest_pdfs_total counter")
+        for result, count in sorted(ingest.get("pdfs", {}).items()):
+            lines.append(f'ingest_pdfs_total{{result="{_escape(result)}"}} {count}')
+        lines.append("# HELP ingest_last_run_timestamp_seconds When an importer last finished")
+        lines.append("# TYPE ingest_last_run_timestamp_seconds gauge")
+        lines.append(f"ingest_last_run_timestamp_seconds {_number(ingest.get('last_run', 0))}")
+    return "\n".join(lines) + "\n"
+
+
+# --- per-request phases (Server-Timing) ---
+
+class RequestPhases(dict):
+    """Seconds per phase of one request. A phase nested in itself (a memo miss
+    computing another memo) is only counted once."""
+
+    def __init__(self):
+        super().__init__()
+        self.active = set()
+
+
+_request_phases = contextvars.ContextVar("request_phases", default=None)
+
+@contextmanager
+def phase(name):
+    """Time a block; added to the current request's Server-Timing, if any"""
+    phases = _request_phases.get()
+    if phases is None or name in phases.active:
+        yield
+        return
+    phases.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases.active.discard(name)
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+def cache_lookup(cache, key, compute, name="memo"):
+    """cache[key], computing it on a miss. Counts the hit/miss per entry kind
+    (the key's first part) and times the compute as a request phase."""
+    kind = key[0] if isinstance(key, tuple) and key else "other"
+    if key in cache:
+        CACHE_REQUESTS.inc(cache=name, kind=kind, result="hit")
+        return cache[key]
+    CACHE_REQUESTS.inc(cache=name, kind=kind, result="miss")
+    with phase("compute"):
+        value = compute()
+    cache[key] = value
+    return value
+
+def server_timing(phases, total):
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items()]
+    return ", ".join(parts + [f"total;dur={total * 1000:.2f}"])
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording every HTTP request. Routes are labelled by
+    their template (/performances/{competition_id}) to keep label sets small."""
+
+    def __init__(self, app, server_timing=False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        phases = RequestPhases()
+        token = _request_phases.set(phases)
+        status, size = 500, 0
+
+        async def send_timed(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    header = server_timing(phases, time.perf_counter() - start).encode("latin-1")
+                    message = dict(message, headers=list(message.get("headers", [])) + [(b"server-timing", header)])
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _request_phases.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope["method"], route=route, status=str(status))
+            RESPONSE_BYTES.observe(size, method=scope["method"], route=route)
+
+
+# --- importer phases ---
+
+class PhaseTimer:
+    """Seconds per ingest phase (pdf_open, extract, parse, verify, write, snapshot),
+    summed over the PDFs of one run. Plain data, so a worker process can return it."""
+
+    def __init__(self, seconds=None):
+        self.seconds = dict(seconds or {})
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    @contextmanager
+    def time(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def merge(self, other):
+        for name, seconds in other.seconds.items():
+            self.add(name, seconds)
+
+    def summary(self):
+        names = [name for name in INGEST_PHASES if name in self.seconds] + sorted(set(self.seconds) - set(INGEST_PHASES))
+        return ", ".join(f"{name} {self.seconds[name]:.2f}s" for name in names)
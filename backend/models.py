@@ -34,6 +34,14 @@ class Element(BaseModel):
     panel_score: float
     judges_scores: str # Stored as "1,2,3,-1..." string in CSV
     is_bonus: bool
+    # Derived from element_name at ingest, see element_codes.py
+    element_kind: str = ""
+    jump_type: str = ""
+    jump_types: str = ""
+    rotations: int = 0
+    combo_length: int = 0
+    under_rotation: str = ""
+    edge_call: str = ""
 
 class Component(BaseModel):
     id: int
@@ -0,0 +1,20 @@
+import re
+import unicodedata
+
+# Skater names as protocols print them: given name(s) capitalized, family name
+# in capitals ("Shun SATO", "Adam SIAO HIM FA"). Ingest stores the normalized
+# form; lookups go through name_key so they are exact dict hits.
+
+SPACES = re.compile(r"\s+")
+
+
+def normalize_skater_name(name):
+    """'  shun   SATO ' -> 'Shun SATO': NFC, single spaces, each word starting
+    with a capital. Only the first letter is touched, so names that are
+    already right (and family names in capitals) come back unchanged."""
+    name = SPACES.sub(" ", unicodedata.normalize("NFC", str(name))).strip()
+    return " ".join("-".join(part[:1].upper() + part[1:] for part in word.split("-")) for word in name.split(" "))
+
+def name_key(name):
+    """Case-insensitive lookup key for a skater name"""
+    return normalize_skater_name(name).casefold()
@@ -0,0 +1,237 @@
+import contextlib
+import io
+import os
+import threading
+import time
+import pandas as pd
+from datafiles import JOURNAL_FILE, current_version, source_stats
+from store import DataStore, SCHEMA, concat_tables, load_store, release_memory, source_digest, table_from_frame
+from snapshot import load_snapshot, write_snapshot
+from leaderboards import carry_over, leaderboards
+from search import carry_over as carry_over_search, search_index
+from metrics import DATA_LOAD_SECONDS
+
+# Background hot reload of the API data.
+# A daemon thread polls the CSVs' (size, mtime) and the snapshot pointer. When
+# they change it builds a complete new DataStore off the request path and then
+# publishes it with a single reference assignment, so a request that already
+# grabbed the old store keeps a consistent view until it finishes.
+#
+# CSVs normally only grow at the end when scraper.py / run_batch.py append to
+# them, so when a file's old tail bytes are still in place only the appended
+# bytes are parsed and concatenated onto the existing columns. A re-import
+# rewrites files instead (data_manager.Transaction); that shows up as a changed
+# mtime without growth, or a changed tail, and triggers a full reload.
+# The files are observed and read under a shared hold on the importers' data
+# lock, so a reload never sees one table written and the next not yet. A
+# journal left by a crashed importer means the same until the next importer
+# rolls it forward or back (data_manager.recover), so no reload happens then.
+#
+# Shared mode (SHARED_SNAPSHOT=1, for several uvicorn workers): workers only
+# ever serve the memory-mapped snapshot, so the data is in memory once however
+# many workers map it. When it is missing or stale, the first worker to take
+# the data lock compiles it and the others wait and map the result. The CURRENT
+# pointer flip is the one commit point for a new version: every request first
+# checks it (sync) and, if it moved, the worker maps the new snapshot before
+# serving, so no request that starts after the flip sees the old data.
+
+TAIL_BYTES = 64  # bytes before the old end of file that must be unchanged for an append-only reload
+
+
+class DataReloader:
+    def __init__(self, files, snapshot_dir, publish, interval=5.0, shared=False, lock=contextlib.nullcontext,
+                 read_lock=contextlib.nullcontext):
+        self.files = files
+        self.snapshot_dir = snapshot_dir
+        self.publish = publish          # called with each new DataStore
+        self.interval = interval
+        self.shared = shared            # serve only the shared snapshot (see above)
+        self.lock = lock                # the importers' data lock, held while compiling in shared mode
+        self.read_lock = read_lock      # its shared side, held while reading the CSVs otherwise
+        self.store = None
+        self.loaded_at = None
+        self._seen = None               # (source stats, snapshot pointer) the current store reflects
+        self._tails = {}                # table -> (bytes consumed, mtime_ns, tail bytes)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- loading ---
+
+    def load(self):
+        """Full load: the snapshot if it is fresh, else the CSVs (in shared mode:
+        the snapshot, compiled first if needed)"""
+        with self._lock, self._reading():
+            start = time.perf_counter()
+            seen = self._observe()
+            if self.shared:
+                store, source = self._shared_snapshot(), "shared"
+                seen = self._observe()  # the pointer moved if we compiled
+            else:
+                store = load_snapshot(self.snapshot_dir, self.files)
+                source = "snapshot"
+                if store is None:
+                    store = load_store(self.files)
+                    source = "csv"
+            self._swap(store, seen, store.source_stats or seen[0])
+            DATA_LOAD_SECONDS.observe(time.perf_counter() - start, source=source)
+            return store, source
+
+    def check(self):
+        """Reload if the data changed since the last load. Returns True on a swap."""
+        with self._lock, self._reading():
+            seen = self._observe()
+            if seen == self._seen:
+                return False
+            stats, pointer = seen
+            if not self.shared and os.path.exists(JOURNAL_FILE):
+                return False  # a write was cut short; the tables may be out of step
+            if not all(ends_with_newline(self.files[name]) for name in SCHEMA):
+                return False  # an importer is mid-append; pick it up on the next tick
+            start = time.perf_counter()
+            store, source = None, "snapshot"
+            if self.shared:
+                store, source = self._shared_snapshot(), "shared"
+                seen = self._observe()  # the pointer moved if we compiled
+                stats = seen[0]
+            elif pointer != self._seen[1]:
+                store = load_snapshot(self.snapshot_dir, self.files)
+            if store is None:
+                store, source = self._load_appended(stats), "appended"
+            if store is None:
+                store, source = load_store(self.files), "csv"
+                stats = store.source_stats
+            if store.version == self.store.version:
+                self._seen = seen  # touched but identical contents
+                return False
+            self._swap(store, seen, stats)
+            DATA_LOAD_SECONDS.observe(time.perf_counter() - start, source=source)
+            return True
+
+    def sync(self):
+        """Shared mode, before every request: switch to the snapshot CURRENT
+        points at if another worker or an importer has published a new one.
+        Costs one read of the small pointer file when nothing changed."""
+        if not self.shared or current_version(self.snapshot_dir) == self._seen[1]:
+            return
+        with self._lock:
+            pointer = current_version(self.snapshot_dir)
+            if pointer == self._seen[1]:
+                return  # a concurrent request already switched
+            store = load_snapshot(self.snapshot_dir)
+            if store is None:
+                return  # superseded while mapping; the next request retries
+            seen = (self._seen[0], pointer)
+            if store.version == self.store.version:
+                self._seen = seen
+                return
+            self._swap(store, seen, seen[0])
+
+    def _shared_snapshot(self):
+        """The current snapshot, compiled first if it is missing or stale. One
+        worker compiles under the data lock; the rest find it fresh once they get it."""
+        while True:
+            store = load_snapshot(self.snapshot_dir, self.files)
+            if store is not None:
+                return store
+            with self.lock():
+                if load_snapshot(self.snapshot_dir, self.files) is None:
+                    write_snapshot(load_store(self.files), self.snapshot_dir)
+                    release_memory()  # the parsed copy is dropped; what we serve is the mapped one
+
+    def _reading(self):
+        # Not in shared mode: there only the snapshot is read, and a compile
+        # takes the exclusive lock, which our own shared hold would block
+        return contextlib.nullcontext() if self.shared else self.read_lock()
+
+    def _observe(self):
+        return source_stats(self.files), current_version(self.snapshot_dir)
+
+    def _swap(self, store, seen, stats):
+        leaderboards(store)  # built here, off the request path, before anyone can see the store
+        search_index(store)
+        self._tails = {name: (stat[0], stat[1], read_tail(self.files[name], stat[0])) if stat else (0, None, b'')
+                       for name, stat in stats.items()}
+        self.store = store
+        self._seen = seen
+        self.loaded_at = time.time()
+        self.publish(store)
+
+    def _load_appended(self, stats):
+        """New store from the current one plus only the rows appended since.
+        None when some file was rewritten rather than appended to."""
+        tables = {}
+        for name in SCHEMA:
+            old = getattr(self.store, name)
+            consumed, mtime, tail = self._tails.get(name, (0, None, b''))
+            stat = stats.get(name)
+            size = stat[0] if stat else 0
+            if size == consumed and (stat[1] if stat else None) == mtime:
+                tables[name] = old
+                continue
+            if size <= consumed or not len(old) or read_tail(self.files[name], consumed) != tail:
+                return None
+            new_rows = read_appended(self.files[name], name, consumed)
+            if new_rows is None:
+                return None
+            # Rows already in the store (a full load that raced an append) are skipped by id
+            fresh = new_rows["id"] > old["id"].max()
+            tables[name] = concat_tables([old, new_rows.take(fresh.nonzero()[0])]) if fresh.any() else old
+        store = DataStore(**tables, version=source_digest(self.files), source_stats=stats)
+        carry_over(self.store, store)  # re-rank the kept top entries against the new rows only
+        carry_over_search(self.store, store)
+        release_memory()
+        return store
+
+    # --- background thread ---
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="data-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if self.check():
+                    print(f"🔄 Data reloaded (version {self.store.version})")
+            except Exception as e:
+                # Keep serving the last good store; try again next tick
+                print(f"⚠️ Data reload failed: {e}")
+
+
+def read_tail(path, end):
+    if end <= 0:
+        return b''
+    try:
+        with open(path, 'rb') as f:
+            f.seek(max(0, end - TAIL_BYTES))
+            return f.read(min(end, TAIL_BYTES))
+    except FileNotFoundError:
+        return b''
+
+def ends_with_newline(path):
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, 2)
+            if f.tell() == 0:
+                return True
+            f.seek(-1, 2)
+            return f.read(1) == b'\n'
+    except FileNotFoundError:
+        return True
+
+def read_appended(path, name, start):
+    """Parse the rows appended to a CSV after byte offset `start`"""
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(start)
+        data = f.read()
+    if not data.strip():
+        return None
+    df = pd.read_csv(io.BytesIO(header + data))
+    return table_from_frame(df, name)
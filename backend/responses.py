@@ -0,0 +1,156 @@
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from metrics import CACHE_REQUESTS, phase
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Pre-serialized, pre-compressed responses for the heavy read endpoints.
+# The data only changes at ingest, so a body is encoded (orjson) and compressed
+# once per (data version, endpoint key, encoding) and served from memory after
+# that. Each body gets a strong ETag; clients that send it back get a 304.
+
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_CONTROL = "public, no-cache"  # always revalidate, usually answered with a 304
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+NDJSON = "application/x-ndjson"
+STREAM_CHUNK_BYTES = 64 * 1024  # NDJSON lines are sent (and gzip-flushed) in chunks of about this size
+STREAM_GZIP_LEVEL = 6  # compressed while sending, so a cheaper level than the cached bodies
+
+
+class ResponseCache:
+    """Byte-bounded LRU of encoded bodies, keyed by (version, key, encoding)"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = value
+            self.size += len(value[0])
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, (body, _) = self._entries.popitem(last=False)
+                self.size -= len(body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+response_cache = ResponseCache()
+
+
+def accepted_encodings(accept_encoding):
+    return {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+
+def pick_encoding(accept_encoding):
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return 'identity'
+
+def _encoded(version, key, encoding, build):
+    """(body bytes, etag) for one representation, building it on a miss"""
+    cached = response_cache.get((version, key, encoding))
+    CACHE_REQUESTS.inc(cache="response", kind=key[0], result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+    if encoding == 'identity':
+        with phase("compute"):
+            data = build()
+        with phase("encode"):
+            body = orjson.dumps(data)
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    else:
+        raw, raw_etag = _encoded(version, key, 'identity', build)
+        with phase("compress"):
+            body = brotli.compress(raw, quality=BROTLI_QUALITY) if encoding == 'br' else gzip.compress(raw, GZIP_LEVEL)
+        # Strong ETags are per representation, so tag each encoding separately
+        etag = raw_etag[:-1] + '-' + encoding + '"'
+    response_cache.put((version, key, encoding), (body, etag))
+    return body, etag
+
+def _not_modified(request, etag):
+    if_none_match = request.headers.get('if-none-match')
+    return bool(if_none_match) and (if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')])
+
+def cached_json(request, version, key, build):
+    """Serve build()'s JSON from the byte cache, honouring If-None-Match and Accept-Encoding"""
+    encoding = pick_encoding(request.headers.get('accept-encoding'))
+    body, etag = _encoded(version, key, encoding, build)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != 'identity':
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def wants_ndjson(request, format=None):
+    return format == "ndjson" or NDJSON in (request.headers.get('accept') or '')
+
+def _ndjson_chunks(items, compress):
+    """orjson lines of `items`, joined into ~STREAM_CHUNK_BYTES chunks. The first
+    line goes out on its own so the client sees a row right away."""
+    buffer, size, first = [], 0, True
+    for item in items:
+        line = orjson.dumps(item) + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if first or size >= STREAM_CHUNK_BYTES:
+            yield compress(b"".join(buffer), zlib.Z_SYNC_FLUSH)
+            buffer, size, first = [], 0, False
+    yield compress(b"".join(buffer), zlib.Z_FINISH)
+
+def stream_ndjson(request, version, key, items):
+    """Stream `items` (an iterator) as NDJSON, one JSON value per line, encoding
+    and gzipping as it goes; nothing is cached. The weak ETag comes from the
+    data version and the request, not the body, so a 304 is answered without
+    building anything."""
+    etag = 'W/"' + hashlib.blake2b(repr((version, key)).encode(), digest_size=12).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept, Accept-Encoding"}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if 'gzip' not in accepted_encodings(request.headers.get('accept-encoding')):
+        compress = lambda data, flush: data
+    else:  # only gzip is streamed; brotli is kept for the cached bodies
+        compressor = zlib.compressobj(STREAM_GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        compress = lambda data, flush: compressor.compress(data) + compressor.flush(flush)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(_ndjson_chunks(items, compress), media_type=NDJSON, headers=headers)
+
+
+class TimedJSONResponse(JSONResponse):
+    """The default JSON response, with its encoding timed for Server-Timing"""
+
+    def render(self, content):
+        with phase("encode"):
+            return super().render(content)
@@ -1,4 +1,9 @@
-from scraper import scrape_pdf
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from scraper import parse_pdf, save_protocol, verify_parsed
+from data_manager import compile_snapshot, record_ingest, STORAGE_BACKEND
+from metrics import PhaseTimer
 
 # ---------------------------------------------------------
 # HAND LABEL YOUR FILES HERE
@@ -116,32 +121,67 @@ TASKS = [
 
 ]
 
-def main():
-    print("Starting Batch Import...")
-    
-    # # Initialize Database once
-    # init_db()
+def parse_task(task):
+    """Worker side: PDF -> parsed skaters (or the cached parse of an unchanged
+    PDF). Writes nothing but the import cache, so it is safe to run in parallel."""
+    path, name, szn, prog, cat, loc, date = task
+    timer = PhaseTimer()
+    digest, skaters, cached = parse_pdf(path, prog, cat, timer=timer)
+    return digest, skaters, cached, timer
+
+def main(workers=1, strict=False):
+    print(f"Starting Batch Import ({workers} worker{'s' if workers != 1 else ''})...")
+    batch_start = time.perf_counter()
     
+    # Initialize Database once
+    if STORAGE_BACKEND == "sqlite":
+        from database import init_db
+        init_db()
+
+    # Parsing (pdfplumber) is the slow part and runs in a process pool. Writing
+    # stays in this process, in TASKS order, so IDs are assigned by one writer
+    # and come out the same as a sequential run.
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    if pool:
+        pending = [pool.submit(parse_task, task) for task in TASKS]
+
+    changed = False
+    timer = PhaseTimer()  # summed over every PDF; parse phases are per-worker CPU time
+    parsed = cached_count = 0
     for i, task in enumerate(TASKS):
         # Unpack all 7 arguments
         path, name, szn, prog, cat, loc, date = task
         
         print(f"\n[{i+1}/{len(TASKS)}] Importing: {cat} {prog}...")
         try:
-            # Call scrape_pdf with all arguments
-            scrape_pdf(
-                pdf_path=path, 
-                competition_name=name, 
-                comp_year=szn, 
-                program_type=prog, 
-                category=cat, 
-                location=loc, 
-                date=date
-            )
+            digest, skaters, cached, task_timer = pending[i].result() if pool else parse_task(task)
+            if not verify_parsed(path, skaters, task_timer, strict):
+                timer.merge(task_timer)
+                continue
+            with task_timer.time("write"):
+                added, updated = save_protocol(skaters, competition_name=name, comp_year=szn, location=loc, date=date, digest=digest)
+            timer.merge(task_timer)
+            parsed, cached_count = parsed + (not cached), cached_count + cached
+            changed = changed or bool(added or updated)
+            note = "cached parse, " if cached else ""
+            print(f"✅ {path}: {added} added, {updated} updated ({note}{task_timer.summary()})")
         except Exception as e:
             print(f"❌ Error processing {path}: {e}")
 
-    print("\n🏁 Batch Job Complete!")
+    if pool:
+        pool.shutdown()
+
+    # One snapshot for the whole batch instead of one per PDF
+    if changed and STORAGE_BACKEND == "csv":
+        with timer.time("snapshot"):
+            compile_snapshot()
+    print(f"\n🏁 Batch Job Complete! ({time.perf_counter() - batch_start:.2f}s)")
+    print(f"⏱️ {timer.summary()}")
+    record_ingest(timer, parsed=parsed, cached=cached_count)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Import every PDF listed in TASKS.')
+    parser.add_argument('--workers', type=int, default=1, help='parallel PDF parsing processes')
+    parser.add_argument('--strict', action='store_true', help="skip protocols whose scores don't add up")
+    args = parser.parse_args()
+    main(workers=max(1, args.workers), strict=args.strict)
@@ -1,12 +1,31 @@
 import pdfplumber
 import re
+import time
 import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from models import Competition, SkaterPerformance, Element, Component
-from data_manager import init_csvs, get_next_id, save_records, load_data
+from data_manager import (init_csvs, get_next_id, load_data, read_columns, read_rows_after, transaction, compile_snapshot,
+                          record_ingest, STORAGE_BACKEND, SNAPSHOT_DIR)
+from metrics import PhaseTimer
+from names import normalize_skater_name
+from element_codes import classify_element
+from snapshot import load_snapshot
+from import_cache import file_digest, load_parsed, save_parsed, already_imported, record_import
+from verify import check_parsed, report
 SKATER_LINE_REGEX = re.compile(r"(\d+)\s+(.+?)\s+([A-Z]{3})\s+(\d+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+)\s+([-]?[\d\.]+)")
 ELEMENT_REGEX = re.compile(r"^\s*(\d+)\s+(.+?)\s+(\d+\.\d{2}(?:\s*[xX])?)\s+([-]?\d+\.\d{2})\s+(.+)\s+(\d+\.\d{2})\s*$")
 COMPONENT_REGEX = re.compile(r"(Composition|Presentation|Skating Skills|Transitions|Performance)\s+(\d+\.\d{2})\s+(.*)\s+(\d+\.\d{2})")
 
+# Line classification: every line is put in one bucket from its leading token
+# (plus plain substring tests for the block markers) and only that bucket's
+# regex is tried, anchored at the start. Skater rows and element rows both
+# start with a number; only skater rows carry a 3-letter nation code. Rows of
+# numbers only are the per-skater totals and are skipped.
+NATION_TOKEN = re.compile(r"\s[A-Z]{3}\s")
+NUMBERS_ONLY = re.compile(r"[-\d.\s]+")
+COMPONENT_NAMES = ("Composition", "Presentation", "Skating Skills", "Transitions", "Performance")
+
 def clean_element_name(raw_name):
     parts = raw_name.split()
     if len(parts) > 1:
@@ -20,124 +39,332 @@ def parse_judges_scores(score_str):
     cleaned = re.sub(r"[^\d\s\.-]", "", score_str)
     return ",".join(cleaned.split())
 
-def scrape_pdf(pdf_path, competition_name, comp_year, program_type, category, location=None, date=None):
-    print(f"📄 Processing {pdf_path}...")
-    init_csvs()
+PARSER_VERSION = 3  # bump when parse_protocol's output changes; invalidates import_cache entries
+PAGES_PER_TASK = 4  # pages per job when extracting in parallel
 
-    # 1. Check if competition exists, else create
-    comps = load_data("competitions")
-    existing_comp = next((c for c in comps if c['name'] == competition_name), None)
-    
-    if existing_comp:
-        comp_id = existing_comp['id']
-    else:
-        comp_id = get_next_id("competitions")
-        new_comp = Competition(
-            id=comp_id, name=competition_name, year=comp_year, location=location, date=date
-        )
-        save_records("competitions", [new_comp])
-
-    # Buffers for batch saving
-    perf_buffer = []
-    elem_buffer = []
-    comp_buffer = []
-
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            full_text = ""
-            for page in pdf.pages:
-                full_text += page.extract_text(layout=True) + "\n"
-    except Exception as e:
-        print(f"❌ Error opening PDF: {e}")
+def iter_lines(pdf_path, workers=1, timer=None):
+    """Layout text lines, page by page, in document order. Pages are closed as
+    soon as they are read, so memory stays at about one page's worth. With
+    workers > 1 page ranges are extracted in a process pool and yielded in order.
+    Time spent opening the PDF and extracting text is added to `timer`."""
+    timer = timer if timer is not None else PhaseTimer()
+    if workers > 1:
+        yield from _iter_lines_parallel(pdf_path, workers, timer)
         return
+    start = time.perf_counter()
+    with pdfplumber.open(pdf_path) as pdf:
+        pages = pdf.pages
+        timer.add("pdf_open", time.perf_counter() - start)
+        for page in pages:
+            start = time.perf_counter()
+            text = page.extract_text(layout=True)
+            page.close()  # drop pdfplumber's cached chars/objects for this page
+            timer.add("extract", time.perf_counter() - start)
+            yield from text.split('\n')
 
-    lines = full_text.split('\n')
-    current_perf_id = None
-    
-    # IDs need to be managed manually since we aren't using a DB with autoincrement
-    next_perf_id = get_next_id("performances")
-    next_elem_id = get_next_id("elements")
-    next_comp_id = get_next_id("components")
+def _extract_pages(pdf_path, start, stop):
+    with pdfplumber.open(pdf_path, pages=range(start + 1, stop + 1)) as pdf:
+        texts = []
+        for page in pdf.pages:
+            texts.append(page.extract_text(layout=True))
+            page.close()
+        return texts
+
+def _iter_lines_parallel(pdf_path, workers, timer):
+    opened = time.perf_counter()
+    with pdfplumber.open(pdf_path) as pdf:
+        n_pages = len(pdf.pages)
+    timer.add("pdf_open", time.perf_counter() - opened)
+    ranges = [(start, min(start + PAGES_PER_TASK, n_pages)) for start in range(0, n_pages, PAGES_PER_TASK)]
+
+    def wait(job):
+        # Extraction time here is how long parsing waited on the pool
+        start = time.perf_counter()
+        texts = job.result()
+        timer.add("extract", time.perf_counter() - start)
+        return texts
 
+    # Keep a bounded window of jobs in flight and yield them strictly in order
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start, stop in ranges:
+            pending.append(pool.submit(_extract_pages, pdf_path, start, stop))
+            if len(pending) >= 2 * workers:
+                for text in wait(pending.popleft()):
+                    yield from text.split('\n')
+        while pending:
+            for text in wait(pending.popleft()):
+                yield from text.split('\n')
+
+def line_kind(line):
+    """Bucket of a stripped, non-empty protocol line: the one pattern worth trying"""
+    if line[0].isdigit():
+        if NATION_TOKEN.search(line) and "Rank Name" not in line:
+            return "skater"
+        return "element"
+    if line.startswith(COMPONENT_NAMES):
+        return "component"
+    return "text"
+
+def parse_protocol(lines, program_type, category, unparsed=None):
+    """Parse protocol text into one record per skater. Pure function: no IDs and
+    no file access, so it can run in a worker process (see run_batch.py).
+    Lines that look like data (a skater row, or a numbered / component row
+    inside a skater's block) but match no pattern are appended to `unparsed`
+    as (line number, text) when a list is given."""
+    skaters = []
+    current = None
     state = "FIND_SKATER"
     comp_index_counter = 1
 
-    for line in lines:
+    for number, line in enumerate(lines, start=1):
         line = line.strip()
         if not line: continue
+        kind = line_kind(line)
 
-        skater_match = SKATER_LINE_REGEX.search(line)
-        if skater_match and "Rank Name" not in line:
-            current_perf_id = next_perf_id
-            next_perf_id += 1
-            
-            name = skater_match.group(2).strip()
-            print(f"   Found Skater: {name}")
-            
-            p = SkaterPerformance(
-                id=current_perf_id,
-                competition_id=comp_id,
-                rank=int(skater_match.group(1)),
-                skater_name=name,
-                nation=skater_match.group(3),
-                program_type=program_type,
-                category=category,
-                total_score=float(skater_match.group(5)),
-                tes_score=float(skater_match.group(6)),
-                pcs_score=float(skater_match.group(7)),
-                deductions=float(skater_match.group(8))
-            )
-            perf_buffer.append(p)
-            state = "READ_ELEMENTS"
-            comp_index_counter = 1
-            continue
+        if kind == "skater":
+            skater_match = SKATER_LINE_REGEX.match(line)
+            if skater_match:
+                name = normalize_skater_name(skater_match.group(2))
+                print(f"   Found Skater: {name}")
 
-        if state == "READ_ELEMENTS" and current_perf_id:
+                current = {
+                    "performance": dict(
+                        rank=int(skater_match.group(1)),
+                        skater_name=name,
+                        nation=skater_match.group(3),
+                        program_type=program_type,
+                        category=category,
+                        total_score=float(skater_match.group(5)),
+                        tes_score=float(skater_match.group(6)),
+                        pcs_score=float(skater_match.group(7)),
+                        deductions=float(skater_match.group(8))
+                    ),
+                    "elements": [],
+                    "components": [],
+                }
+                skaters.append(current)
+                state = "READ_ELEMENTS"
+                comp_index_counter = 1
+                continue
+            if state == "FIND_SKATER" and unparsed is not None:
+                unparsed.append((number, line))
+            kind = "element"  # e.g. an element with a 3-letter code in its Info column
+
+        if state == "READ_ELEMENTS" and current:
             if "Program Components" in line:
                 state = "READ_COMPONENTS"
                 continue
-            
-            elem_match = ELEMENT_REGEX.search(line)
+            if kind != "element":
+                continue
+
+            elem_match = ELEMENT_REGEX.match(line)
             if elem_match:
-                el = Element(
-                    id=next_elem_id,
-                    performance_id=current_perf_id,
+                element_name = clean_element_name(elem_match.group(2).strip())
+                current["elements"].append(dict(
                     element_index=int(elem_match.group(1)),
-                    element_name=clean_element_name(elem_match.group(2).strip()),
+                    element_name=element_name,
                     base_value=float(re.sub(r'[xX\s]', '', elem_match.group(3))),
                     goe=float(elem_match.group(4)),
                     judges_scores=parse_judges_scores(elem_match.group(5)),
                     panel_score=float(elem_match.group(6)),
-                    is_bonus='x' in elem_match.group(3).lower()
-                )
-                elem_buffer.append(el)
-                next_elem_id += 1
+                    is_bonus='x' in elem_match.group(3).lower(),
+                    **classify_element(element_name)
+                ))
+            elif unparsed is not None and not NUMBERS_ONLY.fullmatch(line):
+                unparsed.append((number, line))
 
-        if state == "READ_COMPONENTS" and current_perf_id:
+        elif state == "READ_COMPONENTS" and current:
             if "Judges Total Program Component" in line or "Deductions" in line:
                 state = "FIND_SKATER"
                 continue
-            comp_match = COMPONENT_REGEX.search(line)
+            if kind != "component":
+                continue
+
+            comp_match = COMPONENT_REGEX.match(line)
             if comp_match:
-                c = Component(
-                    id=next_comp_id,
-                    performance_id=current_perf_id,
+                current["components"].append(dict(
                     component_index=comp_index_counter,
                     component_name=comp_match.group(1),
                     factor=float(comp_match.group(2)),
                     judges_scores=parse_judges_scores(comp_match.group(3)),
                     panel_score=float(comp_match.group(4))
-                )
-                comp_buffer.append(c)
-                next_comp_id += 1
+                ))
                 comp_index_counter += 1
+            elif unparsed is not None:
+                unparsed.append((number, line))
+
+    return skaters
+
+def report_unparsed(source, unparsed, limit=5):
+    if not unparsed:
+        return
+    print(f"⚠️ {len(unparsed)} line(s) in {source} looked like data but matched no pattern:")
+    for number, line in unparsed[:limit]:
+        print(f"   line {number}: {line}")
+    if len(unparsed) > limit:
+        print(f"   ... and {len(unparsed) - limit} more")
+
+def parse_pdf(pdf_path, program_type, category, workers=1, timer=None):
+    """parse_protocol over a PDF, served from the import cache when the file is
+    unchanged. Returns (content digest, skaters, came from cache). Phase
+    timings (pdf_open, extract, parse) are added to `timer`."""
+    timer = timer if timer is not None else PhaseTimer()
+    digest = file_digest(pdf_path)
+    meta = {"parser": PARSER_VERSION, "program_type": program_type, "category": category}
+    skaters = load_parsed(digest, meta)
+    if skaters is not None:
+        return digest, skaters, True
+    unparsed = []
+    # Pages are extracted lazily inside the parse loop: parsing is the loop's
+    # time minus what iter_lines spent opening and extracting
+    reading = timer.seconds.get("pdf_open", 0.0) + timer.seconds.get("extract", 0.0)
+    start = time.perf_counter()
+    skaters = parse_protocol(iter_lines(pdf_path, workers, timer), program_type, category, unparsed)
+    reading = timer.seconds.get("pdf_open", 0.0) + timer.seconds.get("extract", 0.0) - reading
+    timer.add("parse", time.perf_counter() - start - reading)
+    report_unparsed(pdf_path, unparsed)
+    save_parsed(digest, meta, skaters)
+    return digest, skaters, False
+
+def existing_performances(comp_id):
+    """(category, program_type, skater_name) -> performance id, for one competition.
+    Taken from the snapshot's per-competition index plus the rows appended to
+    performances.csv since it was compiled (a re-import keeps a performance's
+    key and id, so older rows can't have changed); the whole CSV is only read
+    when there is no snapshot or it is ahead of the file."""
+    columns = ["id", "competition_id", "skater_name", "program_type", "category"]
+    store = load_snapshot(SNAPSHOT_DIR)
+    perfs = store.performances if store is not None else None
+    last_id = int(perfs["id"].max()) if perfs is not None and len(perfs) else 0
+    if perfs is None or last_id >= get_next_id("performances"):
+        perfs = read_columns("performances", columns)
+        perfs = perfs[perfs["competition_id"] == comp_id]
+        return {(p.category, p.program_type, p.skater_name): int(p.id) for p in perfs.itertuples()}
+
+    rows = store.perfs_by_comp.get(comp_id, [])
+    existing = dict(zip(zip(perfs.decode("category", rows), perfs.decode("program_type", rows), perfs.decode("skater_name", rows)),
+                        (int(i) for i in perfs["id"][rows])))
+    appended = read_rows_after("performances", last_id)
+    if len(appended):
+        appended = appended[appended["competition_id"] == comp_id]
+        existing.update({(p.category, p.program_type, p.skater_name): int(p.id) for p in appended.itertuples()})
+    return existing
+
+def save_protocol(skaters, competition_name, comp_year, location=None, date=None, digest=None):
+    """Assign IDs to parsed skaters and write them to the CSVs in one
+    transaction: all four tables get the rows, or none do.
+
+    Upserts on (competition, category, program_type, skater): a skater already
+    in the competition for that segment keeps their performance id and gets
+    fresh elements/components, so re-importing a protocol never duplicates it.
+    With the PDF's `digest`, an import that already landed is skipped outright.
+    Returns (added, updated)."""
+    if STORAGE_BACKEND == "sqlite":
+        from database import save_protocol_sql
+        return save_protocol_sql(skaters, competition_name, comp_year, location, date, digest)
+
+    init_csvs()
+
+    with transaction() as tx:
+        # 1. Check if competition exists, else create
+        comps = load_data("competitions")
+        existing_comp = next((c for c in comps if c['name'] == competition_name), None)
+        
+        if existing_comp:
+            comp_id = existing_comp['id']
+            existing = existing_performances(comp_id)
+        else:
+            comp_id = get_next_id("competitions")
+            new_comp = Competition(
+                id=comp_id, name=competition_name, year=comp_year, location=location, date=date
+            )
+            tx.add("competitions", [new_comp])
+            existing = {}
+
+        segment = (skaters[0]["performance"]["category"], skaters[0]["performance"]["program_type"]) if skaters else None
+        if digest and segment and already_imported(competition_name, *segment, digest, existing.values()):
+            print(f"⏭️ Already imported into {competition_name}, skipping.")
+            return 0, 0
+
+        # IDs need to be managed manually since we aren't using a DB with autoincrement
+        next_perf_id = get_next_id("performances")
+        next_elem_id = get_next_id("elements")
+        next_comp_id = get_next_id("components")
+
+        # Buffers for batch saving
+        perf_buffer = []
+        update_buffer = []
+        elem_buffer = []
+        comp_buffer = []
+
+        for skater in skaters:
+            perf = skater["performance"]
+            perf_id = existing.get((perf["category"], perf["program_type"], perf["skater_name"]))
+            if perf_id is None:
+                perf_id = next_perf_id
+                next_perf_id += 1
+                perf_buffer.append(SkaterPerformance(id=perf_id, competition_id=comp_id, **perf))
+            else:
+                update_buffer.append(SkaterPerformance(id=perf_id, competition_id=comp_id, **perf))
+            for el in skater["elements"]:
+                elem_buffer.append(Element(id=next_elem_id, performance_id=perf_id, **el))
+                next_elem_id += 1
+            for c in skater["components"]:
+                comp_buffer.append(Component(id=next_comp_id, performance_id=perf_id, **c))
+                next_comp_id += 1
+
+        # Written together when the transaction commits
+        tx.add("performances", perf_buffer)
+        tx.replace("performances", update_buffer)
+        if update_buffer:
+            updated_ids = [p.id for p in update_buffer]
+            tx.delete("elements", "performance_id", updated_ids)
+            tx.delete("components", "performance_id", updated_ids)
+        tx.add("elements", elem_buffer)
+        tx.add("components", comp_buffer)
+
+        if digest and segment:
+            perf_ids = [p.id for p in perf_buffer + update_buffer]
+            tx.on_commit.append(lambda: record_import(competition_name, *segment, digest, perf_ids))
+
+    return len(perf_buffer), len(update_buffer)
+
+def verify_parsed(source, skaters, timer, strict=False):
+    """Recompute the parsed scores (verify.py) and report what doesn't add up.
+    False if the protocol should not be saved: discrepancies with `strict`."""
+    with timer.time("verify"):
+        found = check_parsed(skaters)
+    report(source, found, len(skaters))
+    if len(found) and strict:
+        print(f"❌ Not importing {source}: its scores don't add up (--strict).")
+        return False
+    return True
+
+def scrape_pdf(pdf_path, competition_name, comp_year, program_type, category, location=None, date=None, workers=1, strict=False):
+    print(f"📄 Processing {pdf_path}...")
+    timer = PhaseTimer()
+
+    try:
+        # Lines are parsed as pages are extracted; nothing holds the whole document
+        digest, skaters, cached = parse_pdf(pdf_path, program_type, category, workers, timer)
+    except Exception as e:
+        print(f"❌ Error reading PDF: {e}")
+        return
+    if cached:
+        print("⚡ Unchanged PDF, using the cached parse.")
+    if not verify_parsed(pdf_path, skaters, timer, strict):
+        return
 
-    # Save all to CSVs
-    save_records("performances", perf_buffer)
-    save_records("elements", elem_buffer)
-    save_records("components", comp_buffer)
+    with timer.time("write"):
+        added, updated = save_protocol(skaters, competition_name, comp_year, location, date, digest=digest)
     
-    print(f"✅ Import Complete! Added {len(perf_buffer)} skaters.")
+    print(f"✅ Import Complete! Added {added} skaters, updated {updated}.")
+    if (added or updated) and STORAGE_BACKEND == "csv":
+        with timer.time("snapshot"):
+            compile_snapshot()
+    print(f"⏱️ {timer.summary()}")
+    record_ingest(timer, parsed=int(not cached), cached=int(cached))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Scrape Figure Skating PDF Protocol.')
@@ -148,9 +375,11 @@ if __name__ == "__main__":
     parser.add_argument('--gender', required=True)
     parser.add_argument('--location', required=False)
     parser.add_argument('--date', required=False)
+    parser.add_argument('--page-workers', type=int, default=1, help='extract pages in N parallel processes')
+    parser.add_argument('--strict', action='store_true', help="don't import a protocol whose scores don't add up")
 
     args = parser.parse_args()
     cat_map = {'m': 'Men', 'w': 'Women'}
     category = cat_map[args.gender]
 
-    scrape_pdf(args.pdf, args.name, args.szn, args.program, category, args.location, args.date)
\ No newline at end of file
+    scrape_pdf(args.pdf, args.name, args.szn, args.program, category, args.location, args.date, workers=args.page_workers, strict=args.strict)
\ No newline at end of file
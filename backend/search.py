@@ -0,0 +1,188 @@
+import bisect
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+from names import name_key
+from store import group_rows
+
+# Type-ahead search over skaters (name and nation) and competitions (name).
+# Every entry's text is folded (case, accents, a few letters NFKD keeps apart)
+# and split into words. The words of all entries are kept sorted, so a query
+# word is a prefix range found by bisection - a flattened trie. A word with no
+# prefix hit falls back to a trigram index over the distinct words to allow for
+# typos. The index is built when a store is loaded; when the reloader only
+# appended rows, it is extended with the new rows rather than rebuilt.
+
+KEY = ("search",)
+MAX_LIMIT = 50
+FUZZY_MIN = 0.45  # Dice similarity of trigrams for a typo'd word to still match
+WORDS = re.compile(r"\w+")
+EXTRA_FOLDS = str.maketrans({"ø": "o", "æ": "ae", "œ": "oe", "đ": "d", "ł": "l", "ı": "i", "þ": "th"})
+
+# Ranking tiers, best first; ties go to the entry with more performances
+FULL_PREFIX, EXACT_WORDS, PREFIX, FUZZY = range(4)
+
+
+def fold(text):
+    """'Loena HENDRICKX', 'Jérémie' -> 'loena hendrickx', 'jeremie'"""
+    text = unicodedata.normalize("NFKD", str(text).casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).translate(EXTRA_FOLDS)
+    return " ".join(WORDS.findall(text))
+
+def _trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, skaters, competitions, counts):
+        self.skaters = skaters              # name_key -> [name, nation, performance ids, competition ids]
+        self.competitions = competitions    # competition id -> [name, season, performance count]
+        self.counts = counts                # (performance rows, competition rows) covered
+        self._compile()
+
+    @classmethod
+    def build(cls, store):
+        return cls({}, {}, (0, 0)).extend(store)
+
+    def extend(self, store):
+        """Index for `store`, which holds the rows this one was built from at the
+        same positions plus rows appended after them. Only the new rows are read."""
+        n_perfs, n_comps = self.counts
+        perfs, comps = store.performances, store.competitions
+        skaters = dict(self.skaters)
+        competitions = {cid: list(entry) for cid, entry in self.competitions.items()}
+
+        if len(comps) > n_comps:
+            new = np.arange(n_comps, len(comps))
+            for cid, name, season in zip(comps.decode("id", new), comps.decode("name", new), comps.decode("year", new)):
+                competitions[cid] = [name, season, competitions.get(cid, [None, None, 0])[2]]
+        if len(perfs) > n_perfs:
+            new = np.arange(n_perfs, len(perfs))
+            labels = perfs.categories["skater_name"]
+            codes = perfs["skater_name"][new]
+            label_keys, keys = pd.factorize(pd.Series([name_key(label) for label in labels], dtype=object))
+            nations = perfs.decode("nation", new)
+            perf_ids, comp_ids = perfs["id"][new], perfs["competition_id"][new]
+            for k, rows in group_rows(label_keys[codes]).items():
+                key, last = keys[k], rows[-1]
+                ids, cids = perf_ids[rows], np.unique(comp_ids[rows])
+                if key in skaters:
+                    ids, cids = np.concatenate([skaters[key][2], ids]), np.union1d(skaters[key][3], cids)
+                skaters[key] = [labels[codes[last]], nations[last], ids, cids]
+            for cid, count in zip(*np.unique(comp_ids, return_counts=True)):
+                entry = competitions.setdefault(int(cid), [None, None, 0])
+                entry[2] += int(count)
+        return SearchIndex(skaters, competitions, (len(perfs), len(comps)))
+
+    def _compile(self):
+        """Sorted word list (word -> entry), full labels and the trigram postings"""
+        self.entries = [("skater", key) for key in self.skaters] + [("competition", cid) for cid in self.competitions]
+        texts = [fold(f"{name} {nation}") for name, nation, _, _ in self.skaters.values()]
+        texts += [fold(name or "") for name, _, _ in self.competitions.values()]
+        self.popularity = np.array([len(ids) for _, _, ids, _ in self.skaters.values()]
+                                   + [count for _, _, count in self.competitions.values()], dtype=np.int64)
+
+        pairs = sorted((word, entry) for entry, text in enumerate(texts) for word in set(text.split()))
+        self.words = [word for word, _ in pairs]
+        self.word_entries = np.array([entry for _, entry in pairs], dtype=np.int32)
+        # Full labels (skater names without the nation) for whole-query prefixes: "shun s"
+        names = [entry[0] for entry in self.skaters.values()] + [entry[0] for entry in self.competitions.values()]
+        labels = sorted((fold(name or ""), entry) for entry, name in enumerate(names))
+        self.labels = [label for label, _ in labels]
+        self.label_entries = np.array([entry for _, entry in labels], dtype=np.int32)
+
+        self.vocab, starts = np.unique(np.array(self.words, dtype=object), return_index=True) if pairs else ([], [])
+        self.vocab_starts = np.append(np.asarray(starts, dtype=np.intp), len(pairs))
+        self.vocab_trigrams = np.array([len(_trigrams(word)) for word in self.vocab], dtype=np.int32)
+        postings = {}
+        for i, word in enumerate(self.vocab):
+            for gram in _trigrams(word):
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def _prefix(self, word):
+        """(entries with a word starting with `word`, those with exactly `word`)"""
+        lo = bisect.bisect_left(self.words, word)
+        hi = bisect.bisect_left(self.words, word + "\U0010ffff")
+        exact = bisect.bisect_right(self.words, word, lo, hi)
+        return self.word_entries[lo:hi], self.word_entries[lo:exact]
+
+    def _fuzzy(self, word):
+        """Entries with a word similar to `word` (trigram Dice >= FUZZY_MIN)"""
+        grams = _trigrams(word)
+        hits = [self.postings[g] for g in grams if g in self.postings]
+        if not hits:
+            return np.empty(0, np.int32)
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.vocab))
+        similar = np.flatnonzero(2 * shared >= FUZZY_MIN * (len(grams) + self.vocab_trigrams))
+        if not len(similar):
+            return np.empty(0, np.int32)
+        return np.concatenate([self.word_entries[self.vocab_starts[i]:self.vocab_starts[i + 1]] for i in similar])
+
+    def search(self, query, limit=10, kind=None):
+        words = fold(query).split()
+        if not words or not self.entries:
+            return []
+        # One bool per entry: matched every word so far / matched every word exactly
+        matched = np.ones(len(self.entries), np.bool_)
+        exact = np.ones(len(self.entries), np.bool_)
+        fuzzy = False
+        for word in words:
+            matches, exact_matches = self._prefix(word)
+            if not len(matches):
+                matches, exact_matches, fuzzy = self._fuzzy(word), exact_matches[:0], True
+            matched &= _mask(len(self.entries), matches)
+            exact &= _mask(len(self.entries), exact_matches)
+        if kind is not None:  # skaters come first in the entries, then competitions
+            matched[:len(self.skaters)] &= kind == "skater"
+            matched[len(self.skaters):] &= kind == "competition"
+        candidates = np.flatnonzero(matched)
+        if not len(candidates):
+            return []
+
+        phrase = " ".join(words)
+        lo = bisect.bisect_left(self.labels, phrase)
+        hi = bisect.bisect_left(self.labels, phrase + "\U0010ffff")
+        tiers = np.where(exact[candidates], EXACT_WORDS, FUZZY if fuzzy else PREFIX)
+        tiers[_mask(len(self.entries), self.label_entries[lo:hi])[candidates]] = FULL_PREFIX
+        rank = tiers * (int(self.popularity.max()) + 1) - self.popularity[candidates]
+        best = candidates[np.argsort(rank, kind="stable")[:limit]]
+        return [self._result(entry) for entry in best]
+
+    def _result(self, entry):
+        kind, key = self.entries[entry]
+        if kind == "competition":
+            name, season, count = self.competitions[key]
+            return {"type": kind, "name": name, "season": season, "competition_id": key, "performances": count}
+        name, nation, perf_ids, comp_ids = self.skaters[key]
+        return {"type": kind, "name": name, "nation": nation, "competition_ids": comp_ids.tolist(),
+                "performance_ids": perf_ids.tolist()}
+
+
+def _mask(n, positions):
+    mask = np.zeros(n, np.bool_)
+    mask[positions] = True
+    return mask
+
+def search_index(store):
+    """The store's SearchIndex, built once per data version"""
+    scope = store.for_search()
+    return scope.memo(KEY, lambda: SearchIndex.build(scope))
+
+def carry_over(old, new):
+    """After an append-only reload, extend the old store's index with the new
+    rows rather than rebuilding it. Skipped when old rows moved."""
+    index = old.cache.get(KEY)
+    if index is None or new.cache.get(KEY) is not None:
+        return
+    for name in ["performances", "competitions"]:
+        before, after = getattr(old, name), getattr(new, name)
+        if len(after) < len(before) or (len(before) and not np.array_equal(after["id"][:len(before)], before["id"])):
+            return
+    new.cache[KEY] = index.extend(new)
+
+def search(store, query, limit=10, kind=None):
+    """Ranked matches for a type-ahead query, with competition and performance ids"""
+    return search_index(store).search(query, limit, kind)
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+from analytics import DECIMALS, ELEMENT_KINDS, clean_jump_name
+from names import name_key
+from store import child_rows, group_rows
+
+# Cross-competition skater views.
+# A name_key -> performance rows index is built once per data version; every
+# skater's career (season bests, SP/FS history, per-element averages) is then
+# computed on first request and memoized on the store like the other aggregates.
+
+SEGMENTS = {"Short": "short", "Free": "free"}
+
+
+def skater_index(store):
+    """name_key -> performance row positions, once per data version"""
+    return store.memo(("skater_index",), lambda: _build_index(store))
+
+def _build_index(store):
+    perfs = store.performances
+    if not len(perfs):
+        return {}
+    labels = perfs.categories["skater_name"]
+    label_keys, keys = pd.factorize(pd.Series([name_key(label) for label in labels], dtype=object))
+    return {keys[k]: rows for k, rows in group_rows(label_keys[perfs["skater_name"]]).items()}
+
+def _segment(programs):
+    programs = pd.Series(programs, dtype=object).astype(str)
+    return np.select([programs.str.contains(p, regex=False) for p in SEGMENTS], list(SEGMENTS.values()), default="")
+
+def skater_list(store):
+    """Every skater once, with how much we have on them and their best segment scores"""
+    index = skater_index(store)
+    if not index:
+        return []
+    perfs = store.performances
+    keys = np.empty(len(perfs), dtype=object)
+    for key, rows in index.items():
+        keys[rows] = key
+    df = pd.DataFrame({
+        "key": keys,
+        "name": perfs.decode("skater_name"),
+        "nation": perfs.decode("nation"),
+        "competition_id": perfs["competition_id"],
+        "segment": _segment(perfs.decode("program_type")),
+        "total_score": perfs["total_score"].astype(np.float64),
+    })
+    grouped = df.groupby("key", sort=False)
+    summary = grouped.agg(name=("name", "last"), nation=("nation", "last"),
+                          performances=("name", "size"), competitions=("competition_id", "nunique"))
+    for segment in SEGMENTS.values():
+        best = df[df["segment"] == segment].groupby("key")["total_score"].max()
+        summary[f"best_{segment}"] = best.reindex(summary.index)
+    summary = summary.sort_values("name", key=lambda names: names.str.casefold(), kind="stable")
+    return [
+        {"name": row.name, "nation": row.nation, "performances": int(row.performances), "competitions": int(row.competitions),
+         "best_short": _score(row.best_short), "best_free": _score(row.best_free)}
+        for row in summary.itertuples()
+    ]
+
+def _score(value):
+    return None if pd.isna(value) else round(float(value), DECIMALS)
+
+def _text(value):
+    return None if pd.isna(value) else value
+
+def skater_profile(store, name):
+    """Season bests, SP/FS history and per-element averages for one skater, or None"""
+    rows = skater_index(store).get(name_key(name))
+    if rows is None:
+        return None
+    perf_ids = store.performances["id"][rows].tolist()
+    scope = store.for_performances(perf_ids)  # the in-memory store itself; a small slice for SQLite
+    rows = np.flatnonzero(np.isin(scope.performances["id"], perf_ids))
+
+    perfs = scope.performances.to_frame(rows)
+    for col in ["skater_name", "nation", "program_type", "category"]:
+        perfs[col] = perfs[col].astype(str)
+    comps = scope.competitions
+    comp_ids = comps.decode("id") if len(comps) else []
+    comp_names = dict(zip(comp_ids, comps.decode("name") if len(comps) else []))
+    seasons = dict(zip(comp_ids, comps.decode("year") if len(comps) else []))
+    dates = dict(zip(comp_ids, comps.decode("date") if len(comps) else []))
+    # Performances can outlive their competition row; those fields are then null
+    perfs["competition"] = perfs["competition_id"].map(comp_names)
+    perfs["season"] = perfs["competition_id"].map(seasons)
+    perfs["date"] = perfs["competition_id"].map(dates)
+    perfs["segment"] = _segment(perfs["program_type"])
+    perfs["order"] = perfs["segment"].map({"short": 0, "free": 1}).fillna(2)
+    perfs = perfs.sort_values(["competition_id", "category", "order"], kind="stable")
+
+    history = [
+        {"performance_id": int(p.id), "competition_id": int(p.competition_id), "competition": _text(p.competition),
+         "season": _text(p.season), "date": _text(p.date), "category": p.category, "program_type": p.program_type, "rank": int(p.rank),
+         "total_score": _score(p.total_score), "tes_score": _score(p.tes_score), "pcs_score": _score(p.pcs_score),
+         "deductions": _score(p.deductions)}
+        for p in perfs.itertuples()
+    ]
+
+    season_bests = {}
+    for season, group in perfs.groupby("season", sort=True):  # unknown seasons are left out
+        bests = {}
+        for segment in SEGMENTS.values():
+            seg = group[group["segment"] == segment]
+            if len(seg):
+                best = seg.loc[seg["total_score"].idxmax()]
+                bests[segment] = {"score": _score(best["total_score"]), "tes_score": _score(best["tes_score"]),
+                                  "pcs_score": _score(best["pcs_score"]), "competition_id": int(best["competition_id"]),
+                                  "competition": _text(best["competition"]), "performance_id": int(best["id"])}
+        # Combined total: SP + FS at the same event
+        events = group[group["segment"] != ""].groupby(["competition_id", "category"])["total_score"].sum()
+        if len(events):
+            (competition_id, _), score = events.idxmax(), events.max()
+            bests["total"] = {"score": _score(score), "competition_id": int(competition_id),
+                              "competition": comp_names.get(competition_id)}
+        season_bests[season] = bests
+
+    _, elem_idx = child_rows(scope.element_slices, perfs["id"].tolist())
+    element_averages = []
+    if len(elem_idx):
+        elems = scope.elements.to_frame(elem_idx)
+        names = elems["element_name"].astype(str)
+        elems["kind"] = elems["element_kind"].astype(str)
+        elems["element"] = np.where(elems["kind"] == "jump", clean_jump_name(names), names)
+        stats = elems.groupby(["kind", "element"]).agg(
+            executed=("goe", "size"), avg_base_value=("base_value", "mean"),
+            avg_goe=("goe", "mean"), avg_panel_score=("panel_score", "mean"),
+        ).reset_index()
+        stats["kind_order"] = stats["kind"].map({kind: i for i, kind in enumerate(ELEMENT_KINDS)})
+        stats = stats.sort_values(["kind_order", "executed", "element"], ascending=[True, False, True], kind="stable")
+        element_averages = [
+            {"element": s.element, "kind": s.kind, "executed": int(s.executed), "avg_base_value": _score(s.avg_base_value),
+             "avg_goe": _score(s.avg_goe), "avg_panel_score": _score(s.avg_panel_score)}
+            for s in stats.itertuples()
+        ]
+
+    latest = perfs.iloc[-1]
+    return {
+        "name": latest["skater_name"], "nation": latest["nation"], "version": store.version,
+        "season_bests": season_bests,
+        "history": history,
+        "element_averages": element_averages,
+    }
@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+from datafiles import CURRENT, STARTUP_MANIFEST, current_version, source_stats
+from store import DataStore, Table, SCHEMA, source_digest
+from leaderboards import KEY as LEADERBOARDS_KEY, Leaderboards, leaderboards
+
+# Compiled binary snapshot of the four tables.
+# Every column of the columnar store is written as a raw .npy array, so the API
+# can np.load(mmap_mode='r') it: no parsing, and pages are only read (and shared
+# through the OS page cache) when a request touches them. Categories are small
+# and live in the manifest. What a worker would otherwise build from the tables
+# on load - the lookup indexes and the leaderboards - is compiled in too, so
+# every worker maps one copy instead of holding its own.
+#
+# Layout:
+#   snapshot/CURRENT              -> name of the live version directory
+#   snapshot/<version>/manifest.json
+#   snapshot/<version>/<table>.<column>.npy
+#   snapshot/<version>/<table>.<column>.text.npy   (packed strings)
+#   snapshot/<version>/<table>.<matrix>.matrix.npy (per-judge marks)
+#   snapshot/<version>/derived.<part>.<array>.npy  (indexes, leaderboards)
+#   snapshot/<version>/startup.json   (the competitions list, for a lazily starting worker; see warmup.py)
+
+MANIFEST = "manifest.json"
+FORMAT = 4  # bump when the layout changes; snapshots in another format are ignored
+
+
+def is_fresh(manifest, files):
+    # Cheap check first: untouched files can't have changed. Otherwise (e.g. a
+    # fresh checkout rewrote the mtimes) fall back to comparing contents.
+    if manifest.get("source_stats") == source_stats(files):
+        return True
+    return manifest["source_digest"] == source_digest(files)
+
+def write_snapshot(store, snapshot_dir):
+    """Write `store` (as returned by load_store) as a new snapshot version and
+    atomically point CURRENT at it"""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    version = f"{store.version}-{time.time_ns()}"
+    tmp_dir = os.path.join(snapshot_dir, f".tmp-{version}-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    manifest = {"format": FORMAT, "source_digest": store.version, "source_stats": store.source_stats, "tables": {}}
+    for name in SCHEMA:
+        table = getattr(store, name)
+        for col, values in table.columns.items():
+            np.save(os.path.join(tmp_dir, f"{name}.{col}.npy"), values)
+        for col, buf in table.text.items():
+            np.save(os.path.join(tmp_dir, f"{name}.{col}.text.npy"), buf)
+        for col, matrix in table.matrices.items():
+            np.save(os.path.join(tmp_dir, f"{name}.{col}.matrix.npy"), matrix)
+        manifest["tables"][name] = {
+            "columns": list(table.columns),
+            "categories": {col: labels.tolist() for col, labels in table.categories.items()},
+            "text": list(table.text),
+            "matrices": list(table.matrices),
+        }
+    manifest["derived"] = {}
+    for part, (meta, arrays) in [("indexes", store.dump_indexes()), ("leaderboards", leaderboards(store)[1].dump())]:
+        manifest["derived"][part] = meta
+        for key, values in arrays.items():
+            np.save(os.path.join(tmp_dir, f"derived.{part}.{key}.npy"), values)
+    with open(os.path.join(tmp_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+    with open(os.path.join(tmp_dir, STARTUP_MANIFEST), 'w') as f:
+        json.dump({"source_stats": store.source_stats, "competitions": store.get_competitions()}, f)
+
+    final_dir = os.path.join(snapshot_dir, version)
+    os.rename(tmp_dir, final_dir)
+    _write_pointer(snapshot_dir, version)
+    _prune(snapshot_dir, keep=version)
+    return final_dir
+
+def _write_pointer(snapshot_dir, version):
+    tmp = os.path.join(snapshot_dir, f".{CURRENT}.{os.getpid()}")
+    with open(tmp, 'w') as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(snapshot_dir, CURRENT))
+
+def _prune(snapshot_dir, keep):
+    # Older versions may still be mapped by running workers; unlinking them is
+    # safe on POSIX (the mapping stays valid) and frees the disk once they exit.
+    for entry in os.listdir(snapshot_dir):
+        path = os.path.join(snapshot_dir, entry)
+        if entry != keep and not entry.startswith('.') and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+def load_snapshot(snapshot_dir, files=None):
+    """Memory-map the current snapshot. Returns None when it is missing, or
+    stale compared to the CSVs in `files` (pass files=None to skip the check)."""
+    version = current_version(snapshot_dir)
+    if version is None:
+        return None
+    version_dir = os.path.join(snapshot_dir, version)
+    try:
+        with open(os.path.join(version_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if manifest.get("format") != FORMAT:
+        return None
+    if files is not None and not is_fresh(manifest, files):
+        return None
+
+    try:
+        return _map(version_dir, manifest)
+    except FileNotFoundError:
+        return None  # pruned by a newer compile while we were mapping it
+
+def _map(version_dir, manifest):
+    tables = {}
+    for name, meta in manifest["tables"].items():
+        columns = {
+            col: np.load(os.path.join(version_dir, f"{name}.{col}.npy"), mmap_mode='r')
+            for col in meta["columns"]
+        }
+        text = {
+            col: np.load(os.path.join(version_dir, f"{name}.{col}.text.npy"), mmap_mode='r')
+            for col in meta["text"]
+        }
+        matrices = {
+            col: np.load(os.path.join(version_dir, f"{name}.{col}.matrix.npy"), mmap_mode='r')
+            for col in meta["matrices"]
+        }
+        categories = {col: np.asarray(labels, dtype=object) for col, labels in meta["categories"].items()}
+        tables[name] = Table(columns, categories, text, matrices)
+
+    def derived(part):
+        prefix = f"derived.{part}."
+        arrays = {entry[len(prefix):-len(".npy")]: np.load(os.path.join(version_dir, entry), mmap_mode='r')
+                  for entry in os.listdir(version_dir) if entry.startswith(prefix)}
+        return manifest["derived"][part], arrays
+
+    store = DataStore(**tables, version=manifest["source_digest"], indexes=derived("indexes"))
+    store.cache[LEADERBOARDS_KEY] = Leaderboards.restore(*derived("leaderboards"))
+    return store
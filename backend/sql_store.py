@@ -0,0 +1,105 @@
+import pandas as pd
+from sqlalchemy import select
+from database import TABLES, data_version
+from metrics import cache_lookup
+from store import PROTOCOL_PARTS, DataStore, Table, table_from_frame
+
+# Read side of the SQLite backend (STORAGE_BACKEND=sqlite).
+# Exposes the DataStore methods main.py calls, on top of the request's pooled
+# session. Row lookups go through the composite indexes and only ever pull one
+# competition's rows; that slice is wrapped in a small DataStore so responses
+# are built (and formatted) by exactly the same code as the in-memory backend.
+
+
+class SqlStore:
+    _cache = {}  # data version -> memoized results, shared by all requests
+
+    def __init__(self, session):
+        self.session = session
+        self.conn = session.connection()  # one read transaction = one consistent view per request
+        self.version = f"sqlite-{data_version(self.conn)}"
+
+    def memo(self, key, compute):
+        cache = SqlStore._cache.get(self.version)
+        if cache is None:
+            cache = {}
+            SqlStore._cache = {self.version: cache}  # drop results of older versions
+        return cache_lookup(cache, key, compute)
+
+    def _table(self, name, query):
+        return table_from_frame(pd.read_sql(query, self.conn), name)
+
+    def get_competitions(self):
+        competitions = TABLES["competitions"]
+        return self._table("competitions", select(competitions).order_by(competitions.c.id)).rows()
+
+    @property
+    def performances(self):
+        """All performances (the small table), for whole-dataset aggregates like the podiums"""
+        perfs = TABLES["performances"]
+        return self.memo(("performances",), lambda: self._table("performances", select(perfs).order_by(perfs.c.id)))
+
+    def for_competition(self, competition_id, category=None):
+        """DataStore holding just this competition (optionally one category)"""
+        perfs = TABLES["performances"]
+        match = [perfs.c.competition_id == competition_id]
+        if category:
+            match.append(perfs.c.category == category)
+        return self._subset(match)
+
+    def for_performances(self, perf_ids):
+        """DataStore holding just these performances and their competitions"""
+        return self._subset([TABLES["performances"].c.id.in_(perf_ids)])
+
+    def for_leaderboards(self):
+        """Whole-dataset store with just the columns the leaderboards rank on,
+        loaded once per data version (see leaderboards.py)"""
+        return self.memo(("leaderboard_store",), self._leaderboard_store)
+
+    def _leaderboard_store(self):
+        competitions, perfs, elements = TABLES["competitions"], TABLES["performances"], TABLES["elements"]
+        columns = [elements.c[name] for name in
+                   ["id", "performance_id", "element_index", "element_name", "element_kind", "base_value", "goe", "panel_score"]]
+        return DataStore(
+            competitions=self._table("competitions", select(competitions).order_by(competitions.c.id)),
+            performances=self._table("performances", select(perfs).order_by(perfs.c.id)),
+            elements=self._table("elements", select(*columns).order_by(elements.c.performance_id, elements.c.element_index)),
+            components=Table({}), version=self.version,
+        )
+
+    def for_search(self):
+        """Whole-dataset store of the competitions and performances, for the
+        search index (see search.py)"""
+        return self.memo(("search_store",), self._search_store)
+
+    def _search_store(self):
+        competitions, perfs = TABLES["competitions"], TABLES["performances"]
+        return DataStore(
+            competitions=self._table("competitions", select(competitions).order_by(competitions.c.id)),
+            performances=self._table("performances", select(perfs).order_by(perfs.c.id)),
+            elements=Table({}), components=Table({}), version=self.version,
+        )
+
+    def _subset(self, match):
+        competitions, perfs = TABLES["competitions"], TABLES["performances"]
+        tables = {
+            "competitions": self._table("competitions", select(competitions).where(
+                competitions.c.id.in_(select(perfs.c.competition_id).where(*match))).order_by(competitions.c.id)),
+            "performances": self._table("performances", select(perfs).where(*match).order_by(perfs.c.id)),
+        }
+        for name, order in [("elements", "element_index"), ("components", "component_index")]:
+            child = TABLES[name]
+            query = (select(child).join(perfs, child.c.performance_id == perfs.c.id).where(*match)
+                     .order_by(child.c.performance_id, child.c[order]))
+            tables[name] = self._table(name, query)
+        return DataStore(**tables, version=self.version)
+
+    def performance_fields(self):
+        return list(TABLES["performances"].c.keys())
+
+    def get_protocols(self, competition_id, category=None, fields=None, include=PROTOCOL_PARTS):
+        return self.for_competition(competition_id, category).get_protocols(competition_id, category, fields, include)
+
+    def iter_protocols(self, competition_id, category=None, fields=None, include=PROTOCOL_PARTS):
+        # Not a generator: the rows are read now, while the request's session is open
+        return self.for_competition(competition_id, category).iter_protocols(competition_id, category, fields, include)
@@ -0,0 +1,456 @@
+import csv
+import ctypes
+import hashlib
+import io
+import os
+import sys
+import numpy as np
+import pandas as pd
+from datafiles import source_stats
+from element_codes import add_element_codes
+from metrics import cache_lookup
+
+# In-memory store for the API.
+# Tables are kept column-oriented (one NumPy array per column, strings as
+# categorical codes, scores as float32) and every lookup the endpoints need is
+# prebuilt once at load time. Python dicts are only created at the edge, for
+# the rows a response actually returns.
+
+CHUNK_ROWS = 50_000  # CSVs are parsed in chunks to keep the transient parse memory small
+SCORE_DECIMALS = 2  # every score in the protocols has 2 decimals
+STREAM_BATCH = 32  # performances decoded per step when a protocol response is streamed
+
+# Child tables a protocol can carry -> the index of their rows per performance
+PROTOCOL_PARTS = {"elements": "element_slices", "components": "component_slices"}
+
+# Nearly-unique strings (the per-judge marks) aren't worth a categories array:
+# they are packed into one utf-8 byte buffer plus an offsets array instead.
+TEXT = "text"
+
+# Column dtypes per table. Anything not listed here is a low-cardinality string
+# column and is stored as int32 codes into a categories array.
+SCHEMA = {
+    "competitions": {"id": np.int32},
+    "performances": {
+        "id": np.int32, "competition_id": np.int32, "rank": np.int32,
+        "total_score": np.float32, "tes_score": np.float32, "pcs_score": np.float32, "deductions": np.float32,
+    },
+    "elements": {
+        "id": np.int32, "performance_id": np.int32, "element_index": np.int32,
+        "base_value": np.float32, "goe": np.float32, "panel_score": np.float32, "is_bonus": np.bool_,
+        "judges_scores": TEXT, "rotations": np.int8, "combo_length": np.int8,
+    },
+    "components": {
+        "id": np.int32, "performance_id": np.int32, "component_index": np.int32,
+        "factor": np.float32, "panel_score": np.float32,
+        "judges_scores": TEXT,
+    },
+}
+
+# Per-judge marks parsed out of judges_scores once, at load / snapshot compile
+# time: one row per element or component, one column per judge slot. GOEs are
+# small integers (int8), PCS marks are quarter points (float32). Slots without
+# a mark (smaller panels, "-" in the protocol) are flagged in a bool mask.
+N_JUDGES = 9
+MARKS = {"elements": np.int8, "components": np.float32}
+
+# Columns filled in from the others when a CSV predates them
+DERIVED = {"elements": add_element_codes}
+
+
+class Table:
+    """Column-oriented table: equal-length arrays, strings dictionary-encoded"""
+
+    def __init__(self, columns, categories=None, text=None, matrices=None):
+        self.columns = columns              # name -> ndarray (codes / offsets for string columns)
+        self.categories = categories or {}  # name -> object ndarray of labels
+        self.text = text or {}              # name -> uint8 buffer, indexed by offsets in columns
+        self.matrices = matrices or {}      # name -> 2-D ndarray, one row per table row (not part of rows())
+
+    def __len__(self):
+        if not self.columns:
+            return 0
+        name, values = next(iter(self.columns.items()))
+        return len(values) - 1 if name in self.text else len(values)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @classmethod
+    def from_frame(cls, df, dtypes, marks=None):
+        """`marks`: dtype to parse judges_scores into the judges / judges_missing matrices"""
+        columns, categories, text, matrices = {}, {}, {}, {}
+        for name in df.columns:
+            if dtypes.get(name) == TEXT:
+                columns[name], text[name] = pack_text(df[name].fillna('').astype(str).tolist())
+            elif name in dtypes:
+                columns[name] = df[name].to_numpy(dtype=dtypes[name])
+            else:
+                codes, labels = pd.factorize(df[name].fillna('').astype(str))
+                columns[name] = codes.astype(np.int32)
+                categories[name] = np.asarray(labels, dtype=object)
+        if marks is not None and "judges_scores" in df:
+            matrices["judges"], matrices["judges_missing"] = parse_marks(df["judges_scores"].fillna('').astype(str).tolist(), marks)
+        return cls(columns, categories, text, matrices)
+
+    def take(self, idx):
+        """New table with the rows at positions idx (an index array)"""
+        columns, text = {}, {}
+        for name, values in self.columns.items():
+            if name in self.text:
+                columns[name], text[name] = take_text(values, self.text[name], idx)
+            else:
+                columns[name] = values[idx]
+        matrices = {name: values[idx] for name, values in self.matrices.items()}
+        return Table(columns, self.categories, text, matrices)
+
+    def decode(self, name, idx=None):
+        """Values of one column as a Python list (labels for string columns)"""
+        if name in self.text:
+            return unpack_text(self.columns[name], self.text[name], idx)
+        values = self.columns[name] if idx is None else self.columns[name][idx]
+        if name in self.categories:
+            return self.categories[name][values].tolist()
+        if values.dtype.kind == 'f':
+            return [round(v, SCORE_DECIMALS) for v in values.tolist()]
+        return values.tolist()
+
+    def rows(self, idx=None, columns=None):
+        """Materialize rows as dicts - only for what goes into a response
+        (and only the given columns, if any)"""
+        names = list(self.columns) if columns is None else list(columns)
+        cols = [self.decode(name, idx) for name in names]
+        return [dict(zip(names, values)) for values in zip(*cols)]
+
+    def to_frame(self, idx=None):
+        """pandas view for vectorized aggregates (strings as Categoricals)"""
+        data = {}
+        for name, values in self.columns.items():
+            if name in self.text:
+                data[name] = self.decode(name, idx)
+                continue
+            values = values if idx is None else values[idx]
+            if name in self.categories:
+                data[name] = pd.Categorical.from_codes(values, categories=self.categories[name])
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
+
+
+class DataStore:
+    def __init__(self, competitions, performances, elements, components, version=None, source_stats=None, indexes=None):
+        self.version = version              # content digest of the data it was built from
+        self.source_stats = source_stats    # (size, mtime) of those files at load time
+        self.cache = {}                     # derived results, valid as long as this store is live
+        self.competitions = competitions
+        self.performances = performances
+        self.elements = elements
+        self.components = components
+        if indexes is None:
+            self._build_indexes()
+        else:
+            self._restore_indexes(*indexes)  # from a snapshot; tables are already in protocol order
+
+    @classmethod
+    def empty(cls):
+        return cls(Table({}), Table({}), Table({}), Table({}))
+
+    def _build_indexes(self):
+        # competition_id -> performance rows, (competition_id, category) -> performance rows
+        comp_ids = self.performances["competition_id"] if len(self.performances) else np.empty(0, np.int32)
+        self.perfs_by_comp = group_rows(comp_ids)
+        self.perfs_by_comp_cat = {}
+        if len(self.performances):
+            labels = self.performances.categories["category"]
+            for comp_id, rows in self.perfs_by_comp.items():
+                codes = self.performances["category"][rows]
+                for code in np.unique(codes):
+                    self.perfs_by_comp_cat[(comp_id, labels[code])] = rows[codes == code]
+
+        # performance_id -> slice of rows, tables re-sorted into protocol order
+        self.elements, self.element_slices = sort_by_performance(self.elements, "element_index")
+        self.components, self.component_slices = sort_by_performance(self.components, "component_index")
+
+    def dump_indexes(self):
+        """(JSON metadata, arrays) of the lookup indexes, for the snapshot"""
+        meta, arrays = {}, {}
+        for name in ["perfs_by_comp", "perfs_by_comp_cat"]:
+            meta[name], arrays[f"{name}.offsets"], arrays[f"{name}.rows"] = pack_groups(getattr(self, name))
+        for name in ["element_slices", "component_slices"]:
+            slices = getattr(self, name)
+            for part in ["ids", "starts", "ends"]:
+                arrays[f"{name}.{part}"] = getattr(slices, part)
+        return meta, arrays
+
+    def _restore_indexes(self, meta, arrays):
+        for name in ["perfs_by_comp", "perfs_by_comp_cat"]:
+            setattr(self, name, unpack_groups(meta[name], arrays[f"{name}.offsets"], arrays[f"{name}.rows"]))
+        for name in ["element_slices", "component_slices"]:
+            setattr(self, name, SliceIndex.from_arrays(*(arrays[f"{name}.{part}"] for part in ["ids", "starts", "ends"])))
+
+    def memo(self, key, compute):
+        """Compute a derived result once per data version. A reload builds a new
+        DataStore, so cached entries never outlive the data they came from."""
+        return cache_lookup(self.cache, key, compute)
+
+    def get_competitions(self):
+        return self.competitions.rows()
+
+    def for_competition(self, competition_id, category=None):
+        """Store to run per-competition aggregates on; everything is already in memory"""
+        return self
+
+    def for_performances(self, perf_ids):
+        return self
+
+    def for_leaderboards(self):
+        return self
+
+    def for_search(self):
+        return self
+
+    def performance_rows(self, competition_id, category=None):
+        if category:
+            rows = self.perfs_by_comp_cat.get((competition_id, category))
+        else:
+            rows = self.perfs_by_comp.get(competition_id)
+        return rows if rows is not None else np.empty(0, np.intp)
+
+    def get_performances(self, competition_id, category=None):
+        return self.performances.rows(self.performance_rows(competition_id, category))
+
+    def performance_fields(self):
+        return list(self.performances.columns)
+
+    def get_protocols(self, competition_id, category=None, fields=None, include=PROTOCOL_PARTS):
+        """Performances (just `fields`, if given) with the child tables in
+        `include` (elements / components) attached"""
+        return self._protocols(self.performance_rows(competition_id, category), fields, include)
+
+    def iter_protocols(self, competition_id, category=None, fields=None, include=PROTOCOL_PARTS):
+        """get_protocols one performance at a time, decoded STREAM_BATCH
+        performances at a go, so memory doesn't grow with the competition"""
+        rows = self.performance_rows(competition_id, category)
+        for start in range(0, len(rows), STREAM_BATCH):
+            yield from self._protocols(rows[start:start + STREAM_BATCH], fields, include)
+
+    def _protocols(self, rows, fields, include):
+        perfs = self.performances.rows(rows, fields)
+        if not include:
+            return perfs
+        perf_ids = self.performances["id"][rows].tolist()
+        for part in include:
+            children = children_by_performance(getattr(self, part), getattr(self, PROTOCOL_PARTS[part]), perf_ids)
+            for p, my_children in zip(perfs, children):
+                p[part] = my_children
+        return perfs
+
+    def get_elements(self, performance_id):
+        rows = self.element_slices.get(performance_id)
+        return self.elements.rows(rows) if rows is not None else []
+
+    def get_components(self, performance_id):
+        rows = self.component_slices.get(performance_id)
+        return self.components.rows(rows) if rows is not None else []
+
+
+def pack_text(values):
+    """list of str -> (int64 offsets, uint8 utf-8 buffer)"""
+    joined = "".join(values)
+    if joined.isascii():
+        lengths, data = [len(v) for v in values], joined.encode()
+    else:
+        encoded = [v.encode() for v in values]
+        lengths, data = [len(b) for b in encoded], b"".join(encoded)
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets, np.frombuffer(data, dtype=np.uint8)
+
+def take_text(offsets, buf, idx):
+    """Gather packed strings at positions idx without decoding them"""
+    starts, ends = offsets[:-1][idx], offsets[1:][idx]
+    lengths = ends - starts
+    new_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    gather = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return new_offsets, buf[gather]
+
+def unpack_text(offsets, buf, idx=None):
+    if idx is None:
+        idx = slice(0, len(offsets) - 1)
+    if isinstance(idx, slice):
+        starts, ends = offsets[idx.start:idx.stop].tolist(), offsets[idx.start + 1:idx.stop + 1].tolist()
+    else:
+        idx = np.asarray(idx)
+        starts, ends = offsets[idx].tolist(), offsets[idx + 1].tolist()
+    data = memoryview(buf)
+    return [data[s:e].tobytes().decode() for s, e in zip(starts, ends)]
+
+def parse_numbers(flat):
+    """'3,2,-,...' -> float64 per comma-separated token, NaN where it isn't a
+    number. One token per line through pandas' C parser, several times faster
+    than to_numeric over split strings; that is kept for odd tokens."""
+    if not flat:
+        return np.empty(0, dtype=np.float64)
+    values = pd.read_csv(io.StringIO(flat.replace(",", "\n")), header=None, names=["v"], na_values=["-"],
+                         skip_blank_lines=False, quoting=csv.QUOTE_NONE)["v"]
+    if values.dtype.kind not in "if" or len(values) != flat.count(",") + 1:
+        values = pd.to_numeric(pd.Series(flat.split(','), dtype=object), errors='coerce')
+    return values.to_numpy(dtype=np.float64)
+
+def parse_marks(texts, dtype, n_judges=N_JUDGES):
+    """'3,2,-1,...' strings -> (marks, missing): an (n, n_judges) matrix of
+    `dtype` and a bool mask of the slots without a numeric mark"""
+    counts = np.array([t.count(',') + 1 if t else 0 for t in texts], dtype=np.int64)
+    values = parse_numbers(",".join(t for t in texts if t))
+    rows = np.repeat(np.arange(len(texts)), counts)
+    starts = np.cumsum(counts) - counts
+    cols = np.arange(len(values)) - np.repeat(starts, counts)
+    keep = (cols < n_judges) & ~np.isnan(values)
+
+    marks = np.zeros((len(texts), n_judges), dtype=dtype)
+    missing = np.ones((len(texts), n_judges), dtype=np.bool_)
+    marks[rows[keep], cols[keep]] = np.round(values[keep]) if np.dtype(dtype).kind == 'i' else values[keep]
+    missing[rows[keep], cols[keep]] = False
+    return marks, missing
+
+def concat_tables(tables):
+    """Append tables with the same columns, merging categories and text buffers"""
+    tables = [t for t in tables if t.columns]
+    if len(tables) <= 1:
+        return tables[0] if tables else Table({})
+    first = tables[0]
+    columns, categories, text = {}, {}, {}
+    for name in first.columns:
+        if name in first.text:
+            shifts = np.cumsum([0] + [len(t.text[name]) for t in tables[:-1]])
+            columns[name] = np.concatenate([first[name][:1]] + [t[name][1:] + shift for t, shift in zip(tables, shifts)])
+            text[name] = np.concatenate([t.text[name] for t in tables])
+        elif name in first.categories:
+            labels = pd.Index(np.concatenate([t.categories[name] for t in tables])).unique()
+            columns[name] = np.concatenate([
+                labels.get_indexer(t.categories[name]).astype(np.int32)[t[name]] for t in tables
+            ])
+            categories[name] = np.asarray(labels, dtype=object)
+        else:
+            columns[name] = np.concatenate([t[name] for t in tables])
+    matrices = {name: np.concatenate([t.matrices[name] for t in tables]) for name in first.matrices}
+    return Table(columns, categories, text, matrices)
+
+def group_rows(keys):
+    """key -> ndarray of row positions (in original row order)"""
+    order = np.argsort(keys, kind='stable')
+    uniq, starts = np.unique(keys[order], return_index=True)
+    bounds = list(starts[1:]) + [len(order)]
+    return {int(k): order[s:e] for k, s, e in zip(uniq, starts, bounds)}
+
+def pack_groups(groups):
+    """key -> row positions as (keys, offsets, rows): one flat array that can be
+    saved and memory-mapped, keys as a JSON-able list"""
+    keys = list(groups)
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum([len(groups[key]) for key in keys], out=offsets[1:])
+    rows = np.concatenate([groups[key] for key in keys]) if keys else np.empty(0, np.intp)
+    return [list(key) if isinstance(key, tuple) else key for key in keys], offsets, rows
+
+def unpack_groups(keys, offsets, rows):
+    """Inverse of pack_groups; the row arrays are views into `rows`"""
+    bounds = offsets.tolist()
+    return {tuple(key) if isinstance(key, list) else key: rows[bounds[i]:bounds[i + 1]] for i, key in enumerate(keys)}
+
+class SliceIndex:
+    """performance_id -> contiguous slice of a table sorted by performance_id.
+    Kept as two arrays (searched with searchsorted) rather than a dict, so
+    building it at startup doesn't create a Python object per performance."""
+
+    def __init__(self, keys):
+        self.ids, starts = np.unique(keys, return_index=True)
+        self.starts = starts
+        self.ends = np.append(starts[1:], len(keys))
+
+    @classmethod
+    def from_arrays(cls, ids, starts, ends):
+        index = cls.__new__(cls)
+        index.ids, index.starts, index.ends = ids, starts, ends
+        return index
+
+    def get(self, key, default=None):
+        pos = np.searchsorted(self.ids, key)
+        if pos == len(self.ids) or self.ids[pos] != key:
+            return default
+        return slice(int(self.starts[pos]), int(self.ends[pos]))
+
+def sort_by_performance(table, order_key):
+    """Sort a child table by (performance_id, order_key) and index it by performance_id"""
+    if not len(table):
+        return table, SliceIndex(np.empty(0, np.int32))
+    perf_ids, order_values = table["performance_id"], table[order_key]
+    same_perf = perf_ids[1:] == perf_ids[:-1]
+    in_order = np.all(perf_ids[1:] >= perf_ids[:-1]) and np.all(order_values[1:][same_perf] >= order_values[:-1][same_perf])
+    if not in_order:  # CSVs are normally appended in protocol order already
+        table = table.take(np.lexsort((order_values, perf_ids)))
+    return table, SliceIndex(table["performance_id"])
+
+def child_rows(slices, perf_ids):
+    """Row positions of all children of the given performances, in order"""
+    parts = [slices.get(pid, slice(0, 0)) for pid in perf_ids]
+    if not parts:
+        return parts, np.empty(0, np.intp)
+    return parts, np.concatenate([np.arange(s.start, s.stop) for s in parts])
+
+def children_by_performance(table, slices, perf_ids):
+    """Decode the child rows of many performances in one pass, split per performance"""
+    if not perf_ids:
+        return []
+    parts, idx = child_rows(slices, perf_ids)
+    rows = table.rows(idx) if len(idx) else []
+    out, pos = [], 0
+    for s in parts:
+        n = s.stop - s.start
+        out.append(rows[pos:pos + n])
+        pos += n
+    return out
+
+def table_from_frame(df, name):
+    """Table for one of the SCHEMA tables, with its derived columns"""
+    if name in DERIVED:
+        df = DERIVED[name](df)
+    return Table.from_frame(df, SCHEMA[name], MARKS.get(name))
+
+def read_table(path, name):
+    if not os.path.exists(path): return Table({})
+    try:
+        chunks = pd.read_csv(path, chunksize=CHUNK_ROWS)
+        return concat_tables([table_from_frame(chunk, name) for chunk in chunks])
+    except pd.errors.EmptyDataError:
+        return Table({})
+
+def source_digest(files):
+    """Content hash of the source CSVs, used as the data version.
+    mtimes aren't stable across git checkouts (or workers), contents are."""
+    h = hashlib.blake2b(digest_size=8)
+    for name in sorted(files):
+        path = files[name]
+        h.update(name.encode())
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    h.update(block)
+    return h.hexdigest()
+
+def release_memory():
+    """Hand the heap pages freed by CSV parsing back to the OS (glibc only).
+    Without this a worker's RSS stays at the parse peak rather than the data size."""
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except OSError:
+            pass
+
+def load_store(files):
+    """Build a DataStore from the CSV paths in `files` (see data_manager.FILES)"""
+    stats = source_stats(files)
+    version = source_digest(files)
+    store = DataStore(**{name: read_table(files[name], name) for name in SCHEMA}, version=version, source_stats=stats)
+    release_memory()
+    return store
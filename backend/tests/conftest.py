@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# Tests run from backend/ (python -m pytest); the modules import each other
+# flat, the way the scripts and uvicorn load them.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.synthetic import generate  # noqa: E402
+
+SHIPPED_DATA = os.path.join(BACKEND_DIR, "data")
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty data/ to write to. Every path in datafiles.py is relative to
+    the working directory, so the test just runs from a fresh one."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    return tmp_path / "data"
+
+
+def protocol(skaters=3, category="Men", program="Free", seed=0):
+    """One segment of a synthetic event as scraper.parse_protocol records"""
+    _, perfs, elems, comps = generate(1, skaters_per_event=skaters, seed=seed)
+    perfs = perfs[(perfs["category"] == category) & (perfs["program_type"] == program)]
+    records = []
+    for perf in perfs.to_dict("records"):
+        perf_id = perf.pop("id")
+        perf.pop("competition_id")
+        records.append({
+            "performance": perf,
+            "elements": [{k: v for k, v in el.items() if k not in ("id", "performance_id")}
+                         for el in elems[elems["performance_id"] == perf_id].to_dict("records")],
+            "components": [{k: v for k, v in c.items() if k not in ("id", "performance_id")}
+                           for c in comps[comps["performance_id"] == perf_id].to_dict("records")],
+        })
+    return records
@@ -0,0 +1,23 @@
+import pytest
+
+from benchmarks.bench_coldstart import BUDGET_FIRST_S, BUDGET_IMPORT_S, best_of, cold_start, import_seconds, prepare
+
+# The benchmark's budgets, loosened for slow or busy CI machines: this catches
+# a heavy import or an eager load creeping back in, not a few percent.
+CI_MARGIN = 3
+
+
+@pytest.fixture(scope="module")
+def shipped(tmp_path_factory):
+    root = tmp_path_factory.mktemp("coldstart")
+    prepare(str(root))
+    return str(root)
+
+
+def test_import_main_within_budget(shipped):
+    assert best_of(3, lambda: import_seconds(shipped)) < CI_MARGIN * BUDGET_IMPORT_S
+
+
+def test_lazy_first_response_within_budget(shipped):
+    result = best_of(3, lambda: cold_start(shipped, lazy=True))
+    assert result["first_s"] < CI_MARGIN * BUDGET_FIRST_S
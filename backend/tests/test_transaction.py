@@ -0,0 +1,156 @@
+import json
+import os
+import signal
+
+import pandas as pd
+import pytest
+
+import data_manager
+from conftest import protocol
+from data_manager import FILES, JOURNAL_FILE, compile_snapshot, init_csvs, transaction
+from element_codes import ELEMENT_CODES
+from scraper import save_protocol
+
+
+def tables():
+    return {name: pd.read_csv(path) for name, path in FILES.items()}
+
+
+def contents():
+    return {path: open(path).read() for path in FILES.values()}
+
+
+@pytest.mark.parametrize("snapshot", [False, True])
+def test_reimport_keeps_performance_ids_and_replaces_children(data_dir, snapshot):
+    other = protocol(skaters=2, seed=1)
+    assert save_protocol(other, "Other Event", "2024-2025") == (2, 0)
+    first = protocol()
+    assert save_protocol(first, "Event", "2024-2025") == (3, 0)
+    before = tables()
+    if snapshot:
+        compile_snapshot()  # existing rows are then found through the snapshot's index
+
+    # The corrected protocol: one element fewer and a new score for the first skater
+    changed = protocol()
+    changed[0]["elements"] = changed[0]["elements"][:-1]
+    changed[0]["performance"]["total_score"] += 1.0
+    assert save_protocol(changed, "Event", "2024-2025") == (0, 3)
+
+    after = tables()
+    event = before["performances"][before["performances"]["competition_id"] == 2]
+    assert len(after["performances"]) == len(before["performances"])
+    assert after["performances"].set_index("id").loc[event["id"], "skater_name"].tolist() == event["skater_name"].tolist()
+    first_id = int(event["id"].iloc[0])
+    assert after["performances"].set_index("id").loc[first_id, "total_score"] == pytest.approx(
+        changed[0]["performance"]["total_score"])
+
+    for name, key in [("elements", "element_name"), ("components", "component_name")]:
+        rows = after[name][after[name]["performance_id"] == first_id]
+        assert rows[key].tolist() == [row[key] for row in changed[0][name]]
+        assert after[name]["id"].is_unique
+        # The other competition's rows are untouched
+        other_ids = before["performances"][before["performances"]["competition_id"] == 1]["id"]
+        kept = before[name][before[name]["performance_id"].isin(other_ids)]
+        pd.testing.assert_frame_equal(after[name][after[name]["performance_id"].isin(other_ids)].reset_index(drop=True),
+                                      kept.reset_index(drop=True))
+    assert len(after["elements"]) == len(before["elements"]) - 1
+
+
+def test_leftover_append_is_rolled_back(data_dir, monkeypatch):
+    save_protocol(protocol(), "Event", "2024-2025")
+    committed = contents()
+
+    # Die after the first table's append, before recover() can run
+    fsyncs = []
+    real_fsync = os.fsync
+    def crash_on_third(fd):
+        fsyncs.append(fd)
+        if len(fsyncs) == 3:  # the journal, competitions.csv, then performances.csv
+            raise KeyboardInterrupt
+        real_fsync(fd)
+    recover = data_manager.recover
+    monkeypatch.setattr(os, "fsync", crash_on_third)
+    monkeypatch.setattr(data_manager, "recover", lambda: None)
+    with pytest.raises(KeyboardInterrupt):
+        save_protocol(protocol(seed=1), "Second Event", "2024-2025")
+    monkeypatch.setattr(os, "fsync", real_fsync)
+    monkeypatch.setattr(data_manager, "recover", recover)
+    assert os.path.exists(JOURNAL_FILE)
+    assert contents() != committed
+
+    with transaction():  # the next writer
+        pass
+    assert contents() == committed
+    assert not os.path.exists(JOURNAL_FILE)
+
+
+def test_leftover_rewrite_is_rolled_forward(data_dir, monkeypatch):
+    save_protocol(protocol(), "Event", "2024-2025")
+    changed = protocol()
+    changed[0]["elements"] = changed[0]["elements"][:-1]
+
+    # The same re-import, once uninterrupted, for the expected result
+    reference = data_dir.parent / "reference"
+    reference.mkdir()
+    (reference / "data").mkdir()
+    for path in FILES.values():
+        (reference / path).write_text(open(path).read())
+    monkeypatch.chdir(reference)
+    save_protocol(changed, "Event", "2024-2025")
+    expected = contents()
+    monkeypatch.chdir(data_dir.parent)
+
+    # Die after the first rename, with the journal written
+    renames = []
+    real_replace = os.replace
+    def crash_on_second(src, dst):
+        renames.append(src)
+        if len(renames) == 2:
+            raise KeyboardInterrupt
+        real_replace(src, dst)
+    monkeypatch.setattr(os, "replace", crash_on_second)
+    with pytest.raises(KeyboardInterrupt):
+        save_protocol(changed, "Event", "2024-2025")
+    monkeypatch.setattr(os, "replace", real_replace)
+    with open(JOURNAL_FILE) as f:
+        assert len(json.load(f)["rename"]) == 3  # performances, elements, components
+
+    with transaction():
+        pass
+    assert contents() == expected
+    assert not os.path.exists(JOURNAL_FILE)
+    assert not any(os.path.exists(path + ".tmp") for path in FILES.values())
+
+
+def old_format_elements():
+    """Cut elements.csv back to its header from before the derived columns"""
+    elements = pd.read_csv(FILES["elements"], dtype=str, keep_default_na=False)
+    elements.drop(columns=list(ELEMENT_CODES)).to_csv(FILES["elements"], index=False)
+    return elements
+
+
+def test_old_csv_gains_the_derived_columns(data_dir):
+    save_protocol(protocol(), "Event", "2024-2025")
+    current = old_format_elements()
+    init_csvs()
+    pd.testing.assert_frame_equal(pd.read_csv(FILES["elements"], dtype=str, keep_default_na=False), current)
+    init_csvs()  # already upgraded: left as it is
+    pd.testing.assert_frame_equal(pd.read_csv(FILES["elements"], dtype=str, keep_default_na=False), current)
+
+
+def test_rewrite_commit_upgrades_an_old_csv(data_dir):
+    save_protocol(protocol(), "Event", "2024-2025")
+    current = old_format_elements()
+
+    def timeout(signum, frame):
+        raise TimeoutError("the transaction is waiting on its own lock")
+    handler = signal.signal(signal.SIGALRM, timeout)
+    signal.alarm(10)
+    try:
+        with transaction() as tx:  # not through save_protocol, which upgrades before it opens one
+            tx.delete("elements", "performance_id", {"999999"})
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, handler)
+    pd.testing.assert_frame_equal(pd.read_csv(FILES["elements"], dtype=str, keep_default_na=False), current)
+    assert not os.path.exists(JOURNAL_FILE)
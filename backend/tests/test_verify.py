@@ -0,0 +1,36 @@
+import os
+
+import verify
+from conftest import SHIPPED_DATA, protocol
+
+
+def checks(found):
+    return set(found["check"])
+
+
+def test_shipped_data_has_no_discrepancies():
+    files = {name: os.path.join(SHIPPED_DATA, f"{name}.csv") for name in verify.COLUMNS}
+    found = verify.check(*verify.read_csvs(files))
+    assert found.empty, found.head().to_string()
+
+
+def test_parsed_protocol_is_clean():
+    assert verify.check_parsed(protocol()).empty
+
+
+def test_wrong_panel_score_is_flagged():
+    skaters = protocol()
+    skaters[1]["elements"][2]["panel_score"] += 1.0
+    found = verify.check_parsed(skaters)
+    assert checks(found) == {"element_panel", "tes"}
+    assert set(found["performance_id"]) == {2}
+    assert found.loc[found["check"] == "element_panel", "item"].tolist() == [skaters[1]["elements"][2]["element_index"]]
+
+
+def test_missing_element_is_flagged():
+    skaters = protocol()
+    del skaters[0]["elements"][3]
+    found = verify.check_parsed(skaters)
+    assert checks(found) == {"element_index", "tes"}
+    assert set(found["performance_id"]) == {1}
+    assert found.loc[found["check"] == "element_index", "expected"].tolist() == [4]
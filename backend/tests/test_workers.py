@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from benchmarks.bench_workers import measure
+from benchmarks.synthetic import write_dataset
+
+WORKERS = 4
+# Data memory (PSS over all workers, less the same workers with no data) of
+# WORKERS workers in shared mode may be at most this times one worker's. They
+# map one snapshot; private copies would come close to WORKERS times.
+MAX_GROWTH = 1.5
+
+pytestmark = pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="needs /proc/<pid>/smaps_rollup")
+
+
+def test_shared_snapshot_memory_does_not_grow_with_workers(tmp_path):
+    write_dataset(str(tmp_path / "big" / "data"), 300)
+    write_dataset(str(tmp_path / "small" / "data"), 1)
+
+    def data_pss(n_workers):
+        return (measure(str(tmp_path / "big"), "shared", n_workers)["pss_mb"]
+                - measure(str(tmp_path / "small"), "shared", n_workers)["pss_mb"])
+
+    one, many = data_pss(1), data_pss(WORKERS)
+    assert one > 0
+    assert many < MAX_GROWTH * one, f"{WORKERS} workers use {many:.0f}MB of data PSS, one uses {one:.0f}MB"
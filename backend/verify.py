@@ -0,0 +1,223 @@
+import time
+import numpy as np
+import pandas as pd
+from datafiles import FILES, STORAGE_BACKEND
+from element_codes import add_element_codes
+from store import parse_marks
+
+# Score checks. A protocol is redundant: every panel score, GOE and total can be
+# recomputed from the other numbers with the ISU rules, so a line the scraper
+# misread (judges' marks split wrongly, an element dropped, a missed 'x' bonus
+# mark) shows up as a number that no longer adds up.
+#
+#   element      panel score = base value + GOE
+#                GOE = trimmed mean of the grades x 10% of the base value before
+#                the 'x' bonus (x1.1) and the +REP cut (x0.7); 0.5 a grade for a
+#                ChSq. A combination's GOE is taken from its hardest jump, whose
+#                base value isn't printed, so it is only bounded by the element's.
+#   component    panel score = trimmed mean of the marks
+#   performance  TES = sum of the element panel scores, PCS = sum of component
+#                panel score x factor, total = TES + PCS + deductions (negative)
+#   marks        judged rows have the performance's panel size of marks, grades
+#                are whole numbers in -5..5, component marks quarters in 0.25..10,
+#                and elements are numbered 1..n
+#
+# Whole tables are checked at once with numpy, so it runs on every import (after
+# parsing, before the write; see scraper.py and run_batch.py) and over the data:
+#   python verify.py [--limit 10] [--out discrepancies.csv]
+
+ROUNDING = 0.005        # published scores are rounded to the cent
+GOE_TOLERANCE = 0.01    # + the base value before bonus/cut is itself recovered from a rounded one
+FACTOR_ROUNDING = 0.005 # factors are printed rounded (3.33 for 10/3), per point of panel score
+EPS = 1e-6
+BONUS, REPEAT, CHOREO_STEP = 1.1, 0.7, 0.5
+GRADES = (-5, 5)
+MARKS = (0.25, 10)
+
+COLUMNS = {
+    "performances": ["id", "skater_name", "program_type", "category", "total_score", "tes_score", "pcs_score", "deductions"],
+    "elements": ["performance_id", "element_index", "element_name", "base_value", "goe", "panel_score", "judges_scores",
+                 "is_bonus", "element_kind", "combo_length"],
+    "components": ["performance_id", "component_index", "component_name", "factor", "panel_score", "judges_scores"],
+}
+
+# check -> how a discrepancy reads in the report
+CHECKS = {
+    "element_index": "numbered {reported:.0f}, expected {expected:.0f} (element missing?)",
+    "element_marks": "{reported:.0f} judges' marks or a grade out of range, panel of {expected:.0f}",
+    "element_panel": "panel score {reported:.2f}, base value + GOE {expected:.2f}",
+    "element_goe": "GOE {reported:.2f}, from the judges {expected:.2f}",
+    "combo_goe": "GOE {reported:.2f}, more than the judges allow ({expected:.2f})",
+    "component_marks": "{reported:.0f} judges' marks or a mark out of range, panel of {expected:.0f}",
+    "component_panel": "panel score {reported:.2f}, judges' trimmed mean {expected:.2f}",
+    "tes": "TES {reported:.2f}, sum of the elements {expected:.2f}",
+    "pcs": "PCS {reported:.2f}, sum of the components x factor {expected:.2f}",
+    "total": "total {reported:.2f}, TES + PCS + deductions {expected:.2f}",
+}
+
+
+def trimmed_marks(texts):
+    """'3,2,-1,...' strings -> (marks, missing, mark counts, trimmed means).
+    Counts are of every comma-separated token, numeric or not; the mean drops
+    one highest and one lowest mark and is NaN under three marks."""
+    texts = [t if isinstance(t, str) else "" for t in texts]
+    counts = np.array([t.count(",") + 1 if t else 0 for t in texts], dtype=np.int64)
+    marks, missing = parse_marks(texts, np.float64, n_judges=max(int(counts.max(initial=0)), 1))
+    n = (~missing).sum(axis=1)
+    total = np.where(missing, 0.0, marks).sum(axis=1)
+    high = np.where(missing, -np.inf, marks).max(axis=1)
+    low = np.where(missing, np.inf, marks).min(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(n >= 3, (total - high - low) / (n - 2), np.nan)
+    return marks, missing, counts, mean
+
+def _found(check, frame, mask, reported, expected, name=None):
+    mask = np.asarray(mask, dtype=np.bool_)
+    return pd.DataFrame({
+        "performance_id": np.asarray(frame["performance_id"] if "performance_id" in frame else frame["id"])[mask],
+        "check": check,
+        "item": np.asarray(frame[name + "_index"])[mask] if name else 0,
+        "item_name": np.asarray(frame[name + "_name"], dtype=object)[mask] if name else "",
+        "reported": np.asarray(reported, dtype=np.float64)[mask],
+        "expected": np.round(np.asarray(expected, dtype=np.float64)[mask], 2),
+    })
+
+def _marks_found(check, frame, name, counts, missing, bad_mark, panel):
+    """Judged rows (any numeric mark) whose marks don't fill the panel, or with a bad one"""
+    n = (~missing).sum(axis=1)
+    size = panel.reindex(frame["performance_id"]).to_numpy()
+    bad = (n > 0) & ((counts != size) | (n != counts) | (bad_mark & ~missing).any(axis=1))
+    return _found(check, frame, bad, counts, size, name)
+
+def check(perfs, elems, comps):
+    """Every discrepancy in the given tables, one row each: performance_id,
+    check, item/item_name (the element or component; 0/"" for a performance
+    check), reported and expected value, plus the performance's labels"""
+    if not {"element_kind", "combo_length"} <= set(elems):
+        elems = add_element_codes(elems)
+    found = []
+
+    # Elements, numbered 1..n in protocol order: the first gap per performance
+    position = elems.groupby("performance_id", sort=False).cumcount().to_numpy() + 1
+    gaps = _found("element_index", elems, elems["element_index"].to_numpy() != position,
+                  elems["element_index"], position, "element")
+    found.append(gaps.drop_duplicates("performance_id"))
+
+    e_marks, e_missing, e_counts, e_mean = trimmed_marks(elems["judges_scores"].tolist())
+    c_marks, c_missing, c_counts, c_mean = trimmed_marks(comps["judges_scores"].tolist())
+    # Panel size: the most common mark count over a performance's judged rows
+    counts = pd.DataFrame({"performance_id": np.concatenate([elems["performance_id"], comps["performance_id"]]),
+                           "count": np.concatenate([e_counts, c_counts])})
+    judged = np.concatenate([(~e_missing).any(axis=1), (~c_missing).any(axis=1)])
+    panel = (counts[judged].value_counts().reset_index(name="rows")
+             .sort_values("rows", kind="stable").drop_duplicates("performance_id", keep="last")
+             .set_index("performance_id")["count"])
+    found.append(_marks_found("element_marks", elems, "element", e_counts, e_missing,
+                              (e_marks != np.round(e_marks)) | (e_marks < GRADES[0]) | (e_marks > GRADES[1]), panel))
+    found.append(_marks_found("component_marks", comps, "component", c_counts, c_missing,
+                              (c_marks * 4 != np.round(c_marks * 4)) | (c_marks < MARKS[0]) | (c_marks > MARKS[1]), panel))
+
+    base, goe, panel_score = (elems[col].to_numpy(dtype=np.float64) for col in ["base_value", "goe", "panel_score"])
+    found.append(_found("element_panel", elems, np.abs(panel_score - base - goe) > ROUNDING + EPS,
+                        panel_score, base + goe, "element"))
+    codes, names = pd.factorize(elems["element_name"].fillna("").astype(str))
+    repeated = np.array(["REP" in name for name in names], dtype=np.bool_)[codes] if len(names) else np.zeros(0, np.bool_)
+    bonus = elems["is_bonus"]
+    bonus = bonus.to_numpy() if bonus.dtype == np.bool_ else bonus.astype(str).str.lower().isin(["true", "1"]).to_numpy()
+    before = base / np.where(bonus, BONUS, 1.0) / np.where(repeated, REPEAT, 1.0)
+    step = np.where(elems["element_kind"].to_numpy() == "choreo", CHOREO_STEP, before / 10)
+    expected = np.nan_to_num(e_mean * step)  # unjudged (invalid) elements get no GOE
+    combo = pd.to_numeric(elems["combo_length"], errors="coerce").fillna(0).to_numpy() > 1
+    found.append(_found("element_goe", elems, ~combo & (np.abs(goe - expected) > GOE_TOLERANCE),
+                        goe, expected, "element"))
+    found.append(_found("combo_goe", elems, combo & (np.abs(goe) > np.abs(expected) + GOE_TOLERANCE),
+                        goe, expected, "element"))
+
+    c_score = comps["panel_score"].to_numpy(dtype=np.float64)
+    found.append(_found("component_panel", comps, np.abs(c_score - np.round(np.nan_to_num(c_mean), 2)) > ROUNDING + EPS,
+                        c_score, c_mean, "component"))
+
+    # Performances
+    ids = perfs["id"]
+    tes = pd.Series(panel_score).groupby(elems["performance_id"].to_numpy()).sum().reindex(ids, fill_value=0.0).to_numpy()
+    weighted = c_score * comps["factor"].to_numpy(dtype=np.float64)
+    pcs = pd.DataFrame({"w": weighted, "p": c_score}).groupby(comps["performance_id"].to_numpy()).sum().reindex(ids, fill_value=0.0)
+    rep_tes, rep_pcs, rep_total, deductions = (perfs[col].to_numpy(dtype=np.float64) for col in
+                                               ["tes_score", "pcs_score", "total_score", "deductions"])
+    deductions = np.nan_to_num(deductions)
+    found.append(_found("tes", perfs, np.abs(rep_tes - tes) > ROUNDING + EPS, rep_tes, tes))
+    found.append(_found("pcs", perfs, np.abs(rep_pcs - pcs["w"].to_numpy()) > ROUNDING + FACTOR_ROUNDING * pcs["p"].to_numpy() + EPS,
+                        rep_pcs, pcs["w"]))
+    found.append(_found("total", perfs, np.abs(rep_total - rep_tes - rep_pcs - deductions) > ROUNDING + EPS,
+                        rep_total, rep_tes + rep_pcs + deductions))
+
+    found = pd.concat(found, ignore_index=True)
+    labels = perfs.set_index("id")[["skater_name", "program_type", "category"]]
+    return found.join(labels, on="performance_id").sort_values(["performance_id", "item"], kind="stable", ignore_index=True)
+
+def parsed_tables(skaters):
+    """scraper.parse_protocol records -> (performances, elements, components)
+    frames, numbered by position in the protocol"""
+    perfs = pd.DataFrame([dict(s["performance"], id=i) for i, s in enumerate(skaters, start=1)],
+                         columns=COLUMNS["performances"])
+    elems = pd.DataFrame([dict(el, performance_id=i) for i, s in enumerate(skaters, start=1) for el in s["elements"]],
+                         columns=COLUMNS["elements"])
+    comps = pd.DataFrame([dict(c, performance_id=i) for i, s in enumerate(skaters, start=1) for c in s["components"]],
+                         columns=COLUMNS["components"])
+    return perfs, elems, comps
+
+def check_parsed(skaters):
+    """Discrepancies in one parsed protocol, before it is saved"""
+    return check(*parsed_tables(skaters))
+
+def read_csvs(files):
+    """(performances, elements, components) from FILES-style CSV paths, just the checked columns"""
+    return tuple(pd.read_csv(files[name], usecols=lambda col, name=name: col in COLUMNS[name]) for name in COLUMNS)
+
+def load_tables():
+    """(performances, elements, components) of the whole dataset"""
+    if STORAGE_BACKEND == "sqlite":
+        from database import engine
+        return tuple(pd.read_sql_table(name, engine) for name in COLUMNS)
+    return read_csvs(FILES)
+
+def report(source, found, total=None, limit=5):
+    """Per-performance discrepancy report, like scraper.report_unparsed"""
+    if not len(found):
+        return
+    groups = list(found.groupby("performance_id", sort=False))
+    of = f" of {total}" if total is not None else ""
+    print(f"⚠️ {len(groups)}{of} performance(s) in {source} don't add up:")
+    for perf_id, rows in groups[:limit]:
+        first = rows.iloc[0]
+        problems = []
+        for row in rows.itertuples():
+            what = CHECKS[row.check].format(reported=row.reported, expected=row.expected)
+            problems.append(f"#{row.item} {row.item_name}: {what}" if row.item else what)
+        print(f"   {first.skater_name} ({first.category} {first.program_type}, performance {perf_id}): {'; '.join(problems)}")
+    if len(groups) > limit:
+        print(f"   ... and {len(groups) - limit} more")
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Recompute every score in the dataset and report the ones that don't add up.")
+    parser.add_argument("--limit", type=int, default=10, help="performances to print")
+    parser.add_argument("--out", help="write every discrepancy to this CSV")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    perfs, elems, comps = load_tables()
+    loaded = time.perf_counter()
+    found = check(perfs, elems, comps)
+    done = time.perf_counter()
+    print(f"🔎 Checked {len(perfs)} performances, {len(elems)} elements, {len(comps)} components "
+          f"(read {loaded - start:.2f}s, check {done - loaded:.2f}s)")
+    if args.out:
+        found.to_csv(args.out, index=False)
+        print(f"💾 {len(found)} discrepancies written to {args.out}")
+    if len(found):
+        report("the database" if STORAGE_BACKEND == "sqlite" else "data/", found, len(perfs), args.limit)
+        sys.exit(1)
+    print("✅ Every score adds up")
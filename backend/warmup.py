@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datafiles import STARTUP_MANIFEST, current_version, source_stats
+
+# Lazy cold start (LAZY_STARTUP=1 in main.py).
+# On a scale-to-zero host the first visitor otherwise waits for the interpreter,
+# the numpy/pandas import and the whole data load before anything answers.
+# Instead the worker starts serving at once: "/" needs no data, and
+# /competitions is answered from the small startup manifest compiled with the
+# snapshot. The heavy modules and the tables load in a background thread, whose
+# progress /ready reports. Requests that need the tables wait for it.
+# Standard library only: this is on the import path.
+
+
+def load_startup_manifest(snapshot_dir, files):
+    """The current snapshot's startup manifest, or None if there is none or it
+    doesn't match the CSVs on disk (then the worker just waits for the load)"""
+    version = current_version(snapshot_dir)
+    if version is None:
+        return None
+    try:
+        with open(os.path.join(snapshot_dir, version, STARTUP_MANIFEST)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if manifest.get("source_stats") != source_stats(files):
+        return None
+    return manifest
+
+
+class Warmup:
+    """Steps of the data load and their progress"""
+
+    def __init__(self, steps):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.steps = {name: {"state": "pending"} for name in steps}
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    @contextmanager
+    def step(self, name):
+        """Time one step; the yielded dict can carry details for /ready"""
+        entry = self.steps[name]
+        entry["state"] = "running"
+        start = time.perf_counter()
+        try:
+            yield entry
+            entry["state"] = "done"
+        except BaseException:
+            entry["state"] = "failed"
+            raise
+        finally:
+            entry["seconds"] = round(time.perf_counter() - start, 3)
+
+    def run(self, load, background=False):
+        """Run load(self), in a daemon thread if `background`. A failure is kept
+        for /ready (and re-raised when not in the background)."""
+        def target():
+            try:
+                load(self)
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"⚠️ Data load failed: {self.error}")
+                if not background:
+                    raise
+            finally:
+                self.finished = time.perf_counter()
+                self._done.set()
+        if background:
+            threading.Thread(target=target, name="warmup", daemon=True).start()
+        else:
+            target()
+
+    def wait(self, timeout=None):
+        """True once the load finished successfully"""
+        self._done.wait(timeout)
+        return self.ready
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "elapsed_s": round((self.finished or time.perf_counter()) - self.started, 3),
+            "steps": [dict(entry, name=name) for name, entry in self.steps.items()],
+            "error": self.error,
+        }
@@ -110,7 +110,7 @@ function App() {
           ) : (
              <>
                {view === 'scores' && <ScoreTable performances={filteredPerformances} />}
-               {view === 'analytics' && <ScoreAnalytics performances={filteredPerformances} />}
+               {view === 'analytics' && <ScoreAnalytics compId={selectedCompId} category={categoryFilter} program={programFilter} />}
              </>
           )}
         </div>
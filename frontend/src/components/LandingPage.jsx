@@ -30,25 +30,8 @@ if (API_BASE_URL.endsWith('/')) {
     API_BASE_URL = API_BASE_URL.slice(0, -1);
 }
 
-const PodiumTable = ({ compId, discipline }) => {
-  const [skaters, setSkaters] = useState([]);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    // UPDATED: Using API_BASE_URL
-    axios.get(`${API_BASE_URL}/competition/${compId}/summary`, {
-        params: { category: discipline }
-    })
-      .then(res => {
-        setSkaters(res.data); 
-        setLoading(false);
-      })
-      .catch(err => {
-        console.error("Error loading summary:", err);
-        setLoading(false);
-      });
-  }, [compId, discipline]);
-
+// Podiums for every competition come from a single /summaries request in LandingPage
+const PodiumTable = ({ skaters, loading }) => {
   if (loading) return <div className="loading-text">Loading...</div>;
   if (skaters.length === 0) return <div className="no-data">Pending</div>;
   
@@ -88,6 +71,8 @@ export default function LandingPage({ onNavigate }) {
   const [seasons, setSeasons] = useState([]);
   const [expandedSeason, setExpandedSeason] = useState(null);
   const [openCompIds, setOpenCompIds] = useState([]);
+  const [summaries, setSummaries] = useState({});
+  const [summariesLoading, setSummariesLoading] = useState(true);
 
   useEffect(() => {
     // UPDATED: Using API_BASE_URL
@@ -107,8 +92,21 @@ export default function LandingPage({ onNavigate }) {
         }
       })
       .catch(err => console.error("Failed to load competitions", err));
+
+    // One round trip for all podiums instead of one per competition card
+    axios.get(`${API_BASE_URL}/summaries`)
+      .then(res => {
+        setSummaries(res.data);
+        setSummariesLoading(false);
+      })
+      .catch(err => {
+        console.error("Error loading summaries:", err);
+        setSummariesLoading(false);
+      });
   }, []);
 
+  const podium = (compId, discipline) => (summaries[compId] || {})[discipline] || [];
+
   // Helper to parse date strings (e.g. "Nov 21-22" or ISO "2025-11-21")
   // Returns a number for sorting Descending (Newest First)
   const parseCompDate = (comp) => {
@@ -219,7 +217,7 @@ export default function LandingPage({ onNavigate }) {
                         <div className="discipline-wrapper">
                           <div className="discipline-section">
                             <h3>Men</h3>
-                            <PodiumTable compId={comp.id} discipline="Men" />
+                            <PodiumTable skaters={podium(comp.id, "Men")} loading={summariesLoading} />
                             <div className="button-grid">
                               <div className="btn-group">
                                 <button onClick={() => onNavigate(comp.id, 'scores', 'Short', 'Men', comp.name, comp.year)}>Short Protocols</button>
@@ -237,7 +235,7 @@ export default function LandingPage({ onNavigate }) {
                         <div className="discipline-wrapper">
                           <div className="discipline-section">
                             <h3>Women</h3>
-                            <PodiumTable compId={comp.id} discipline="Women" />
+                            <PodiumTable skaters={podium(comp.id, "Women")} loading={summariesLoading} />
                             <div className="button-grid">
                               <div className="btn-group">
                                 <button onClick={() => onNavigate(comp.id, 'scores', 'Short', 'Women', comp.name, comp.year)}>Short Protocols</button>
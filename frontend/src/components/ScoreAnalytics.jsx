@@ -1,6 +1,9 @@
 import React, { useMemo, useState, useEffect } from 'react';
 import Plot from 'react-plotly.js';
 import { Reorder } from 'framer-motion';
+import axios from 'axios';
+
+const API_BASE_URL = 'https://figure-skating-scores.onrender.com';
 
 // Consistent Color Palette for Skaters
 const COLORS = [
@@ -8,14 +11,6 @@ const COLORS = [
   '#0891b2', '#db2777', '#4b5563', '#854d0e', '#0f766e'
 ];
 
-// Helper to clean jump names
-const cleanElementName = (name) => {
-    if (!name) return "";
-    let cleaned = name.replace(/[<!eq]/g, '');
-    cleaned = cleaned.replace(/(?<!\d)F/g, '');
-    return cleaned.trim();
-};
-
 // --- DRAGGABLE COLUMN COMPONENT (Updated with Framer Motion) ---
 const DraggableColumnList = ({ items, onReorder }) => {
     return (
@@ -93,45 +88,43 @@ const RankTable = ({ title, data, columns }) => (
   </div>
 );
 
-export default function ScoreAnalytics({ performances }) {
+export default function ScoreAnalytics({ compId, category, program }) {
   // --- STATE ---
+  const [analytics, setAnalytics] = useState(null);
+  const [loading, setLoading] = useState(true);
   const [radarSelectedIds, setRadarSelectedIds] = useState([]);
   
   // Column Orders
   const [categoryOrder, setCategoryOrder] = useState(['Toe Loop', 'Salchow', 'Loop', 'Flip', 'Lutz', 'Axel']);
   const [detailedOrder, setDetailedOrder] = useState([]);
 
-  // Mapping for jump codes to labels to help regex matching
-  const jumpCodeMap = {
-      'Toe Loop': 'T', 'Salchow': 'S', 'Loop': 'Lo', 
-      'Flip': 'F', 'Lutz': 'Lz', 'Axel': 'A'
-  };
-
   // --- EFFECTS ---
 
-  // 1. Initialize Radar selections
+  // 1. Fetch the precomputed aggregates (a few KB instead of the full protocol dump)
   useEffect(() => {
-    if (performances.length > 0 && radarSelectedIds.length === 0) {
-        const top3 = [...performances].sort((a, b) => b.total_score - a.total_score).slice(0, 3).map(p => p.id);
-        setRadarSelectedIds(top3); 
-    }
-  }, [performances]);
+    setLoading(true);
+    axios.get(`${API_BASE_URL}/competition/${compId}/analytics`, {
+        params: { category: category, program: program }
+    })
+      .then(res => {
+        setAnalytics(res.data);
+        setLoading(false);
+      })
+      .catch(err => {
+        console.error("Error loading analytics:", err);
+        setLoading(false);
+      });
+  }, [compId, category, program]);
+
+  const skaters = analytics ? analytics.skaters : [];
 
-  // 2. Initialize Detailed Order (Unique Elements)
+  // 2. Initialize Radar selections and Detailed Order (Unique Elements)
   useEffect(() => {
-      if (performances.length > 0 && detailedOrder.length === 0) {
-          let allJumps = [];
-          performances.forEach(p => {
-            p.elements.forEach(el => {
-                if (!el.element_name.includes('Sp') && !el.element_name.includes('StSq') && !el.element_name.includes('ChSq')) {
-                    allJumps.push(el);
-                }
-            });
-          });
-          const uniqueNames = [...new Set(allJumps.map(j => cleanElementName(j.element_name)))].sort();
-          setDetailedOrder(uniqueNames);
-      }
-  }, [performances]);
+    if (!analytics) return;
+    const top3 = [...analytics.skaters].sort((a, b) => b.total_score - a.total_score).slice(0, 3).map(p => p.id);
+    setRadarSelectedIds(top3);
+    setDetailedOrder(analytics.heatmap.jump_elements);
+  }, [analytics]);
 
   const toggleRadarSkater = (id) => {
       if (radarSelectedIds.includes(id)) {
@@ -141,187 +134,97 @@ export default function ScoreAnalytics({ performances }) {
       }
   };
 
-  // --- CALCULATIONS ---
+  // --- CHART DATA (shaping only; the numbers come from the API) ---
   const analyticsData = useMemo(() => {
-    if (!performances || performances.length === 0) return null;
-
-    // 1. SORTING / PREP
-    const sortedTES = [...performances].sort((a, b) => b.tes_score - a.tes_score);
-    const sortedPCS = [...performances].sort((a, b) => b.pcs_score - a.pcs_score);
-    
-    const withBV = performances.map(p => ({
-      ...p,
-      bv: p.elements.reduce((sum, el) => sum + el.base_value, 0)
-    })).sort((a, b) => b.bv - a.bv);
-
-    // Element Aggregation
-    let allJumps = [], allSpins = [], allSteps = [], allChoreo = [];
-    performances.forEach(p => {
-      p.elements.forEach(el => {
-        const item = { ...el, skater: p.skater_name, nation: p.nation };
-        const name = el.element_name;
-        if (name.includes('Sp')) allSpins.push(item);
-        else if (name.includes('StSq')) allSteps.push(item);
-        else if (name.includes('ChSq')) allChoreo.push(item);
-        else allJumps.push(item); 
-      });
-    });
+    if (!analytics || analytics.skaters.length === 0) return null;
 
-    const jumpsByScore = [...allJumps].sort((a, b) => b.panel_score - a.panel_score);
-    const spinsByScore = [...allSpins].sort((a, b) => b.panel_score - a.panel_score);
-    const stepsByScore = [...allSteps].sort((a, b) => b.panel_score - a.panel_score);
-    const choreoByScore = [...allChoreo].sort((a, b) => b.panel_score - a.panel_score);
-    const hasChoreo = allChoreo.length > 0;
+    const byId = Object.fromEntries(analytics.skaters.map(p => [p.id, p]));
+    const lastName = p => p.skater_name.split(' ').slice(-1)[0];
 
-    const avgJumpGOE = performances.map(p => {
-        const myJumps = p.elements.filter(el => !el.element_name.match(/(Sp|StSq|ChSq)/));
-        const totalGOE = myJumps.reduce((acc, j) => acc + j.goe, 0);
-        return { ...p, avg_jump_goe: myJumps.length > 0 ? totalGOE / myJumps.length : 0 };
-    }).sort((a, b) => b.avg_jump_goe - a.avg_jump_goe);
+    // 1. RANKINGS
+    const sortedPCS = analytics.rankings.pcs_score.map(id => byId[id]);
+    const withBV = analytics.rankings.bv.map(id => byId[id]);
+    const avgJumpGOE = analytics.rankings.avg_jump_goe.map(id => byId[id]);
+    const { jump: jumpsByScore, spin: spinsByScore, step: stepsByScore, choreo: choreoByScore } = analytics.top_elements;
 
-    // 3. SCATTER PLOTS
-    const scatterSkaters = performances; 
-    const xValues = scatterSkaters.map(p => p.elements.reduce((sum, el) => sum + el.base_value, 0));
-    const yValues = scatterSkaters.map(p => p.tes_score);
+    // 2. SCATTER PLOTS
+    const xValues = skaters.map(p => p.bv);
+    const yValues = skaters.map(p => p.tes_score);
     const riskRewardData = {
       x: xValues, y: yValues,
-      text: scatterSkaters.map(p => p.skater_name.split(' ').slice(-1)[0]), 
+      text: skaters.map(lastName), 
       mode: 'markers+text', textposition: 'top center', textfont: { family: 'Hind', size: 11, color: '#64748b' },
       type: 'scatter', marker: { size: 12, color: '#334155' },
       rangeX: [Math.floor(Math.min(...xValues) - 15), Math.ceil(Math.max(...xValues) + 15)],
       rangeY: [Math.floor(Math.min(...yValues) - 15), Math.ceil(Math.max(...yValues) + 15)]
     };
 
-    const pcsValues = scatterSkaters.map(p => p.pcs_score);
-    const tesValues = scatterSkaters.map(p => p.tes_score); 
+    const pcsValues = skaters.map(p => p.pcs_score);
     const tesPcsData = {
-      x: pcsValues, y: tesValues,
-      text: scatterSkaters.map(p => p.skater_name.split(' ').slice(-1)[0]),
+      x: pcsValues, y: yValues,
+      text: skaters.map(lastName),
       mode: 'markers+text', textposition: 'top center', textfont: { family: 'Hind', size: 11, color: '#64748b' },
       type: 'scatter', marker: { size: 12, color: '#0f766e' }, 
       rangeX: [Math.floor(Math.min(...pcsValues) - 5), Math.ceil(Math.max(...pcsValues) + 5)],
-      rangeY: [Math.floor(Math.min(...tesValues) - 5), Math.ceil(Math.max(...tesValues) + 5)]
+      rangeY: [Math.floor(Math.min(...yValues) - 5), Math.ceil(Math.max(...yValues) + 5)]
     };
 
-    // 4. RADAR
-    const radarSkaters = performances.filter(p => radarSelectedIds.includes(p.id));
-    const getMetricStats = (extractor) => ({ min: Math.min(...performances.map(extractor)), max: Math.max(...performances.map(extractor)) });
-    const normalize = (val, stats) => stats.max === stats.min ? 10 : 5 + ((val - stats.min) / (stats.max - stats.min)) * 5;
-
-    const getComp = p => p.components.find(c => c.component_name.includes("Composition"))?.panel_score || 0;
-    const getPres = p => p.components.find(c => c.component_name.includes("Presentation"))?.panel_score || 0;
-    const getSkill = p => p.components.find(c => c.component_name.includes("Skating Skills"))?.panel_score || 0;
-    const getBestSpin = p => p.elements.filter(el => el.element_name.includes('Sp')).sort((a,b) => b.panel_score - a.panel_score)[0]?.panel_score || 0;
-    const getBestStep = p => p.elements.filter(el => el.element_name.includes('StSq')).sort((a,b) => b.panel_score - a.panel_score)[0]?.panel_score || 0;
-    const getBestChoreo = p => p.elements.filter(el => el.element_name.includes('ChSq')).sort((a,b) => b.panel_score - a.panel_score)[0]?.panel_score || 0;
-    const getAvgGOEVal = p => avgJumpGOE.find(s => s.id === p.id)?.avg_jump_goe || 0;
-
-    const rangeComp = getMetricStats(getComp);
-    const rangePres = getMetricStats(getPres);
-    const rangeSkill = getMetricStats(getSkill);
-    const rangeSpin = getMetricStats(getBestSpin);
-    const rangeStep = getMetricStats(getBestStep);
-    const rangeChoreo = getMetricStats(getBestChoreo);
-    const rangeGOE = getMetricStats(getAvgGOEVal);
-
-    const radarLabels = ['Composition', 'Presentation', 'Skating Skills', 'Best Spin', 'Best Step Seq.', ...(hasChoreo ? ['Best Choreo Seq.'] : []), 'Avg Jump GOE', 'Composition'];
+    // 3. RADAR
+    const { metrics, values, ranges } = analytics.radar;
+    const normalize = (val, [min, max]) => max === min ? 10 : 5 + ((val - min) / (max - min)) * 5;
+    const hoverLabels = {
+        'Composition': 'Comp', 'Presentation': 'Pres', 'Skating Skills': 'Skill', 'Best Spin': 'Spin',
+        'Best Step Seq.': 'Step', 'Best Choreo Seq.': 'Choreo', 'Avg Jump GOE': 'GOE'
+    };
+    const radarLabels = [...metrics, metrics[0]];
 
-    const radarData = radarSkaters.map(skater => {
-        const skaterIdx = performances.findIndex(p => p.id === skater.id);
+    const radarData = skaters.filter(p => radarSelectedIds.includes(p.id)).map(skater => {
+        const skaterIdx = skaters.findIndex(p => p.id === skater.id);
         const color = COLORS[skaterIdx % COLORS.length];
-        const rawComp = getComp(skater), rawPres = getPres(skater), rawSkill = getSkill(skater);
-        const rawSpin = getBestSpin(skater), rawStep = getBestStep(skater), rawChoreo = getBestChoreo(skater);
-        const rawGOE = getAvgGOEVal(skater);
-
-        const rValues = [
-            normalize(rawComp, rangeComp), normalize(rawPres, rangePres), normalize(rawSkill, rangeSkill),
-            normalize(rawSpin, rangeSpin), normalize(rawStep, rangeStep),
-            ...(hasChoreo ? [normalize(rawChoreo, rangeChoreo)] : []),
-            normalize(rawGOE, rangeGOE), normalize(rawComp, rangeComp)
-        ];
-        
-        const hoverText = [
-            `Comp: ${rawComp.toFixed(2)}`, `Pres: ${rawPres.toFixed(2)}`, `Skill: ${rawSkill.toFixed(2)}`,
-            `Spin: ${rawSpin.toFixed(2)}`, `Step: ${rawStep.toFixed(2)}`,
-            ...(hasChoreo ? [`Choreo: ${rawChoreo.toFixed(2)}`] : []), `GOE: ${rawGOE.toFixed(2)}`, `Comp: ${rawComp.toFixed(2)}`
-        ];
+        const raw = values[skater.id];
+        const rValues = [...metrics.map((m, i) => normalize(raw[i], ranges[m])), normalize(raw[0], ranges[metrics[0]])];
+        const hoverText = [...metrics, metrics[0]].map(m => `${hoverLabels[m]}: ${raw[metrics.indexOf(m)].toFixed(2)}`);
 
         return {
-            type: 'scatterpolar', r: rValues, theta: radarLabels, fill: 'toself', name: skater.skater_name.split(' ').slice(-1)[0],
-            mode: 'lines+markers+text', text: rValues.map((val, i) => i === 2 ? skater.skater_name.split(' ').slice(-1)[0] : ""), 
+            type: 'scatterpolar', r: rValues, theta: radarLabels, fill: 'toself', name: lastName(skater),
+            mode: 'lines+markers+text', text: rValues.map((val, i) => i === 2 ? lastName(skater) : ""), 
             hovertext: hoverText, hoverinfo: 'text', textposition: 'top center',
             textfont: { color: color, size: 12, family: 'Hind', weight: 'bold' },
             opacity: 0.4, line: { width: 2, color: color }, marker: { color: color, size: 6 }
         };
     });
 
-    // --- 5. CATEGORY HEATMAP (Dynamic Columns) ---
-    // Sort skaters by rank (total score) for the Y-axis
-    const heatmapSkaters = [...performances].sort((a, b) => a.total_score - b.total_score);
-
-    const zValues = heatmapSkaters.map(p => {
-        const rowHoverData = [];
-        const rowValues = categoryOrder.map(label => {
-            const typeCode = jumpCodeMap[label]; // Map 'Axel' -> 'A'
-            const typeJumps = p.elements.filter(el => new RegExp(`[0-9]${typeCode}`).test(el.element_name));
-            
-            if (typeJumps.length === 0) { rowHoverData.push('N/A'); return null; }
-            
-            const sum = typeJumps.reduce((acc, el) => acc + el.goe, 0);
-            rowHoverData.push(typeJumps.map(el => el.element_name).join(', '));
-            return sum / typeJumps.length;
-        });
-        return { values: rowValues, hover: rowHoverData };
-    });
+    // --- 4. CATEGORY HEATMAP (Dynamic Columns) ---
+    // Rows come sorted by total score from the API
+    const heatmapSkaters = analytics.heatmap.skaters.map(id => byId[id]);
+    const jumpTypes = analytics.heatmap.jump_types;
 
     const heatmapData = {
-        z: zValues.map(v => v.values),
+        z: heatmapSkaters.map((_, row) => categoryOrder.map(label => jumpTypes[label].goe[row])),
         x: categoryOrder, // Dynamic X-Axis
-        y: heatmapSkaters.map(p => p.skater_name.split(' ').slice(-1)[0]),
-        customdata: zValues.map(v => v.hover),
+        y: heatmapSkaters.map(lastName),
+        customdata: heatmapSkaters.map((_, row) => categoryOrder.map(label => jumpTypes[label].executed[row])),
         type: 'heatmap', colorscale: 'Sunset', showscale: true, xgap: 2, ygap: 2, hoverongaps: false,
         hovertemplate: '<b>%{y}</b><br>Jump Type: %{x}<br>GOE: %{z:.2f}<br>Executed: %{customdata}<extra></extra>'
     };
 
-    // --- 6. DETAILED HEATMAP (Dynamic Columns) ---
-    const detailedJumpZ = heatmapSkaters.map(p => {
-        return detailedOrder.map(cleanName => {
-            const specificJumps = p.elements.filter(el => cleanElementName(el.element_name) === cleanName);
-            if (specificJumps.length === 0) return null;
-            const totalGOE = specificJumps.reduce((acc, el) => acc + el.goe, 0);
-            return totalGOE / specificJumps.length;
-        });
-    });
-
+    // --- 5. DETAILED HEATMAP (Dynamic Columns) ---
+    const jumpDetail = analytics.heatmap.jump_detail;
     const detailedHeatmapData = {
-        z: detailedJumpZ,
+        z: heatmapSkaters.map((_, row) => detailedOrder.map(name => jumpDetail[name] ? jumpDetail[name][row] : null)),
         x: detailedOrder, // Dynamic X-Axis
-        y: heatmapSkaters.map(p => p.skater_name.split(' ').slice(-1)[0]),
+        y: heatmapSkaters.map(lastName),
         type: 'heatmap', colorscale: 'Sunset', showscale: true, xgap: 2, ygap: 2, hoverongaps: false,
         hovertemplate: '<b>%{y}</b><br>Element: %{x}<br>GOE: %{z:.2f}<extra></extra>'
     };
 
-    // --- 7. BOX PLOTS ---
+    // --- 6. BOX PLOTS ---
     const boxTraces = [];
     const actualScoreTraces = [];
-    [...performances].sort((a,b)=>a.rank-b.rank).forEach((p, idx) => {
-        const judgeTotals = Array(9).fill(0);
-        p.components.forEach(c => {
-             const s = c.judges_scores.split(',').map(v=>parseFloat(v.trim()));
-             s.forEach((val, i) => { if(i<9 && !isNaN(val)) judgeTotals[i] += val*c.factor; });
-        });
-        p.elements.forEach(el => {
-             const s = el.judges_scores.split(',').map(v=>parseFloat(v.trim()));
-             const valid = s.filter(n=>!isNaN(n));
-             const goeVal = el.panel_score - el.base_value;
-             const avgG = valid.reduce((a,b)=>a+b,0)/valid.length;
-             const unit = Math.abs(avgG)>0.01 ? goeVal/avgG : el.base_value*0.1;
-             s.forEach((val, i) => { if(i<9 && !isNaN(val)) judgeTotals[i] += el.base_value + (val*unit); });
-        });
-        for(let i=0;i<9;i++) judgeTotals[i] -= p.deductions;
+    [...skaters].sort((a,b)=>a.rank-b.rank).forEach((p, idx) => {
         const color = COLORS[idx % COLORS.length];
         boxTraces.push({
-            y: judgeTotals, type: 'box', name: `${p.rank}. ${p.skater_name}`, boxpoints: 'all', jitter: 0.5, pointpos: 0,
+            y: analytics.judge_totals[p.id], type: 'box', name: `${p.rank}. ${p.skater_name}`, boxpoints: 'all', jitter: 0.5, pointpos: 0,
             marker: {size:4, color:color, opacity:0.8}, line:{width:1.5, color:color}, fillcolor:'rgba(0,0,0,0)', showlegend:false,
             text:['J1','J2','J3','J4','J5','J6','J7','J8','J9'], hovertemplate: 'Judge: %{text}<br>Est. Score: %{y:.2f}<extra></extra>'
         });
@@ -332,12 +235,13 @@ export default function ScoreAnalytics({ performances }) {
     });
 
     return {
-      sortedTES, sortedPCS, withBV, jumpsByScore, spinsByScore, stepsByScore, choreoByScore, avgJumpGOE,
+      sortedPCS, withBV, jumpsByScore, spinsByScore, stepsByScore, choreoByScore, avgJumpGOE,
       riskRewardData, tesPcsData, radarData, heatmapData, detailedHeatmapData, boxData: [...boxTraces, ...actualScoreTraces]
     };
-  }, [performances, radarSelectedIds, categoryOrder, detailedOrder]);
+  }, [analytics, radarSelectedIds, categoryOrder, detailedOrder]);
 
 
+  if (loading) return <div style={{textAlign:'center', padding:'50px'}}>Loading Analytics...</div>;
   if (!analyticsData) return <div>No Data Available</div>;
 
   return (
@@ -369,7 +273,7 @@ export default function ScoreAnalytics({ performances }) {
               <div className="radar-controls">
                   <h4>Select Skaters</h4>
                   <div className="radar-list">
-                      {performances.map((p,idx) => (
+                      {skaters.map((p,idx) => (
                           <label key={p.id} className="radar-toggle-item">
                               <input type="checkbox" checked={radarSelectedIds.includes(p.id)} onChange={() => toggleRadarSkater(p.id)} />
                               <span className="radar-label-text"><span className="rank-badge" style={{backgroundColor:COLORS[idx%COLORS.length]}}>#{p.rank}</span>{p.skater_name.split(' ').slice(-1)[0]}</span>